@@ -2,6 +2,7 @@ import streamlit as st
 import sys
 import os
 import logging
+import importlib
 from streamlit_option_menu import option_menu
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(name)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
@@ -14,11 +15,10 @@ if root_dir not in sys.path:
 from auth.login_page import show_login_page, show_user_header, show_logout_button
 from auth.auth_utils import authenticate_user, get_user_role, get_user_display_name, get_user_email, is_user_logged_in
 from front.dashboard import show_dashboard_page
-from front.administracao import show_admin_page
-from front.plano_de_acao import show_plano_acao_page
-from front.pdf_processor_page import display_pdf_processor_page
 from database.matrix_manager import get_matrix_manager
 from operations.audit_logger import log_action
+from operations.cache_warmup import start_cache_warmup
+from operations.render_profiler import RenderProfiler
 
 # Monitoramento de uso (apenas para debug)
 if st.secrets.get("general", {}).get("DEBUG_MODE", False):
@@ -27,6 +27,20 @@ if st.secrets.get("general", {}).get("DEBUG_MODE", False):
 # <<< NOVA IMPORTAÇÃO >>>
 from auth.azure_auth import handle_redirect
 
+def lazy_page(module_name: str, function_name: str):
+    """
+    Entrada de página importada só quando aberta: administração e PDFs trazem
+    bibliotecas pesadas que a maioria dos usuários nunca usa.
+    """
+    def run_page():
+        getattr(importlib.import_module(module_name), function_name)()
+    run_page.__name__ = function_name
+    return run_page
+
+show_admin_page = lazy_page("front.administracao", "show_admin_page")
+show_plano_acao_page = lazy_page("front.plano_de_acao", "show_plano_acao_page")
+display_pdf_processor_page = lazy_page("front.pdf_processor_page", "display_pdf_processor_page")
+
 def configurar_pagina():
     st.set_page_config(page_title="Abrangência | Gestão de Incidentes", page_icon="⚠️", layout="wide", initial_sidebar_state="expanded")
 
@@ -58,27 +72,25 @@ def initialize_app():
         import logging
         logging.getLogger('abrangencia_app').setLevel(logging.WARNING)
     
-    # Pre-carrega dados críticos apenas uma vez
+    # Invalidação de cache entre réplicas via LISTEN/NOTIFY (uma thread por processo)
+    from database.change_listener import get_change_listener
+    get_change_listener()
+    
+    # Pré-carrega em segundo plano os dados da página inicial, sem bloquear o menu
     if 'app_initialized' not in st.session_state:
-        with st.spinner("Inicializando aplicação..."):
-            # Pre-cache de dados estáticos
-            from operations.data_loader import DataCache
-            from operations.incident_manager import get_incident_manager
-            
-            user_email = st.session_state.get('user_info', {}).get('email')
-            
-            if user_email:
-                incident_manager = get_incident_manager()
-                
-                # Carrega dados em paralelo (se possível)
-                DataCache.get_or_load(
-                    key="blocking_actions",
-                    loader_func=incident_manager.get_all_blocking_actions,
-                    ttl_seconds=3600
-                )
-        
+        start_cache_warmup(get_user_role(), "Consultar Abrangência")
         st.session_state.app_initialized = True
 
+def get_profiling_settings() -> tuple[bool, bool]:
+    """
+    Perfil das renderizações (opt-in): pelo secrets (general.PROFILE_PAGES) ou pela sessão,
+    ativado no painel de administração. A árvore de chamadas exige DEBUG_MODE ou a opção da sessão.
+    """
+    general = st.secrets.get("general", {})
+    profile_pages = bool(general.get("PROFILE_PAGES", False) or st.session_state.get('profile_pages', False))
+    profile_call_tree = bool(general.get("DEBUG_MODE", False) or st.session_state.get('profile_call_tree', False))
+    return profile_pages, profile_pages and profile_call_tree
+
 def main():
     configurar_pagina()
     
@@ -140,8 +152,15 @@ def main():
     
     page_to_run = menu_items.get(selected_page)
     if page_to_run:
+        # Dispara as cargas da página em paralelo; a página aguarda apenas o que usar
+        start_cache_warmup(user_role, selected_page)
         logger.info(f"Usuário '{get_user_email()}' navegando para a página: {selected_page}")
-        page_to_run["function"]()
+        profile_pages, profile_call_tree = get_profiling_settings()
+        if profile_pages:
+            with RenderProfiler().profile(selected_page, get_user_email(), call_tree=profile_call_tree):
+                page_to_run["function"]()
+        else:
+            page_to_run["function"]()
 
 if __name__ == "__main__":
     main()
@@ -26,9 +26,21 @@ CACHE_TTL = {
 IMAGE_COMPRESSION = {
     'max_size_kb': 300,  # Tamanho máximo em KB
     'max_dimension': 1920,  # Dimensão máxima em pixels
-    'quality': 85,  # Qualidade JPEG inicial
+    'quality': {'jpeg': 85, 'webp': 80, 'avif': 65},  # Qualidade inicial por formato
+    'min_quality': 20,  # Qualidade mínima aceita na busca
+    'quality_tolerance': 3,  # Busca termina quando o intervalo de qualidade fica menor que isto
+    # Formatos em ordem de preferência; usa o primeiro que o Pillow instalado codifica.
+    # Coloque 'avif' na frente para arquivos ainda menores (codificação mais lenta)
+    'formats': ('webp', 'jpeg'),
 }
 
+# Versões reduzidas (WebP) geradas no upload de imagens, por largura máxima em pixels
+IMAGE_RENDITIONS = {
+    'thumb': 320,   # Miniaturas (tabelas, diálogos)
+    'medium': 800,  # Cards do dashboard
+}
+IMAGE_RENDITION_QUALITY = 75
+
 # Configurações de paginação
 PAGINATION = {
     'incidents_per_page': 20,
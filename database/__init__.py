@@ -1,6 +1,8 @@
 from .supabase_config import get_supabase_client, get_supabase_credentials, get_supabase_admin_client
 from .supabase_operations import SupabaseOperations
 from .supabase_storage import SupabaseStorage
+from .file_blobs import FileBlobRegistry
+from .table_cache import TableCache
 from .matrix_manager import MatrixManager, get_matrix_manager
 
 __all__ = [
@@ -9,6 +11,8 @@ __all__ = [
     'get_supabase_admin_client',  # <<< ADICIONE ESTA LINHA
     'SupabaseOperations',
     'SupabaseStorage',
+    'FileBlobRegistry',
+    'TableCache',
     'MatrixManager',
     'get_matrix_manager'
 ]
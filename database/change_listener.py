@@ -0,0 +1,133 @@
+import json
+import select
+import threading
+import logging
+import streamlit as st
+from sqlalchemy import text
+from .supabase_config import get_database_engine, PROCESS_ORIGIN
+from .table_cache import TableCache
+
+logger = logging.getLogger('abrangencia_app.change_listener')
+
+# Canal usado pelo trigger app.notify_table_change (database/migrations/001_table_change_notifications.sql)
+CHANGE_CHANNEL = "app_table_changes"
+
+# Com as invalidações ativas as tabelas podem ficar muito mais tempo em cache
+NOTIFY_TABLE_TTL = 3600
+
+RECONNECT_DELAY_SECONDS = 10
+POLL_TIMEOUT_SECONDS = 5
+
+
+@st.cache_resource
+def get_change_listener():
+    listener = ChangeListener()
+    listener.start()
+    return listener
+
+
+class ChangeListener:
+    """
+    Thread em segundo plano que escuta as notificações de mudança do Postgres e
+    mantém o TableCache deste processo coerente com as escritas feitas por outras réplicas.
+    """
+
+    def __init__(self):
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name="table-change-listener", daemon=True)
+        self._thread.start()
+        logger.info("Listener de mudanças iniciado")
+
+    def stop(self):
+        self._stop_event.set()
+
+    def is_alive(self) -> bool:
+        return bool(self._thread and self._thread.is_alive())
+
+    def _triggers_installed(self, conn) -> bool:
+        """Verifica se a função de notificação foi criada no banco"""
+        result = conn.execute(text("""
+            SELECT EXISTS(
+                SELECT 1
+                FROM pg_proc p
+                JOIN pg_namespace n ON p.pronamespace = n.oid
+                WHERE n.nspname = 'app'
+                  AND p.proname = 'notify_table_change'
+            )
+        """))
+        return bool(result.scalar())
+
+    def _run(self):
+        cache = TableCache()
+
+        while not self._stop_event.is_set():
+            raw_conn = None
+            try:
+                engine = get_database_engine()
+
+                with engine.connect() as conn:
+                    if not self._triggers_installed(conn):
+                        logger.warning("Triggers de notificação não instalados; listener desativado")
+                        return
+
+                raw_conn = engine.raw_connection()
+                pg_conn = raw_conn.driver_connection
+                pg_conn.autocommit = True
+                with pg_conn.cursor() as cursor:
+                    cursor.execute(f"LISTEN {CHANGE_CHANNEL}")
+
+                # Eventos podem ter sido perdidos enquanto estávamos desconectados
+                cache.invalidate()
+                cache.set_extended_ttl(NOTIFY_TABLE_TTL)
+                logger.info(f"Escutando o canal '{CHANGE_CHANNEL}'")
+
+                while not self._stop_event.is_set():
+                    readable, _, _ = select.select([pg_conn], [], [], POLL_TIMEOUT_SECONDS)
+                    if not readable:
+                        continue
+
+                    pg_conn.poll()
+                    while pg_conn.notifies:
+                        notification = pg_conn.notifies.pop(0)
+                        self._handle_notification(notification.payload)
+
+            except Exception as e:
+                logger.warning(f"Listener de mudanças desconectado: {e}")
+            finally:
+                cache.set_extended_ttl(None)
+                if raw_conn is not None:
+                    try:
+                        raw_conn.close()
+                    except Exception:
+                        pass
+
+            self._stop_event.wait(RECONNECT_DELAY_SECONDS)
+
+    def _handle_notification(self, payload: str):
+        """Aplica uma notificação recebida ao TableCache"""
+        try:
+            change = json.loads(payload)
+        except (TypeError, ValueError):
+            logger.warning(f"Notificação inválida: {payload}")
+            return
+
+        # Escritas deste processo já foram aplicadas no cache (write-through)
+        if change.get('origin') == PROCESS_ORIGIN:
+            return
+
+        table_name = change.get('table')
+        if not table_name:
+            return
+
+        cache = TableCache()
+        row_id = change.get('id')
+        if change.get('op') == 'DELETE' and row_id is not None:
+            cache.apply_delete(table_name, int(row_id) if str(row_id).isdigit() else row_id)
+        else:
+            # Sem os dados da linha (e com RLS por usuário) o seguro é recarregar a tabela
+            cache.invalidate(table_name)
@@ -0,0 +1,144 @@
+import logging
+import threading
+from sqlalchemy import text
+from .supabase_operations import SupabaseOperations
+from .supabase_config import get_storage_settings
+
+logger = logging.getLogger('abrangencia_app.file_blobs')
+
+
+class FileBlobRegistry:
+    """
+    Registro dos objetos do Storage por SHA-256 (tabela file_blobs, migração 004).
+    Permite deduplicar uploads com uma consulta indexada e contar as referências
+    de cada objeto, para que a remoção só apague arquivos que ninguém mais usa.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            logger.info("Criando instância única de FileBlobRegistry")
+            cls._instance = super().__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+
+        # Tabela do sistema: usa a conexão do servidor, sem o contexto RLS do usuário
+        self.engine = SupabaseOperations().engine
+        self._available = None
+        self._lock = threading.Lock()
+        self._initialized = True
+
+    def is_available(self) -> bool:
+        """Verifica uma vez por processo se a tabela file_blobs existe (e se o backend é o Supabase)"""
+        if self._available is not None:
+            return self._available
+        if not self.engine:
+            return False
+        if get_storage_settings()["backend"] == "local":
+            # file_blobs não distingue backends: um caminho registrado aqui não existiria no Supabase
+            # (e vice-versa) se os dois usarem o mesmo banco. O backend local já deduplica por hard link
+            logger.info("Backend local de arquivos: registro file_blobs desativado")
+            self._available = False
+            return False
+
+        with self._lock:
+            if self._available is None:
+                try:
+                    with self.engine.connect() as conn:
+                        exists = conn.execute(text("SELECT to_regclass('public.file_blobs') IS NOT NULL")).scalar()
+                    self._available = bool(exists)
+                    if not self._available:
+                        logger.warning("Tabela file_blobs ausente; uploads não serão deduplicados")
+                except Exception as e:
+                    # Falha temporária: tenta de novo na próxima chamada
+                    logger.warning(f"Não foi possível verificar file_blobs: {e}")
+                    return False
+        return self._available
+
+    def acquire(self, bucket_name: str, file_hash: str) -> dict | None:
+        """
+        Procura um objeto com o mesmo conteúdo no bucket e, se existir, registra mais uma referência.
+
+        Returns:
+            Linha de file_blobs do objeto existente ou None
+        """
+        if not self.is_available():
+            return None
+        try:
+            with self.engine.connect() as conn:
+                row = conn.execute(text("""
+                    UPDATE file_blobs
+                    SET refcount = refcount + 1, updated_at = now()
+                    WHERE bucket = :bucket AND sha256 = :sha256
+                    RETURNING *
+                """), {"bucket": bucket_name, "sha256": file_hash}).fetchone()
+                conn.commit()
+            return dict(row._mapping) if row else None
+        except Exception as e:
+            logger.warning(f"Erro ao consultar file_blobs: {e}")
+            return None
+
+    def register(self, bucket_name: str, file_hash: str, file_path: str, size: int, content_type: str | None) -> dict | None:
+        """
+        Registra um objeto recém-enviado. Se outro upload do mesmo conteúdo terminou antes,
+        a linha existente ganha a referência e é retornada (o caminho retornado é o que vale).
+
+        Returns:
+            Linha de file_blobs resultante ou None se o registro não estiver disponível
+        """
+        if not self.is_available():
+            return None
+        try:
+            with self.engine.connect() as conn:
+                row = conn.execute(text("""
+                    INSERT INTO file_blobs (sha256, bucket, path, size, content_type)
+                    VALUES (:sha256, :bucket, :path, :size, :content_type)
+                    ON CONFLICT (bucket, sha256)
+                    DO UPDATE SET refcount = file_blobs.refcount + 1, updated_at = now()
+                    RETURNING *
+                """), {
+                    "sha256": file_hash, "bucket": bucket_name, "path": file_path,
+                    "size": size, "content_type": content_type
+                }).fetchone()
+                conn.commit()
+            return dict(row._mapping) if row else None
+        except Exception as e:
+            logger.warning(f"Erro ao registrar objeto em file_blobs: {e}")
+            return None
+
+    def release(self, bucket_name: str, file_path: str) -> int | None:
+        """
+        Remove uma referência ao objeto; a linha é apagada quando chega a zero.
+
+        Returns:
+            Referências restantes (0 = o objeto pode ser apagado) ou None se o objeto não é rastreado
+
+        Raises:
+            RuntimeError: Se não foi possível consultar file_blobs (o objeto não deve ser apagado)
+        """
+        if not self.is_available():
+            if self.engine and self._available is None:
+                # Falha temporária na verificação: a tabela pode existir e o objeto ter outras referências
+                raise RuntimeError("Não foi possível verificar file_blobs")
+            return None
+        try:
+            with self.engine.connect() as conn:
+                remaining = conn.execute(text("""
+                    UPDATE file_blobs
+                    SET refcount = GREATEST(refcount - 1, 0), updated_at = now()
+                    WHERE bucket = :bucket AND path = :path
+                    RETURNING refcount
+                """), {"bucket": bucket_name, "path": file_path}).scalar()
+                if remaining == 0:
+                    conn.execute(text("""
+                        DELETE FROM file_blobs
+                        WHERE bucket = :bucket AND path = :path AND refcount = 0
+                    """), {"bucket": bucket_name, "path": file_path})
+                conn.commit()
+            return remaining
+        except Exception as e:
+            raise RuntimeError(f"Erro ao liberar referência em file_blobs: {e}") from e
@@ -0,0 +1,363 @@
+"""
+Backend de arquivos em disco com a mesma interface do cliente de Storage do Supabase
+(client.storage.from_(bucket).upload/remove/list/get_public_url/create_signed_urls),
+usado por SupabaseStorage quando o backend configurado é 'local'.
+
+O conteúdo é endereçado pelo SHA-256: cada arquivo existe uma única vez em
+<raiz>/.objects e os caminhos dos buckets são hard links para ele, de modo que uploads
+repetidos não ocupam espaço extra. Um servidor HTTP local serve as URLs públicas e as
+URLs assinadas (HMAC com expiração) no mesmo formato de caminho do Supabase.
+"""
+
+import os
+import hmac
+import json
+import time
+import secrets
+import hashlib
+import logging
+import mimetypes
+import tempfile
+import threading
+from types import SimpleNamespace
+from datetime import datetime, timezone
+from urllib.parse import urlsplit, quote, unquote, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from .supabase_config import PUBLIC_IMAGES_BUCKET, ACTION_EVIDENCE_BUCKET
+
+logger = logging.getLogger('abrangencia_app.local_storage')
+
+# Buckets servidos sem assinatura, como os buckets públicos do Supabase
+LOCAL_PUBLIC_BUCKETS = (PUBLIC_IMAGES_BUCKET, ACTION_EVIDENCE_BUCKET)
+DEFAULT_LIST_LIMIT = 100
+COPY_CHUNK_SIZE = 1024 * 1024
+PUBLIC_PREFIX = "/storage/v1/object/public/"
+SIGNED_PREFIX = "/storage/v1/object/sign/"
+
+_server_lock = threading.Lock()
+_servers = {}
+
+
+def sign_path(secret: str, bucket_name: str, file_path: str, expires_at: int) -> str:
+    """Token HMAC-SHA256 de bucket/caminho/expiração"""
+    message = f"{bucket_name}/{file_path}:{expires_at}".encode()
+    return hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+
+
+def verify_signature(secret: str, bucket_name: str, file_path: str, expires_at: int, token: str) -> bool:
+    if expires_at < time.time():
+        return False
+    return hmac.compare_digest(sign_path(secret, bucket_name, file_path, expires_at), token)
+
+
+def _iso(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat()
+
+
+class LocalStorageBucket:
+    """Operações de um bucket (equivalente a client.storage.from_(bucket))"""
+
+    def __init__(self, backend: "LocalStorageBackend", bucket_name: str):
+        self.backend = backend
+        self.bucket_name = bucket_name
+
+    def upload(self, path: str, file, file_options: dict = None) -> dict:
+        """Grava o arquivo (bytes ou objeto com read) em path; file_options como no storage3"""
+        file_options = file_options or {}
+        upsert = str(file_options.get("upsert", "false")).lower() == "true"
+        content_type = file_options.get("content-type") or mimetypes.guess_type(path)[0]
+
+        target = self.backend.resolve(self.bucket_name, path)
+        if os.path.exists(target) and not upsert:
+            raise FileExistsError(f"'{self.bucket_name}/{path}' já existe")
+
+        sha256, size = self.backend.store_object(file)
+        previous = self.backend.read_metadata(self.bucket_name, path)
+
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        link_tmp = f"{target}.{secrets.token_hex(4)}.tmp"
+        os.link(self.backend.object_path(sha256), link_tmp)
+        os.replace(link_tmp, target)
+
+        now = time.time()
+        self.backend.write_metadata(self.bucket_name, path, {
+            "sha256": sha256,
+            "size": size,
+            "content_type": content_type,
+            "created_at": previous["created_at"] if previous else now,
+            "updated_at": now,
+        })
+        if previous and previous["sha256"] != sha256:
+            self.backend.release_object(previous["sha256"])
+        return {"path": path, "Key": f"{self.bucket_name}/{path}"}
+
+    def download(self, path: str) -> bytes:
+        with open(self.backend.resolve(self.bucket_name, path), "rb") as f:
+            return f.read()
+
+    def remove(self, paths: list[str]) -> list[dict]:
+        removed = []
+        for path in paths:
+            metadata = self.backend.read_metadata(self.bucket_name, path)
+            target = self.backend.resolve(self.bucket_name, path)
+            if metadata is None or not os.path.exists(target):
+                continue
+            os.remove(target)
+            os.remove(self.backend.metadata_path(self.bucket_name, path))
+            self.backend.release_object(metadata["sha256"])
+            removed.append({"name": path, "bucket_id": self.bucket_name})
+        return removed
+
+    def get_public_url(self, path: str) -> str:
+        return f"{self.backend.base_url}{PUBLIC_PREFIX}{self.bucket_name}/{quote(path)}"
+
+    def create_signed_url(self, path: str, expires_in: int) -> dict:
+        expires_at = int(time.time()) + int(expires_in)
+        token = sign_path(self.backend.signing_secret, self.bucket_name, path, expires_at)
+        url = f"{self.backend.base_url}{SIGNED_PREFIX}{self.bucket_name}/{quote(path)}?token={token}&expires={expires_at}"
+        return {"signedURL": url, "signedUrl": url}
+
+    def create_signed_urls(self, paths: list[str], expires_in: int) -> list[dict]:
+        signed = []
+        for path in paths:
+            if self.backend.read_metadata(self.bucket_name, path) is None:
+                signed.append({"path": path, "error": "Object not found", "signedURL": None})
+            else:
+                signed.append({"path": path, "error": None, **self.create_signed_url(path, expires_in)})
+        return signed
+
+    # Definido por último: o nome 'list' sombrearia o tipo nas anotações dos métodos seguintes
+    def list(self, path: str = "", options: dict = None) -> list[dict]:
+        """
+        Lista o conteúdo direto da pasta, com paginação como no storage3:
+        options = {"limit", "offset", "search", "sortBy": {"column", "order"}}
+        """
+        options = options or {}
+        limit = int(options.get("limit", DEFAULT_LIST_LIMIT))
+        offset = int(options.get("offset", 0))
+        search = options.get("search") or ""
+        sort_by = options.get("sortBy") or {}
+        column = sort_by.get("column", "name")
+        descending = str(sort_by.get("order", "asc")).lower() == "desc"
+
+        folder = self.backend.resolve(self.bucket_name, path) if path.strip("/") else self.backend.bucket_dir(self.bucket_name)
+        if not os.path.isdir(folder):
+            return []
+
+        entries = []
+        for entry in os.scandir(folder):
+            if entry.name.endswith(".tmp") or (search and not entry.name.startswith(search)):
+                continue
+            if entry.is_dir():
+                entries.append({"name": entry.name, "id": None, "updated_at": None, "created_at": None,
+                                "last_accessed_at": None, "metadata": None})
+                continue
+            relative_path = f"{path.strip('/')}/{entry.name}".lstrip("/")
+            metadata = self.backend.read_metadata(self.bucket_name, relative_path)
+            if metadata is None:
+                continue
+            entries.append({
+                "name": entry.name,
+                "id": metadata["sha256"],
+                "updated_at": _iso(metadata["updated_at"]),
+                "created_at": _iso(metadata["created_at"]),
+                "last_accessed_at": _iso(metadata["updated_at"]),
+                "metadata": {"size": metadata["size"], "mimetype": metadata["content_type"], "eTag": metadata["sha256"]},
+            })
+
+        # Pastas primeiro (como no Supabase), depois pela coluna pedida
+        entries.sort(key=lambda item: (item["id"] is not None, item.get(column) or ""), reverse=descending)
+        return entries[offset:offset + limit]
+
+
+class LocalStorageBackend:
+    """Raiz do armazenamento local: objetos por SHA-256, buckets e metadados (equivalente a client.storage)"""
+
+    def __init__(self, root_dir: str, base_url: str, signing_secret: str, public_buckets=LOCAL_PUBLIC_BUCKETS):
+        self.root_dir = os.path.abspath(root_dir)
+        self.base_url = base_url.rstrip("/")
+        self.signing_secret = signing_secret
+        self.public_buckets = set(public_buckets)
+        os.makedirs(os.path.join(self.root_dir, ".objects"), exist_ok=True)
+
+    def from_(self, bucket_name: str) -> LocalStorageBucket:
+        os.makedirs(self.bucket_dir(bucket_name), exist_ok=True)
+        return LocalStorageBucket(self, bucket_name)
+
+    def list_buckets(self) -> list:
+        return [
+            SimpleNamespace(id=entry.name, name=entry.name, public=entry.name in self.public_buckets)
+            for entry in sorted(os.scandir(self.root_dir), key=lambda e: e.name)
+            if entry.is_dir() and not entry.name.startswith(".")
+        ]
+
+    def bucket_dir(self, bucket_name: str) -> str:
+        if not bucket_name or bucket_name.startswith(".") or "/" in bucket_name:
+            raise ValueError(f"Bucket inválido: {bucket_name}")
+        return os.path.join(self.root_dir, bucket_name)
+
+    def resolve(self, bucket_name: str, path: str) -> str:
+        """Caminho no disco; recusa caminhos que escapem do bucket"""
+        bucket_dir = self.bucket_dir(bucket_name)
+        target = os.path.normpath(os.path.join(bucket_dir, path.lstrip("/")))
+        if os.path.commonpath([bucket_dir, target]) != bucket_dir or target == bucket_dir:
+            raise ValueError(f"Caminho inválido: {path}")
+        return target
+
+    def metadata_path(self, bucket_name: str, path: str) -> str:
+        relative = os.path.relpath(self.resolve(bucket_name, path), self.bucket_dir(bucket_name))
+        return os.path.join(self.root_dir, ".meta", bucket_name, f"{relative}.json")
+
+    def read_metadata(self, bucket_name: str, path: str) -> dict | None:
+        try:
+            with open(self.metadata_path(bucket_name, path), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def write_metadata(self, bucket_name: str, path: str, metadata: dict):
+        metadata_file = self.metadata_path(bucket_name, path)
+        os.makedirs(os.path.dirname(metadata_file), exist_ok=True)
+        with open(f"{metadata_file}.tmp", "w", encoding="utf-8") as f:
+            json.dump(metadata, f)
+        os.replace(f"{metadata_file}.tmp", metadata_file)
+
+    def object_path(self, sha256: str) -> str:
+        return os.path.join(self.root_dir, ".objects", sha256[:2], sha256)
+
+    def store_object(self, file) -> tuple[str, int]:
+        """Grava o conteúdo calculando o hash em blocos; conteúdo já existente não é duplicado"""
+        hasher = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.join(self.root_dir, ".objects"), prefix=".upload_")
+        try:
+            with os.fdopen(fd, "wb") as tmp_file:
+                if isinstance(file, (bytes, bytearray, memoryview)):
+                    chunks = [bytes(file)]
+                else:
+                    if hasattr(file, "seek"):
+                        file.seek(0)
+                    chunks = iter(lambda: file.read(COPY_CHUNK_SIZE), b"")
+                for chunk in chunks:
+                    hasher.update(chunk)
+                    tmp_file.write(chunk)
+                    size += len(chunk)
+
+            sha256 = hasher.hexdigest()
+            final_path = self.object_path(sha256)
+            os.makedirs(os.path.dirname(final_path), exist_ok=True)
+            if os.path.exists(final_path):
+                os.remove(tmp_path)
+            else:
+                os.replace(tmp_path, final_path)
+            return sha256, size
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def release_object(self, sha256: str):
+        """Remove o objeto quando nenhum caminho de bucket aponta mais para ele (só resta o link em .objects)"""
+        object_file = self.object_path(sha256)
+        try:
+            if os.stat(object_file).st_nlink <= 1:
+                os.remove(object_file)
+        except FileNotFoundError:
+            pass
+
+    def open_for_request(self, bucket_name: str, path: str) -> tuple[str, dict] | None:
+        """Arquivo e metadados de um objeto, para o servidor HTTP local"""
+        try:
+            target = self.resolve(bucket_name, path)
+        except ValueError:
+            return None
+        metadata = self.read_metadata(bucket_name, path)
+        if metadata is None or not os.path.isfile(target):
+            return None
+        return target, metadata
+
+
+class _LocalStorageRequestHandler(BaseHTTPRequestHandler):
+    backend: LocalStorageBackend = None
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def do_HEAD(self):
+        self._serve(send_body=False)
+
+    def do_GET(self):
+        self._serve(send_body=True)
+
+    def _serve(self, send_body: bool):
+        url = urlsplit(self.path)
+        if url.path.startswith(PUBLIC_PREFIX):
+            bucket_name, _, path = unquote(url.path[len(PUBLIC_PREFIX):]).partition("/")
+            if bucket_name not in self.backend.public_buckets:
+                return self.send_error(403, "Bucket privado")
+        elif url.path.startswith(SIGNED_PREFIX):
+            bucket_name, _, path = unquote(url.path[len(SIGNED_PREFIX):]).partition("/")
+            query = parse_qs(url.query)
+            try:
+                expires_at = int(query.get("expires", ["0"])[0])
+            except ValueError:
+                expires_at = 0
+            token = query.get("token", [""])[0]
+            if not verify_signature(self.backend.signing_secret, bucket_name, path, expires_at, token):
+                return self.send_error(403, "Assinatura inválida ou expirada")
+        else:
+            return self.send_error(404)
+
+        resolved = self.backend.open_for_request(bucket_name, path)
+        if resolved is None:
+            return self.send_error(404)
+        target, metadata = resolved
+
+        etag = f'"{metadata["sha256"]}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", metadata.get("content_type") or "application/octet-stream")
+        self.send_header("Content-Length", str(metadata["size"]))
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "max-age=3600")
+        self.end_headers()
+        if send_body:
+            with open(target, "rb") as f:
+                while chunk := f.read(COPY_CHUNK_SIZE):
+                    self.wfile.write(chunk)
+
+
+def start_local_storage_server(backend: LocalStorageBackend) -> ThreadingHTTPServer | None:
+    """Sobe (uma vez por processo) o servidor estático do endereço de base_url, se for local"""
+    url = urlsplit(backend.base_url)
+    if url.hostname not in ("127.0.0.1", "localhost", "0.0.0.0"):
+        return None
+
+    address = (url.hostname, url.port or 80)
+    with _server_lock:
+        if address not in _servers:
+            handler = type("LocalStorageRequestHandler", (_LocalStorageRequestHandler,), {"backend": backend})
+            server = ThreadingHTTPServer(address, handler)
+            threading.Thread(target=server.serve_forever, name="local-storage-server", daemon=True).start()
+            _servers[address] = server
+            logger.info(f"Servidor de arquivos local em {backend.base_url} ({backend.root_dir})")
+        return _servers[address]
+
+
+class LocalStorageClient:
+    """Substitui o cliente Supabase em SupabaseStorage: expõe .storage com a mesma interface"""
+    # Sem endpoint TUS: arquivos grandes são gravados em blocos direto no disco
+    supports_resumable_uploads = False
+
+    def __init__(self, settings: dict):
+        signing_secret = settings.get("signing_secret")
+        if not signing_secret:
+            # Sem segredo configurado as URLs assinadas valem só enquanto o processo viver
+            signing_secret = secrets.token_hex(32)
+            logger.warning("LOCAL_STORAGE_SECRET não definido; usando segredo temporário")
+        self.storage = LocalStorageBackend(settings["local_dir"], settings["local_url"], signing_secret)
+        start_local_storage_server(self.storage)
@@ -1,9 +1,11 @@
 import streamlit as st
 import pandas as pd
 import logging
-from datetime import datetime
+import json
+from datetime import datetime, date, timedelta
 from database.supabase_operations import SupabaseOperations
 from operations.audit_logger import log_action
+from operations.data_export import EXPORT_CHUNK_SIZE
 
 logger = logging.getLogger('abrangencia_app.matrix_manager')
 
@@ -181,6 +183,104 @@ class MatrixManager:
         
         return success
 
-    def get_audit_logs(self) -> pd.DataFrame:
-        """Retorna os logs de auditoria"""
-        return self.db.get_table_data("log_auditoria")
\ No newline at end of file
+    def _build_audit_log_filters(self, action: str = None, user_email: str = None, target_unit: str = None,
+                                 date_from: date = None, date_to: date = None) -> tuple[list[str], dict]:
+        """Monta as condições (e os parâmetros) das consultas de logs; cada filtro tem índice próprio"""
+        conditions = []
+        params = {}
+
+        if action:
+            conditions.append("action = :action")
+            params['action'] = action
+        if user_email and user_email.strip():
+            conditions.append("user_email = :user_email")
+            params['user_email'] = user_email.strip()
+        if target_unit:
+            conditions.append("target_unit = :target_unit")
+            params['target_unit'] = target_unit
+        if date_from:
+            conditions.append("timestamp >= :date_from")
+            params['date_from'] = datetime.combine(date_from, datetime.min.time())
+        if date_to:
+            conditions.append("timestamp < :date_to")
+            params['date_to'] = datetime.combine(date_to + timedelta(days=1), datetime.min.time())
+
+        return conditions, params
+
+    def get_audit_logs_page(self, per_page: int, before: tuple = None, **filters) -> tuple[pd.DataFrame, bool]:
+        """
+        Retorna uma página de logs (mais recentes primeiro) usando paginação por chave.
+
+        Args:
+            per_page: Quantidade de linhas da página
+            before: (timestamp, id) da última linha da página anterior; None para a primeira página
+            **filters: action, user_email, target_unit, date_from, date_to
+
+        Returns:
+            Tupla (DataFrame da página, se existe próxima página)
+        """
+        conditions, params = self._build_audit_log_filters(**filters)
+        if before:
+            conditions.append("(timestamp, id) < (:before_timestamp, :before_id)")
+            params['before_timestamp'], params['before_id'] = before
+
+        where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        # Uma linha a mais indica se há próxima página, sem precisar de COUNT
+        query = f"""
+            SELECT *
+            FROM log_auditoria
+            {where_clause}
+            ORDER BY timestamp DESC, id DESC
+            LIMIT :limit
+        """
+        page_df = self.db.execute_query(query, {**params, 'limit': per_page + 1})
+        has_next = len(page_df) > per_page
+        return page_df.head(per_page), has_next
+
+    @st.cache_data(ttl=120, show_spinner=False)
+    def estimate_audit_log_count(_self, **filters) -> int:
+        """
+        Estimativa do total de logs: pg_class.reltuples sem filtros, ou a estimativa
+        do planejador (EXPLAIN) com filtros. Evita COUNT(*) sobre milhões de linhas.
+        """
+        conditions, params = _self._build_audit_log_filters(**filters)
+        if not conditions:
+            result = _self.db.execute_query(
+                "SELECT reltuples::bigint AS estimate FROM pg_class WHERE oid = 'log_auditoria'::regclass"
+            )
+            estimate = int(result['estimate'].iloc[0]) if not result.empty else -1
+            # -1: tabela ainda não analisada
+            return estimate if estimate >= 0 else 0
+
+        plan_df = _self.db.execute_query(
+            f"EXPLAIN (FORMAT JSON) SELECT 1 FROM log_auditoria WHERE {' AND '.join(conditions)}", params
+        )
+        if plan_df.empty:
+            return 0
+        plan = plan_df.iloc[0, 0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+
+    @st.cache_data(ttl=600, show_spinner=False)
+    def get_audit_log_actions(_self) -> list[str]:
+        """Ações distintas registradas (varredura com saltos no índice de action)"""
+        result = _self.db.execute_query("""
+            WITH RECURSIVE actions AS (
+                SELECT MIN(action) AS action FROM log_auditoria
+                UNION ALL
+                SELECT (SELECT MIN(action) FROM log_auditoria WHERE action > actions.action)
+                FROM actions
+                WHERE actions.action IS NOT NULL
+            )
+            SELECT action FROM actions WHERE action IS NOT NULL
+        """)
+        return result['action'].tolist() if not result.empty else []
+
+    def stream_audit_logs(self, chunk_size: int = EXPORT_CHUNK_SIZE, **filters):
+        """Logs de auditoria (mais recentes primeiro) em blocos de um cursor do servidor (exportação)"""
+        conditions, params = self._build_audit_log_filters(**filters)
+        where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        return self.db.stream_query(
+            f"SELECT * FROM log_auditoria {where_clause} ORDER BY timestamp DESC, id DESC", params, chunk_size
+        )
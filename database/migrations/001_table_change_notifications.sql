@@ -0,0 +1,60 @@
+-- Notificações de mudança nas tabelas do app (LISTEN/NOTIFY)
+--
+-- Cada INSERT/UPDATE/DELETE publica no canal 'app_table_changes' um JSON com
+-- a tabela, a operação, o id da linha e a origem (app.origin da conexão que
+-- escreveu). Cada processo do Streamlit mantém um listener (database/change_listener.py)
+-- que invalida ou corrige o TableCache local ao receber a notificação.
+-- log_auditoria fica de fora: é lido direto do banco (sem cache) e um NOTIFY
+-- por linha de log só geraria tráfego.
+
+CREATE SCHEMA IF NOT EXISTS app;
+
+CREATE OR REPLACE FUNCTION app.notify_table_change()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    row_id text;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        row_id := OLD.id::text;
+    ELSE
+        row_id := NEW.id::text;
+    END IF;
+
+    PERFORM pg_notify(
+        'app_table_changes',
+        json_build_object(
+            'table', TG_TABLE_NAME,
+            'op', TG_OP,
+            'id', row_id,
+            'origin', current_setting('app.origin', true)
+        )::text
+    );
+    RETURN NULL;
+END;
+$$;
+
+DO $$
+DECLARE
+    tbl text;
+BEGIN
+    FOREACH tbl IN ARRAY ARRAY[
+        'incidentes',
+        'acoes_bloqueio',
+        'plano_de_acao_abrangencia',
+        'usuarios',
+        'utilities',
+        'solicitacoes_acesso'
+    ]
+    LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS trg_notify_table_change ON public.%I', tbl);
+        EXECUTE format(
+            'CREATE TRIGGER trg_notify_table_change
+                AFTER INSERT OR UPDATE OR DELETE ON public.%I
+                FOR EACH ROW EXECUTE FUNCTION app.notify_table_change()',
+            tbl
+        );
+    END LOOP;
+END;
+$$;
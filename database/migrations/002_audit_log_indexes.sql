@@ -0,0 +1,23 @@
+-- Índices do explorador de logs de auditoria (front/administracao.py)
+--
+-- A listagem usa paginação por chave (keyset) em (timestamp, id), do mais recente
+-- para o mais antigo. Cada filtro por igualdade tem um índice composto que já
+-- termina na ordenação da listagem, então o banco lê apenas as linhas da página.
+--
+-- Em tabelas grandes, prefira executar cada CREATE INDEX com CONCURRENTLY, fora
+-- de uma transação, para não bloquear as escritas de log durante a criação.
+
+CREATE INDEX IF NOT EXISTS idx_log_auditoria_timestamp_id
+    ON log_auditoria (timestamp DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_log_auditoria_action_timestamp_id
+    ON log_auditoria (action, timestamp DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_log_auditoria_user_email_timestamp_id
+    ON log_auditoria (user_email, timestamp DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_log_auditoria_target_unit_timestamp_id
+    ON log_auditoria (target_unit, timestamp DESC, id DESC);
+
+-- Mantém pg_class.reltuples (usado na estimativa de total) atualizado
+ANALYZE log_auditoria;
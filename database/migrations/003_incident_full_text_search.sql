@@ -0,0 +1,49 @@
+-- Busca textual de incidentes (front/dashboard.py → IncidentManager)
+--
+-- Configuração de busca em português que também remove acentos, colunas tsvector
+-- geradas em incidentes e acoes_bloqueio e índices GIN sobre elas. Sem esta
+-- migração o app usa um índice invertido em memória (operations/incident_search.py).
+
+CREATE SCHEMA IF NOT EXISTS app;
+CREATE EXTENSION IF NOT EXISTS unaccent;
+
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1
+        FROM pg_ts_config c
+        JOIN pg_namespace n ON c.cfgnamespace = n.oid
+        WHERE n.nspname = 'app' AND c.cfgname = 'portuguese_unaccent'
+    ) THEN
+        CREATE TEXT SEARCH CONFIGURATION app.portuguese_unaccent (COPY = portuguese);
+        ALTER TEXT SEARCH CONFIGURATION app.portuguese_unaccent
+            ALTER MAPPING FOR hword, hword_part, word WITH unaccent, portuguese_stem;
+    END IF;
+END;
+$$;
+
+-- Pesos: A = número do alerta e resumo, B = o que aconteceu, C = por que aconteceu
+ALTER TABLE incidentes
+    ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('app.portuguese_unaccent'::regconfig, coalesce(numero_alerta, '')), 'A') ||
+        setweight(to_tsvector('app.portuguese_unaccent'::regconfig, coalesce(evento_resumo, '')), 'A') ||
+        setweight(to_tsvector('app.portuguese_unaccent'::regconfig, coalesce(o_que_aconteceu, '')), 'B') ||
+        setweight(to_tsvector('app.portuguese_unaccent'::regconfig, coalesce(por_que_aconteceu, '')), 'C')
+    ) STORED;
+
+ALTER TABLE acoes_bloqueio
+    ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        to_tsvector('app.portuguese_unaccent'::regconfig, coalesce(descricao_acao, ''))
+    ) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_incidentes_search_vector
+    ON incidentes USING GIN (search_vector);
+
+CREATE INDEX IF NOT EXISTS idx_acoes_bloqueio_search_vector
+    ON acoes_bloqueio USING GIN (search_vector);
+
+-- Usado pelo EXISTS que procura ações de bloqueio do incidente
+CREATE INDEX IF NOT EXISTS idx_acoes_bloqueio_id_incidente
+    ON acoes_bloqueio (id_incidente);
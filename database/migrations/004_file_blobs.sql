@@ -0,0 +1,27 @@
+-- Índice de conteúdo dos arquivos enviados ao Storage (database/file_blobs.py)
+--
+-- Cada objeto enviado pelo app é registrado pelo SHA-256 completo do conteúdo.
+-- O upload de um arquivo já existente no mesmo bucket vira uma única consulta
+-- indexada (em vez de listar o bucket) e apenas incrementa refcount. A remoção
+-- decrementa refcount e só apaga o objeto quando não há mais referências.
+
+CREATE TABLE IF NOT EXISTS file_blobs (
+    id BIGSERIAL PRIMARY KEY,
+    sha256 CHAR(64) NOT NULL,
+    bucket TEXT NOT NULL,
+    path TEXT NOT NULL,
+    size BIGINT NOT NULL,
+    content_type TEXT,
+    refcount INTEGER NOT NULL DEFAULT 1 CHECK (refcount >= 0),
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_file_blobs_bucket_sha256
+    ON file_blobs (bucket, sha256);
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_file_blobs_bucket_path
+    ON file_blobs (bucket, path);
+
+-- Acesso apenas pela conexão do servidor (sem RLS por usuário)
+ALTER TABLE file_blobs ENABLE ROW LEVEL SECURITY;
@@ -0,0 +1,6 @@
+-- Remove o trigger de notificação de log_auditoria (criado por versões anteriores do 001)
+--
+-- Os logs de auditoria são lidos direto do banco pelo explorador de logs, sem
+-- passar pelo TableCache; o trigger só enviava um NOTIFY por linha de log.
+
+DROP TRIGGER IF EXISTS trg_notify_table_change ON public.log_auditoria;
@@ -0,0 +1,172 @@
+import time
+import base64
+import hashlib
+import logging
+import httpx
+
+logger = logging.getLogger('abrangencia_app.resumable_upload')
+
+TUS_VERSION = "1.0.0"
+# O Supabase Storage exige blocos de exatamente 6 MB (exceto o último)
+RESUMABLE_CHUNK_SIZE = 6 * 1024 * 1024
+# Arquivos maiores que isto são enviados em blocos, sem carregar o conteúdo inteiro na memória
+RESUMABLE_UPLOAD_THRESHOLD = 6 * 1024 * 1024
+HASH_CHUNK_SIZE = 1024 * 1024
+MAX_CHUNK_RETRIES = 5
+RETRY_BACKOFF_SECONDS = 1.0
+REQUEST_TIMEOUT_SECONDS = 60
+
+
+def get_file_size(file_obj) -> int | None:
+    """Tamanho do arquivo sem lê-lo (UploadedFile e BlobFile têm .size; demais via seek)"""
+    size = getattr(file_obj, 'size', None)
+    if isinstance(size, int):
+        return size
+    if hasattr(file_obj, 'seek') and hasattr(file_obj, 'tell'):
+        position = file_obj.tell()
+        size = file_obj.seek(0, 2)
+        file_obj.seek(position)
+        return size
+    return None
+
+
+def hash_file(file_obj, chunk_size: int = HASH_CHUNK_SIZE) -> str:
+    """SHA-256 calculado bloco a bloco; o arquivo volta para a posição 0"""
+    hasher = hashlib.sha256()
+    file_obj.seek(0)
+    while True:
+        chunk = file_obj.read(chunk_size)
+        if not chunk:
+            break
+        hasher.update(chunk)
+    file_obj.seek(0)
+    return hasher.hexdigest()
+
+
+def encode_metadata(metadata: dict) -> str:
+    """Cabeçalho Upload-Metadata do TUS: 'chave base64(valor)' separados por vírgula"""
+    return ",".join(
+        f"{key} {base64.b64encode(str(value).encode()).decode()}"
+        for key, value in metadata.items() if value is not None
+    )
+
+
+class TusUploader:
+    """
+    Cliente do protocolo TUS (upload em blocos retomável) usado pelo endpoint
+    /storage/v1/upload/resumable do Supabase. Se a conexão cair no meio do envio, o
+    deslocamento já gravado no servidor é consultado (HEAD) e o envio continua dali.
+    """
+
+    def __init__(self, endpoint: str, headers: dict = None, chunk_size: int = RESUMABLE_CHUNK_SIZE,
+                 max_retries: int = MAX_CHUNK_RETRIES, http_client: httpx.Client = None):
+        self.endpoint = endpoint
+        self.headers = {"Tus-Resumable": TUS_VERSION, **(headers or {})}
+        self.chunk_size = chunk_size
+        self.max_retries = max_retries
+        # Sem cliente externo, upload() cria um e o fecha ao terminar
+        self._http = http_client
+        # URL do upload em andamento, disponível mesmo se upload() falhar, para retomar depois
+        self.location = None
+
+    def create(self, size: int, metadata: dict) -> str:
+        """Cria o upload no servidor e retorna sua URL (cabeçalho Location)"""
+        response = self._http.post(self.endpoint, headers={
+            **self.headers,
+            "Upload-Length": str(size),
+            "Upload-Metadata": encode_metadata(metadata),
+        })
+        response.raise_for_status()
+        location = response.headers.get("Location")
+        if not location:
+            raise RuntimeError("Servidor TUS não retornou Location")
+        # Location pode ser relativa ao endpoint
+        return str(httpx.URL(self.endpoint).join(location))
+
+    def get_offset(self, location: str) -> int | None:
+        """Bytes já recebidos pelo servidor; None se o upload não existe mais (expirou)"""
+        response = self._http.head(location, headers=self.headers)
+        if response.status_code in (404, 410):
+            return None
+        response.raise_for_status()
+        return int(response.headers["Upload-Offset"])
+
+    def _require_offset(self, location: str) -> int:
+        offset = self.get_offset(location)
+        if offset is None:
+            raise RuntimeError("Upload expirou no servidor durante o envio")
+        return offset
+
+    def upload(self, file_obj, size: int, metadata: dict, location: str = None, progress_callback=None) -> str:
+        """
+        Envia o arquivo em blocos de chunk_size bytes.
+
+        Args:
+            file_obj: Arquivo com read/seek (não é lido inteiro)
+            size: Tamanho total em bytes
+            metadata: Metadados do upload (bucketName, objectName, contentType...)
+            location: URL de um upload anterior interrompido, para retomar
+            progress_callback: Chamado com (bytes enviados, total)
+
+        Returns:
+            URL do upload (Location); guarde-a antes da conclusão para poder retomar
+        """
+        owns_http = self._http is None
+        if owns_http:
+            self._http = httpx.Client(timeout=REQUEST_TIMEOUT_SECONDS)
+        try:
+            return self._send(file_obj, size, metadata, location, progress_callback)
+        finally:
+            if owns_http:
+                self._http.close()
+                self._http = None
+
+    def _send(self, file_obj, size: int, metadata: dict, location: str, progress_callback) -> str:
+        offset = self.get_offset(location) if location else None
+        if offset is None:
+            location = self.create(size, metadata)
+            offset = 0
+        elif offset:
+            logger.info(f"Retomando upload a partir de {offset / 1024 / 1024:.1f}MB")
+        self.location = location
+
+        retries = 0
+        while offset < size:
+            file_obj.seek(offset)
+            chunk = file_obj.read(self.chunk_size)
+            try:
+                response = self._http.patch(location, content=chunk, headers={
+                    **self.headers,
+                    "Upload-Offset": str(offset),
+                    "Content-Type": "application/offset+octet-stream",
+                })
+                if response.status_code >= 500:
+                    response.raise_for_status()
+                if response.status_code == 409:
+                    # Deslocamento divergente (bloco anterior gravado sem resposta): consulta o servidor.
+                    # Conta como tentativa: um servidor que insiste no 409 não pode prender a thread
+                    retries += 1
+                    if retries > self.max_retries:
+                        raise RuntimeError(f"Servidor TUS recusou o deslocamento {offset} {retries} vezes seguidas")
+                    offset = self._require_offset(location)
+                    continue
+                response.raise_for_status()
+                offset = int(response.headers["Upload-Offset"])
+                retries = 0
+            except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                is_server_error = isinstance(e, httpx.TransportError) or e.response.status_code >= 500
+                retries += 1
+                if not is_server_error or retries > self.max_retries:
+                    raise
+                logger.warning(f"Falha no bloco em {offset} ({e}); tentativa {retries}/{self.max_retries}")
+                time.sleep(RETRY_BACKOFF_SECONDS * 2 ** (retries - 1))
+                try:
+                    offset = self._require_offset(location)
+                except httpx.TransportError:
+                    # Servidor ainda inacessível: o próximo PATCH falha ou recebe 409 e sincroniza
+                    pass
+
+            if progress_callback:
+                progress_callback(offset, size)
+
+        return location
@@ -1,15 +1,23 @@
 import os
+import socket
 import streamlit as st
-from supabase import create_client, Client
 from sqlalchemy import create_engine
 from sqlalchemy.pool import NullPool
 import logging
 from dotenv import load_dotenv
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from supabase import Client
 
 load_dotenv()
 
 logger = logging.getLogger('abrangencia_app.supabase_config')
 
+# Identifica este processo nas notificações de mudança (app.origin), para que o
+# listener ignore as escritas que o próprio processo já aplicou no cache
+PROCESS_ORIGIN = f"{socket.gethostname()}-{os.getpid()}"
+
 def get_database_connection_string() -> str:
     """Retorna a connection string do PostgreSQL"""
     db_connection_string = None
@@ -67,7 +75,7 @@ def get_database_engine(user_email: str = None):
     try:
         connect_args = {
             "connect_timeout": 10,
-            "options": "-c timezone=America/Sao_Paulo"
+            "options": f"-c timezone=America/Sao_Paulo -c app.origin={PROCESS_ORIGIN}"
         }
         
         # Adiciona configuração de contexto de usuário para RLS
@@ -88,8 +96,11 @@ def get_database_engine(user_email: str = None):
         logger.critical(f"Erro ao criar database engine: {e}")
         raise
 
-def get_supabase_client() -> Client:
+def get_supabase_client() -> "Client":
     """Retorna um cliente Supabase configurado (para Storage e Auth)"""
+    # Importado só aqui: o pacote supabase é pesado e só serve ao Storage (a tela de login não o usa)
+    from supabase import create_client
+
     supabase_url, supabase_key = get_supabase_credentials()
     
     try:
@@ -100,10 +111,12 @@ def get_supabase_client() -> Client:
         logger.critical(f"Erro ao criar cliente Supabase: {e}")
         raise
 
-def get_supabase_admin_client() -> Client:
+def get_supabase_admin_client() -> "Client":
     """
     Retorna um cliente Supabase com privilégios administrativos (service_role).
     """
+    from supabase import create_client
+
     supabase_url, _ = get_supabase_credentials()
     
     # Busca a service_role key
@@ -137,6 +150,25 @@ def get_supabase_admin_client() -> Client:
         logger.critical(f"❌ Erro ao criar cliente admin: {e}")
         raise
 
+def get_storage_settings() -> dict:
+    """
+    Retorna o backend de arquivos: 'supabase' (padrão) ou 'local' (sistema de arquivos,
+    para testes e carga sem consumir a cota do Supabase; veja database/local_storage.py).
+    """
+    settings = {}
+    try:
+        if hasattr(st, 'secrets') and 'storage' in st.secrets:
+            settings = dict(st.secrets.storage)
+    except Exception as e:
+        logger.warning(f"Não foi possível ler de st.secrets: {e}")
+
+    return {
+        "backend": settings.get("backend") or os.getenv("STORAGE_BACKEND", "supabase"),
+        "local_dir": settings.get("local_dir") or os.getenv("LOCAL_STORAGE_DIR", ".local_storage"),
+        "local_url": settings.get("local_url") or os.getenv("LOCAL_STORAGE_URL", "http://127.0.0.1:8600"),
+        "signing_secret": settings.get("signing_secret") or os.getenv("LOCAL_STORAGE_SECRET", ""),
+    }
+
 # Nomes dos buckets no Supabase Storage
 PUBLIC_IMAGES_BUCKET = "public-images"
 RESTRICTED_ATTACHMENTS_BUCKET = "restricted-attachments"
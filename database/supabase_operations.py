@@ -4,9 +4,14 @@ import logging
 from datetime import datetime
 from sqlalchemy import text
 from .supabase_config import get_database_engine
+from .table_cache import TableCache, DEFAULT_TABLE_TTL
 
 logger = logging.getLogger('abrangencia_app.supabase_operations')
 
+# Colunas mantidas pelo banco que não devem ir para DataFrames nem para o TableCache
+# (search_vector: tsvector da busca textual, migração 003)
+INTERNAL_COLUMNS = ('search_vector',)
+
 class SupabaseOperations:
     _instance = None
 
@@ -30,12 +35,40 @@ class SupabaseOperations:
             logger.critical(f"Falha ao inicializar SupabaseOperations: {e}")
             self.engine = None
         
+        # Tabela -> lista de colunas sem INTERNAL_COLUMNS ('*' se a tabela não tiver nenhuma)
+        self._column_lists = {}
         self._initialized = True
 
-    def get_engine_with_rls(self):
+    def column_list(self, table_name: str, alias: str = None) -> str:
         """
-        MELHORADO: Valida se o usuário está autenticado antes de criar engine
+        Lista de colunas para SELECT/RETURNING sem as colunas internas, lida do catálogo uma vez
+        por processo (colunas novas exigem reiniciar o app). Em caso de falha usa '*'.
         """
+        if table_name not in self._column_lists:
+            try:
+                with self.engine.connect() as conn:
+                    columns = [row.column_name for row in conn.execute(text("""
+                        SELECT column_name
+                        FROM information_schema.columns
+                        WHERE table_schema = 'public' AND table_name = :table
+                        ORDER BY ordinal_position
+                    """), {"table": table_name})]
+            except Exception as e:
+                logger.warning(f"Não foi possível ler as colunas de '{table_name}': {e}")
+                return f"{alias}.*" if alias else "*"
+            if columns and any(column in INTERNAL_COLUMNS for column in columns):
+                self._column_lists[table_name] = [column for column in columns if column not in INTERNAL_COLUMNS]
+            else:
+                self._column_lists[table_name] = None
+
+        columns = self._column_lists[table_name]
+        if columns is None:
+            return f"{alias}.*" if alias else "*"
+        prefix = f"{alias}." if alias else ""
+        return ", ".join(f'{prefix}"{column}"' for column in columns)
+
+    def get_current_user_email(self) -> str | None:
+        """Retorna o e-mail do usuário da sessão (usado no contexto RLS e como escopo do cache)"""
         user_email = None
         
         if hasattr(st, 'session_state'):
@@ -43,6 +76,14 @@ class SupabaseOperations:
             if not user_email:
                 user_email = st.session_state.get('user_info_custom', {}).get('email')
         
+        return user_email
+
+    def get_engine_with_rls(self):
+        """
+        MELHORADO: Valida se o usuário está autenticado antes de criar engine
+        """
+        user_email = self.get_current_user_email()
+        
         # <<< ADICIONAR VALIDAÇÃO >>>
         if not user_email:
             logger.critical("⚠️ TENTATIVA DE ACESSO SEM AUTENTICAÇÃO!")
@@ -51,18 +92,35 @@ class SupabaseOperations:
         logger.info(f"✅ Criando engine com RLS para usuário: {user_email}")
         return get_database_engine(user_email)
 
-    @st.cache_data(ttl=300)  # Reduzido para 5 minutos
-    def get_table_data(_self, table_name: str) -> pd.DataFrame:
-        """Carrega todos os dados de uma tabela (com RLS aplicado)"""
-        if not _self.engine:
+    def get_table_data(self, table_name: str, ttl_seconds: int = DEFAULT_TABLE_TTL) -> pd.DataFrame:
+        """
+        Carrega todos os dados de uma tabela (com RLS aplicado).
+        Usa o TableCache compartilhado, mantido atualizado pelas escritas (write-through).
+        """
+        if not self.engine:
             logger.error("Database engine não está disponível")
             return pd.DataFrame()
         
         try:
-            engine = _self.get_engine_with_rls()
-            query = text(f"SELECT * FROM {table_name}")
-            with engine.connect() as conn:
-                df = pd.read_sql(query, conn)
+            engine = self.get_engine_with_rls()
+            scope = self.get_current_user_email()
+            cache = TableCache()
+            
+            cached_df = cache.get(table_name, scope, ttl_seconds)
+            if cached_df is not None:
+                return cached_df
+            
+            # Single-flight: se outra thread (ex.: warm-up) já está carregando, aguarda e reaproveita
+            with cache.load_lock(table_name, scope):
+                cached_df = cache.get(table_name, scope, ttl_seconds)
+                if cached_df is not None:
+                    return cached_df
+                
+                query = text(f"SELECT {self.column_list(table_name)} FROM {table_name}")
+                with engine.connect() as conn:
+                    df = pd.read_sql(query, conn)
+                
+                cache.put(table_name, scope, df)
             return df
         except Exception as e:
             logger.error(f"Erro ao carregar dados da tabela '{table_name}': {e}")
@@ -80,7 +138,7 @@ class SupabaseOperations:
             query = text(f"""
                 INSERT INTO {table_name} ({columns})
                 VALUES ({placeholders})
-                RETURNING *
+                RETURNING {self.column_list(table_name)}
             """)
             
             with engine.connect() as conn:
@@ -89,8 +147,9 @@ class SupabaseOperations:
                 row = result.fetchone()
                 
                 if row:
-                    st.cache_data.clear()
-                    return dict(row._mapping)
+                    inserted = dict(row._mapping)
+                    TableCache().apply_insert(table_name, self.get_current_user_email(), inserted)
+                    return inserted
             
             return None
         except Exception as e:
@@ -109,7 +168,7 @@ class SupabaseOperations:
             query = text(f"""
                 INSERT INTO {table_name} ({columns})
                 VALUES ({placeholders})
-                RETURNING *
+                RETURNING {self.column_list(table_name)}
             """)
             
             with engine.connect() as conn:
@@ -118,6 +177,9 @@ class SupabaseOperations:
                 row = result.fetchone()
                 
                 if row:
+                    # Sem RLS a linha pode pertencer a qualquer escopo: invalida todos.
+                    # O listener ignora as notificações deste processo, então o cache local depende disto
+                    TableCache().invalidate(table_name)
                     return dict(row._mapping)
             
             return None
@@ -125,6 +187,48 @@ class SupabaseOperations:
             logger.error(f"Erro ao inserir na tabela '{table_name}' sem RLS: {e}")
             return None
 
+    def insert_row_with_children(self, table_name: str, data: dict, child_table: str, foreign_key: str, children: list[dict]) -> dict | None:
+        """
+        Insere uma linha e suas linhas filhas em uma única transação (com RLS aplicado).
+        A chave estrangeira das filhas recebe o id da linha inserida; se qualquer
+        inserção falhar nada é gravado.
+        """
+        if not self.engine:
+            return None
+
+        try:
+            engine = self.get_engine_with_rls()
+            columns = ', '.join(data.keys())
+            placeholders = ', '.join([f':{key}' for key in data.keys()])
+            query = text(f"""
+                INSERT INTO {table_name} ({columns})
+                VALUES ({placeholders})
+                RETURNING {self.column_list(table_name)}
+            """)
+
+            with engine.begin() as conn:
+                row = conn.execute(query, data).fetchone()
+                if not row:
+                    return None
+                inserted = dict(row._mapping)
+
+                if children:
+                    child_rows = [{**child, foreign_key: inserted['id']} for child in children]
+                    child_columns = ', '.join(child_rows[0].keys())
+                    child_placeholders = ', '.join([f':{key}' for key in child_rows[0].keys()])
+                    conn.execute(text(f"""
+                        INSERT INTO {child_table} ({child_columns})
+                        VALUES ({child_placeholders})
+                    """), child_rows)
+
+            TableCache().apply_insert(table_name, self.get_current_user_email(), inserted)
+            if children:
+                TableCache().invalidate(child_table)
+            return inserted
+        except Exception as e:
+            logger.error(f"Erro ao inserir em '{table_name}' com '{child_table}': {e}")
+            return None
+
     def insert_batch(self, table_name: str, data_list: list[dict]) -> bool:
         """Insere múltiplas linhas de uma vez (com RLS aplicado)"""
         if not self.engine or not data_list:
@@ -143,7 +247,8 @@ class SupabaseOperations:
                 conn.execute(query, data_list)
                 conn.commit()
             
-            st.cache_data.clear()
+            # executemany com text() não suporta RETURNING: descarta apenas esta tabela
+            TableCache().invalidate(table_name)
             return True
         except Exception as e:
             logger.error(f"Erro ao inserir lote na tabela '{table_name}': {e}")
@@ -161,15 +266,18 @@ class SupabaseOperations:
                 UPDATE {table_name}
                 SET {set_clause}
                 WHERE id = :id
+                RETURNING {self.column_list(table_name)}
             """)
             
             params = {**updates, 'id': row_id}
             
             with engine.connect() as conn:
-                conn.execute(query, params)
+                result = conn.execute(query, params)
                 conn.commit()
+                row = result.fetchone()
             
-            st.cache_data.clear()
+            if row:
+                TableCache().apply_update(table_name, self.get_current_user_email(), row_id, dict(row._mapping))
             return True
         except Exception as e:
             logger.error(f"Erro ao atualizar linha na tabela '{table_name}': {e}")
@@ -188,7 +296,7 @@ class SupabaseOperations:
                 conn.execute(query, {'id': row_id})
                 conn.commit()
             
-            st.cache_data.clear()
+            TableCache().apply_delete(table_name, row_id)
             return True
         except Exception as e:
             logger.error(f"Erro ao deletar linha da tabela '{table_name}': {e}")
@@ -214,7 +322,7 @@ class SupabaseOperations:
         
         try:
             engine = self.get_engine_with_rls()
-            query = text(f"SELECT * FROM {table_name} WHERE {field} = :value")
+            query = text(f"SELECT {self.column_list(table_name)} FROM {table_name} WHERE {field} = :value")
             
             with engine.connect() as conn:
                 df = pd.read_sql(query, conn, params={'value': value})
@@ -234,7 +342,7 @@ class SupabaseOperations:
         
         try:
             # Usa engine padrão SEM contexto de usuário
-            query = text(f"SELECT * FROM {table_name} WHERE {field} = :value")
+            query = text(f"SELECT {self.column_list(table_name)} FROM {table_name} WHERE {field} = :value")
             
             with self.engine.connect() as conn:
                 df = pd.read_sql(query, conn, params={'value': value})
@@ -258,6 +366,24 @@ class SupabaseOperations:
             logger.error(f"Erro ao executar query customizada: {e}")
             return pd.DataFrame()
 
+    def stream_query(self, query: str, params: dict = None, chunk_size: int = 5000):
+        """
+        Executa uma query (com RLS aplicado) em um cursor do lado do servidor,
+        entregando as linhas em blocos sem materializar o resultado inteiro.
+
+        Yields:
+            Tupla (colunas, lista de linhas) para cada bloco de até chunk_size linhas
+        """
+        if not self.engine:
+            return
+
+        engine = self.get_engine_with_rls()
+        with engine.connect() as conn:
+            result = conn.execution_options(stream_results=True, yield_per=chunk_size).execute(text(query), params or {})
+            columns = list(result.keys())
+            for rows in result.partitions(chunk_size):
+                yield columns, rows
+
     def execute_non_query(self, query: str, params: dict = None) -> bool:
         """Executa uma query que não retorna dados (com RLS aplicado)"""
         if not self.engine:
@@ -269,6 +395,8 @@ class SupabaseOperations:
                 conn.execute(text(query), params or {})
                 conn.commit()
             
+            # Não é possível saber quais tabelas foram afetadas
+            TableCache().invalidate()
             st.cache_data.clear()
             return True
         except Exception as e:
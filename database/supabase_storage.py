@@ -2,14 +2,55 @@ import streamlit as st
 import logging
 import os
 import hashlib
+import mimetypes
+import threading
+import time
 from io import BytesIO
 from datetime import datetime
-from PIL import Image
-import io
-from .supabase_config import get_supabase_client, PUBLIC_IMAGES_BUCKET, RESTRICTED_ATTACHMENTS_BUCKET, ACTION_EVIDENCE_BUCKET
+from .file_blobs import FileBlobRegistry
+from .resumable_upload import TusUploader, RESUMABLE_UPLOAD_THRESHOLD, get_file_size, hash_file
+from .supabase_config import get_supabase_client, get_storage_settings, PUBLIC_IMAGES_BUCKET, RESTRICTED_ATTACHMENTS_BUCKET, ACTION_EVIDENCE_BUCKET
+from config.cache_config import IMAGE_RENDITIONS, IMAGE_RENDITION_QUALITY
+from operations.image_compression import compress_image_as, generate_renditions, IMAGE_FORMATS
+from operations.cpu_pool import CpuTaskPool, CpuPoolBusyError
 
 logger = logging.getLogger('abrangencia_app.supabase_storage')
 
+# Buckets cujas imagens ganham versões reduzidas no upload
+RENDITION_BUCKETS = (PUBLIC_IMAGES_BUCKET, ACTION_EVIDENCE_BUCKET)
+# Sufixo no nome do original indicando que as versões reduzidas existem
+RENDITION_MARKER = "_r"
+
+# Itens por página na listagem de buckets (limite padrão do Storage)
+LIST_PAGE_SIZE = 100
+
+# URLs assinadas são reaproveitadas até faltar este tempo (segundos) para expirarem
+SIGNED_URL_RENEW_MARGIN = 300
+
+def get_rendition_path(file_path: str, width: int) -> str:
+    """Caminho da versão reduzida: <nome>__w<largura>.webp, ao lado do original"""
+    stem, _ = os.path.splitext(file_path)
+    return f"{stem}__w{width}.webp"
+
+def get_image_rendition_url(url: str, display_width: int) -> str:
+    """
+    Retorna a URL da menor versão reduzida que cobre display_width pixels.
+    Imagens sem versões reduzidas (uploads antigos) ou maiores que todas as versões
+    usam a URL original.
+    """
+    if not isinstance(url, str) or not url.strip():
+        return url
+
+    base_url = url.split('?', 1)[0]
+    stem, _ = os.path.splitext(base_url)
+    if not stem.endswith(RENDITION_MARKER):
+        return url
+
+    for width in sorted(IMAGE_RENDITIONS.values()):
+        if width >= display_width:
+            return get_rendition_path(base_url, width)
+    return url
+
 class SupabaseStorage:
     """
     Gerencia operações de upload e download de arquivos no Supabase Storage.
@@ -27,70 +68,105 @@ class SupabaseStorage:
         if self._initialized:
             return
         
-        try:
-            # Usa o cliente admin para uploads (bypassa RLS)
-            from .supabase_config import get_supabase_admin_client
-            self.client = get_supabase_admin_client()
-            logger.info("SupabaseStorage inicializado com cliente administrativo")
-        except Exception as e:
-            logger.warning(f"Não foi possível inicializar cliente admin: {e}")
-            # Fallback para cliente normal
+        storage_settings = get_storage_settings()
+        if storage_settings["backend"] == "local":
+            # Arquivos em disco com a mesma interface (testes e carga sem usar a cota do Supabase).
+            # Sem fallback para o Supabase: um teste de carga consumiria justamente a cota que o backend protege
             try:
-                self.client = get_supabase_client()
-                logger.info("SupabaseStorage usando cliente padrão")
-            except Exception as e2:
-                logger.critical(f"Falha ao inicializar SupabaseStorage: {e2}")
+                from .local_storage import LocalStorageClient
+                self.client = LocalStorageClient(storage_settings)
+                logger.info(f"SupabaseStorage usando backend local em {storage_settings['local_dir']}")
+            except Exception as e:
+                logger.critical(f"Falha ao inicializar o backend local de arquivos ({storage_settings['local_url']}): {e}")
                 self.client = None
+        else:
+            try:
+                # Usa o cliente admin para uploads (bypassa RLS)
+                from .supabase_config import get_supabase_admin_client
+                self.client = get_supabase_admin_client()
+                logger.info("SupabaseStorage inicializado com cliente administrativo")
+            except Exception as e:
+                logger.warning(f"Não foi possível inicializar cliente admin: {e}")
+                # Fallback para cliente normal
+                try:
+                    self.client = get_supabase_client()
+                    logger.info("SupabaseStorage usando cliente padrão")
+                except Exception as e2:
+                    logger.critical(f"Falha ao inicializar SupabaseStorage: {e2}")
+                    self.client = None
         
+        # Cache de URLs assinadas por (bucket, caminho) -> (url, expira_em)
+        self._signed_urls = {}
+        self._signed_urls_lock = threading.Lock()
+        # Uploads em blocos interrompidos por (bucket, hash) -> {path, location}, para retomar
+        self._pending_uploads = {}
         self._initialized = True
 
-    def _compress_image(self, file_bytes: bytes, max_size_kb: int = 500) -> bytes:
+    def _compress_image(self, file_bytes: bytes, image_format: str = None) -> tuple[bytes, str | None]:
         """
-        Comprime imagens para reduzir uso de storage e egress.
+        Comprime imagens para reduzir uso de storage e egress (veja operations/image_compression.py).
         
         Args:
             file_bytes: Bytes da imagem original
-            max_size_kb: Tamanho máximo em KB (padrão: 500KB)
+            image_format: 'webp', 'avif' ou 'jpeg' (padrão: IMAGE_COMPRESSION['formats'])
         
         Returns:
-            Bytes da imagem comprimida
+            Tupla (bytes comprimidos, formato usado); os bytes originais e None se a imagem não puder ser processada
         """
         try:
-            # Abre a imagem
-            img = Image.open(io.BytesIO(file_bytes))
-            
-            # Converte RGBA para RGB se necessário
-            if img.mode == 'RGBA':
-                img = img.convert('RGB')
-            
-            # Redimensiona se for muito grande
-            max_dimension = 1920
-            if max(img.size) > max_dimension:
-                ratio = max_dimension / max(img.size)
-                new_size = tuple([int(dim * ratio) for dim in img.size])
-                img = img.resize(new_size, Image.Resampling.LANCZOS)
-            
-            # Comprime iterativamente até atingir o tamanho desejado
-            quality = 85
-            output = io.BytesIO()
-            
-            while quality > 20:
-                output.seek(0)
-                output.truncate()
-                img.save(output, format='JPEG', quality=quality, optimize=True)
-                size_kb = output.tell() / 1024
-                
-                if size_kb <= max_size_kb or quality <= 20:
-                    break
-                
-                quality -= 5
-            
-            logger.info(f"Imagem comprimida: {len(file_bytes)/1024:.1f}KB -> {output.tell()/1024:.1f}KB")
-            return output.getvalue()
-            
+            try:
+                # Roda em outro processo para não segurar o GIL das demais sessões
+                return CpuTaskPool().run(compress_image_as, file_bytes, image_format)
+            except CpuPoolBusyError:
+                # Melhor comprimir aqui mesmo do que gravar a foto original
+                logger.warning("Pool de CPU ocupado; comprimindo na própria thread")
+                return compress_image_as(file_bytes, image_format)
         except Exception as e:
             logger.warning(f"Falha ao comprimir imagem: {e}. Usando original.")
-            return file_bytes
+            return file_bytes, None
+
+    def _generate_renditions(self, file_bytes: bytes) -> dict[int, bytes]:
+        """
+        Gera as versões reduzidas (WebP) de uma imagem.
+        
+        Returns:
+            Dict {largura: bytes}; vazio se a imagem não puder ser processada
+        """
+        widths = list(IMAGE_RENDITIONS.values())
+        try:
+            try:
+                renditions = CpuTaskPool().run(generate_renditions, file_bytes, widths, IMAGE_RENDITION_QUALITY)
+            except CpuPoolBusyError:
+                # Como em _compress_image: melhor gerar aqui do que gravar a imagem sem versões reduzidas
+                logger.warning("Pool de CPU ocupado; gerando versões reduzidas na própria thread")
+                renditions = generate_renditions(file_bytes, widths, IMAGE_RENDITION_QUALITY)
+            logger.info("Versões reduzidas geradas: " + ", ".join(f"{w}px={len(b)/1024:.1f}KB" for w, b in renditions.items()))
+            return renditions
+        except Exception as e:
+            logger.warning(f"Falha ao gerar versões reduzidas: {e}")
+            return {}
+
+    def _upload_renditions(self, bucket_name: str, file_path: str, renditions: dict[int, bytes]) -> bool:
+        """Envia as versões reduzidas; em caso de falha remove as já enviadas"""
+        uploaded = []
+        try:
+            for width, rendition_bytes in renditions.items():
+                rendition_path = get_rendition_path(file_path, width)
+                self.client.storage.from_(bucket_name).upload(
+                    path=rendition_path,
+                    file=rendition_bytes,
+                    file_options={"content-type": "image/webp", "upsert": "true"}
+                )
+                uploaded.append(rendition_path)
+            return True
+        except Exception as e:
+            logger.warning(f"Falha ao enviar versões reduzidas: {e}")
+            if uploaded:
+                try:
+                    self.client.storage.from_(bucket_name).remove(uploaded)
+                except Exception:
+                    pass
+            return False
 
     def _calculate_file_hash(self, file_bytes: bytes) -> str:
         """
@@ -129,36 +205,50 @@ class SupabaseStorage:
         
         return unique_name
 
-    def _check_file_exists(self, bucket_name: str, file_hash: str) -> str | None:
+    def _object_paths(self, file_path: str) -> list[str]:
+        """Caminho do objeto e das suas versões reduzidas, se existirem"""
+        paths = [file_path]
+        if os.path.splitext(file_path)[0].endswith(RENDITION_MARKER):
+            paths += [get_rendition_path(file_path, width) for width in IMAGE_RENDITIONS.values()]
+        return paths
+
+    def _upload_resumable(self, bucket_name: str, file_path: str, file_obj, file_size: int,
+                          content_type: str | None, file_hash: str, progress_callback=None):
         """
-        Verifica se um arquivo com o mesmo hash já existe no bucket.
-        
-        Args:
-            bucket_name: Nome do bucket
-            file_hash: Hash do arquivo a verificar
-            
-        Returns:
-            URL pública do arquivo existente ou None se não encontrado
+        Envia o arquivo em blocos (TUS). Se o envio falhar, a URL do upload fica guardada
+        por (bucket, hash) e a próxima tentativa com o mesmo conteúdo continua de onde parou.
         """
+        pending_key = (bucket_name, file_hash)
+        pending = self._pending_uploads.get(pending_key)
+        location = pending['location'] if pending and pending['path'] == file_path else None
+
+        uploader = TusUploader(
+            f"{self.client.supabase_url}/storage/v1/upload/resumable",
+            headers={
+                "Authorization": f"Bearer {self.client.supabase_key}",
+                "apikey": self.client.supabase_key,
+                "x-upsert": "true",
+            }
+        )
         try:
-            # Lista todos os arquivos no bucket
-            files = self.client.storage.from_(bucket_name).list()
-            
-            # Procura por arquivos que começam com o hash
-            short_hash = file_hash[:8]
-            for file_info in files:
-                if file_info['name'].startswith(short_hash):
-                    logger.info(f"Arquivo duplicado encontrado: {file_info['name']}")
-                    return self.client.storage.from_(bucket_name).get_public_url(file_info['name'])
-            
-            return None
-        except Exception as e:
-            logger.warning(f"Erro ao verificar duplicatas: {e}")
-            return None
-
-    def upload_file(self, bucket_name: str, file_obj, file_path: str = None, content_type: str = None, check_duplicates: bool = True) -> str | None:
+            uploader.upload(file_obj, file_size, {
+                "bucketName": bucket_name,
+                "objectName": file_path,
+                "contentType": content_type,
+                "cacheControl": 3600,
+            }, location=location, progress_callback=progress_callback)
+        except Exception:
+            if uploader.location:
+                self._pending_uploads[pending_key] = {"path": file_path, "location": uploader.location}
+            raise
+        self._pending_uploads.pop(pending_key, None)
+
+    def upload_file(self, bucket_name: str, file_obj, file_path: str = None, content_type: str = None,
+                    check_duplicates: bool = True, progress_callback=None, image_format: str = None) -> str | None:
         """
         Faz upload de um arquivo para o Supabase Storage com detecção de duplicatas.
+        Arquivos acima de RESUMABLE_UPLOAD_THRESHOLD (exceto imagens, que são comprimidas em memória)
+        são enviados em blocos pelo protocolo TUS, sem carregar o conteúdo inteiro na memória.
         
         Args:
             bucket_name: Nome do bucket
@@ -166,6 +256,9 @@ class SupabaseStorage:
             file_path: Caminho/nome do arquivo no bucket (se None, gera automaticamente)
             content_type: MIME type do arquivo
             check_duplicates: Se True, verifica duplicatas antes de fazer upload
+            progress_callback: Chamado com (bytes enviados, total) durante o envio
+            image_format: Formato das imagens públicas comprimidas ('webp', 'avif' ou 'jpeg' para
+                clientes que só aceitam JPEG); padrão: IMAGE_COMPRESSION['formats']
         
         Returns:
             URL pública do arquivo ou None em caso de erro
@@ -175,51 +268,109 @@ class SupabaseStorage:
             return None
 
         try:
-            # Obtém os bytes do arquivo
-            if hasattr(file_obj, 'getvalue'):
-                file_bytes = file_obj.getvalue()
-            elif hasattr(file_obj, 'read'):
-                file_bytes = file_obj.read()
-            else:
+            if not hasattr(file_obj, 'getvalue') and not hasattr(file_obj, 'read'):
                 logger.error("Objeto de arquivo inválido")
                 return None
 
-            # <<< ADICIONE AQUI >>>
-            # Comprime imagens automaticamente
-            if content_type and content_type.startswith('image/') and bucket_name == PUBLIC_IMAGES_BUCKET:
-                file_bytes = self._compress_image(file_bytes, max_size_kb=300)
+            # Define o content-type se não fornecido (antes da compressão, que depende dele)
+            if not content_type and getattr(file_obj, 'type', None):
+                content_type = file_obj.type
+            if not content_type:
+                content_type = mimetypes.guess_type(getattr(file_obj, 'name', '') or file_path or '')[0]
+
+            is_image = bool(content_type and content_type.startswith('image/'))
+            # Extensão do formato para o qual a imagem foi convertida (None = mantém a original)
+            file_extension = None
+
+            file_size = get_file_size(file_obj) if hasattr(file_obj, 'seek') else None
+            streaming = not is_image and file_size is not None and file_size > RESUMABLE_UPLOAD_THRESHOLD
 
-            # Calcula o hash do arquivo
-            file_hash = self._calculate_file_hash(file_bytes)
+            if streaming:
+                # Hash incremental: o arquivo é lido em blocos e nunca inteiro na memória
+                file_bytes = None
+                file_hash = hash_file(file_obj)
+            else:
+                # Obtém os bytes do arquivo
+                file_bytes = file_obj.getvalue() if hasattr(file_obj, 'getvalue') else file_obj.read()
+
+                # Comprime imagens automaticamente
+                if is_image and bucket_name == PUBLIC_IMAGES_BUCKET:
+                    compressed_bytes, compressed_format = self._compress_image(file_bytes, image_format)
+                    if compressed_format:
+                        # O formato escolhido fica no content-type (Storage e file_blobs) e na extensão
+                        file_bytes = compressed_bytes
+                        content_type = IMAGE_FORMATS[compressed_format]['mime']
+                        file_extension = IMAGE_FORMATS[compressed_format]['extension']
+
+                # Calcula o hash do arquivo
+                file_hash = self._calculate_file_hash(file_bytes)
+                file_size = len(file_bytes)
             logger.info(f"Hash do arquivo: {file_hash}")
 
-            # Verifica se o arquivo já existe (se habilitado)
-            if check_duplicates:
-                existing_url = self._check_file_exists(bucket_name, file_hash)
-                if existing_url:
-                    logger.info(f"Arquivo duplicado encontrado. Retornando URL existente: {existing_url}")
+            # Verifica se o arquivo já existe (se habilitado): uma consulta indexada em file_blobs
+            blob_registry = FileBlobRegistry() if check_duplicates else None
+            if blob_registry:
+                existing = blob_registry.acquire(bucket_name, file_hash)
+                if existing:
+                    existing_url = self.client.storage.from_(bucket_name).get_public_url(existing['path'])
+                    logger.info(f"Arquivo duplicado encontrado ({existing['refcount']} referências). Retornando URL existente: {existing_url}")
                     return existing_url
 
             # Gera nome único se não foi fornecido
-            if not file_path:
+            generated_path = not file_path
+            pending = self._pending_uploads.get((bucket_name, file_hash)) if streaming else None
+            if generated_path and pending:
+                # Upload anterior do mesmo conteúdo interrompido: retoma no mesmo caminho
+                file_path = pending['path']
+            elif generated_path:
                 original_filename = getattr(file_obj, 'name', 'arquivo_sem_nome')
+                if file_extension:
+                    original_filename = os.path.splitext(original_filename)[0] + file_extension
                 file_path = self._generate_unique_filename(original_filename, file_hash)
 
-            # Define o content-type se não fornecido
-            if not content_type and hasattr(file_obj, 'type'):
-                content_type = file_obj.type
+                # Versões reduzidas ficam ao lado do original; o sufixo marca que existem
+                if is_image and bucket_name in RENDITION_BUCKETS:
+                    stem, extension = os.path.splitext(file_path)
+                    marked_path = f"{stem}{RENDITION_MARKER}{extension}"
+                    renditions = self._generate_renditions(file_bytes)
+                    if renditions and self._upload_renditions(bucket_name, marked_path, renditions):
+                        file_path = marked_path
 
             # Faz o upload
             logger.info(f"Fazendo upload para bucket '{bucket_name}': {file_path}")
             
-            response = self.client.storage.from_(bucket_name).upload(
-                path=file_path,
-                file=file_bytes,
-                file_options={
-                    "content-type": content_type,
-                    "upsert": "true"
-                } if content_type else {"upsert": "true"}
-            )
+            if streaming and getattr(self.client, 'supports_resumable_uploads', True):
+                self._upload_resumable(bucket_name, file_path, file_obj, file_size, content_type, file_hash, progress_callback)
+            elif streaming:
+                # Backend local: grava o arquivo em blocos a partir do próprio objeto
+                self.client.storage.from_(bucket_name).upload(
+                    path=file_path, file=file_obj,
+                    file_options={"content-type": content_type, "upsert": "true"}
+                )
+                if progress_callback:
+                    progress_callback(file_size, file_size)
+            else:
+                response = self.client.storage.from_(bucket_name).upload(
+                    path=file_path,
+                    file=file_bytes,
+                    file_options={
+                        "content-type": content_type,
+                        "upsert": "true"
+                    } if content_type else {"upsert": "true"}
+                )
+                if progress_callback:
+                    progress_callback(file_size, file_size)
+
+            # Registra o conteúdo; se um upload concorrente do mesmo arquivo registrou antes, usa o dele
+            if blob_registry and generated_path:
+                registered = blob_registry.register(bucket_name, file_hash, file_path, file_size, content_type)
+                if registered and registered['path'] != file_path:
+                    logger.info(f"Conteúdo já registrado por outro upload: {registered['path']}")
+                    try:
+                        self.client.storage.from_(bucket_name).remove(self._object_paths(file_path))
+                    except Exception as e:
+                        logger.warning(f"Não foi possível remover o upload redundante '{file_path}': {e}")
+                    file_path = registered['path']
 
             # Gera a URL pública
             public_url = self.client.storage.from_(bucket_name).get_public_url(file_path)
@@ -231,11 +382,12 @@ class SupabaseStorage:
             logger.error(f"Erro ao fazer upload para '{bucket_name}/{file_path}': {e}")
             return None
 
-    def upload_public_image(self, file_obj, filename: str = None) -> str | None:
+    def upload_public_image(self, file_obj, filename: str = None, image_format: str = None) -> str | None:
         """
         Upload de uma imagem pública (fotos de incidentes).
+        Use image_format='jpeg' quando o consumidor da imagem não aceitar WebP/AVIF.
         """
-        return self.upload_file(PUBLIC_IMAGES_BUCKET, file_obj, filename, check_duplicates=True)
+        return self.upload_file(PUBLIC_IMAGES_BUCKET, file_obj, filename, check_duplicates=True, image_format=image_format)
 
     def upload_restricted_attachment(self, file_obj, filename: str = None) -> str | None:
         """
@@ -252,13 +404,25 @@ class SupabaseStorage:
     def delete_file(self, bucket_name: str, file_path: str) -> bool:
         """
         Deleta um arquivo do Supabase Storage.
+        Arquivos deduplicados só são removidos quando a última referência é liberada.
         """
         if not self.client:
             return False
 
         try:
+            remaining = FileBlobRegistry().release(bucket_name, file_path)
+        except RuntimeError as e:
+            # Sem saber quantas referências restam, apagar poderia quebrar outros incidentes
+            logger.error(f"{e}. Arquivo '{file_path}' mantido")
+            return False
+
+        try:
+            if remaining:
+                logger.info(f"Arquivo '{file_path}' ainda tem {remaining} referência(s); objeto mantido")
+                return True
+
             logger.info(f"Deletando arquivo '{file_path}' do bucket '{bucket_name}'")
-            self.client.storage.from_(bucket_name).remove([file_path])
+            self.client.storage.from_(bucket_name).remove(self._object_paths(file_path))
             logger.info("Arquivo deletado com sucesso")
             return True
         except Exception as e:
@@ -304,20 +468,40 @@ class SupabaseStorage:
         
         return self.client.storage.from_(bucket_name).get_public_url(file_path)
 
-    def list_files(self, bucket_name: str, path: str = "") -> list:
+    def list_files(self, bucket_name: str, path: str = "", limit: int = LIST_PAGE_SIZE, offset: int = 0,
+                   search: str = None) -> list:
         """
-        Lista arquivos em um bucket/pasta.
+        Lista uma página de arquivos em um bucket/pasta.
+        
+        Args:
+            bucket_name: Nome do bucket
+            path: Pasta dentro do bucket
+            limit: Itens por página
+            offset: Itens a pular
+            search: Prefixo do nome
         """
         if not self.client:
             return []
 
         try:
-            files = self.client.storage.from_(bucket_name).list(path)
-            return files
+            options = {"limit": limit, "offset": offset, "sortBy": {"column": "name", "order": "asc"}}
+            if search:
+                options["search"] = search
+            return self.client.storage.from_(bucket_name).list(path, options)
         except Exception as e:
             logger.error(f"Erro ao listar arquivos: {e}")
             return []
 
+    def iter_files(self, bucket_name: str, path: str = "", page_size: int = LIST_PAGE_SIZE):
+        """Percorre todos os arquivos da pasta, página a página"""
+        offset = 0
+        while True:
+            page = self.list_files(bucket_name, path, limit=page_size, offset=offset)
+            yield from page
+            if len(page) < page_size:
+                return
+            offset += page_size
+
     def get_file_metadata(self, bucket_name: str, file_path: str) -> dict | None:
         """
         Obtém metadados de um arquivo.
@@ -326,18 +510,65 @@ class SupabaseStorage:
             return None
 
         try:
-            files = self.list_files(bucket_name)
-            for file_info in files:
-                if file_info['name'] == file_path:
+            folder, _, file_name = file_path.rpartition('/')
+            for file_info in self.list_files(bucket_name, folder, search=file_name):
+                if file_info['name'] == file_name:
                     return file_info
             return None
         except Exception as e:
             logger.error(f"Erro ao obter metadados: {e}")
             return None
 
+    def get_signed_urls(self, bucket_name: str, file_paths: list[str], expires_in: int = 3600) -> dict[str, str]:
+        """
+        Gera URLs assinadas em lote, reaproveitando as que ainda não estão perto de expirar.
+        Apenas os caminhos ausentes do cache geram uma (única) chamada a create_signed_urls.
+        
+        Args:
+            bucket_name: Nome do bucket
+            file_paths: Caminhos dos arquivos
+            expires_in: Tempo de expiração em segundos (padrão: 1 hora)
+        
+        Returns:
+            Dict {caminho: URL assinada}; caminhos com erro ficam de fora
+        """
+        now = time.time()
+        signed_urls = {}
+        missing_paths = []
+        
+        with self._signed_urls_lock:
+            for file_path in dict.fromkeys(file_paths):
+                cached = self._signed_urls.get((bucket_name, file_path))
+                if cached and cached[1] - SIGNED_URL_RENEW_MARGIN > now:
+                    signed_urls[file_path] = cached[0]
+                else:
+                    missing_paths.append(file_path)
+        
+        if not missing_paths or not self.client:
+            return signed_urls
+        
+        try:
+            response = self.client.storage.from_(bucket_name).create_signed_urls(missing_paths, expires_in)
+            expires_at = now + expires_in
+            
+            with self._signed_urls_lock:
+                for item in response:
+                    file_path = item.get('path')
+                    url = item.get('signedURL') or item.get('signedUrl')
+                    if file_path and url and not item.get('error'):
+                        self._signed_urls[(bucket_name, file_path)] = (url, expires_at)
+                        signed_urls[file_path] = url
+            
+            logger.info(f"{len(missing_paths)} URL(s) assinada(s) gerada(s) em lote para '{bucket_name}'")
+        except Exception as e:
+            logger.error(f"Erro ao gerar URLs assinadas: {e}")
+        
+        return signed_urls
+
     def get_signed_url(self, bucket_name: str, file_path: str, expires_in: int = 3600) -> str:
         """
         Gera uma URL assinada (temporária) para acessar arquivos privados.
+        Usa o mesmo cache de get_signed_urls.
         
         Args:
             bucket_name: Nome do bucket
@@ -347,15 +578,4 @@ class SupabaseStorage:
         Returns:
             URL assinada válida por 1 hora
         """
-        if not self.client:
-            return ""
-        
-        try:
-            response = self.client.storage.from_(bucket_name).create_signed_url(
-                file_path,
-                expires_in
-            )
-            return response.get('signedURL', '')
-        except Exception as e:
-            logger.error(f"Erro ao gerar URL assinada: {e}")
-            return ""
\ No newline at end of file
+        return self.get_signed_urls(bucket_name, [file_path], expires_in).get(file_path, "")
\ No newline at end of file
@@ -0,0 +1,155 @@
+import threading
+import logging
+from datetime import datetime
+import pandas as pd
+
+logger = logging.getLogger('abrangencia_app.table_cache')
+
+# TTL padrão (segundos) das tabelas em cache
+DEFAULT_TABLE_TTL = 300
+
+
+class TableCache:
+    """
+    Cache compartilhado (por processo) de tabelas inteiras com manutenção write-through.
+
+    Cada entrada é indexada por (tabela, escopo), onde o escopo é o e-mail do usuário
+    usado no contexto RLS. Após escritas bem-sucedidas o DataFrame em cache é corrigido
+    no lugar (append, update por id, drop por id) em vez de ser descartado, e a versão
+    da tabela é incrementada para que caches derivados saibam que precisam ser refeitos.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            logger.info("Criando instância única de TableCache")
+            cls._instance = super().__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+
+        self._lock = threading.RLock()
+        self._entries = {}   # (tabela, escopo) -> {"df": DataFrame, "loaded_at": datetime}
+        self._versions = {}  # tabela -> int
+        self._extended_ttl = None  # definido enquanto o listener de notificações está ativo
+        self._load_locks = {}  # (tabela, escopo) -> Lock, evita cargas duplicadas simultâneas
+        self._initialized = True
+
+    def get(self, table_name: str, scope: str, ttl_seconds: int = DEFAULT_TABLE_TTL) -> pd.DataFrame | None:
+        """Retorna uma cópia da tabela em cache ou None se ausente/expirada"""
+        with self._lock:
+            entry = self._entries.get((table_name, scope))
+            if entry is None:
+                return None
+
+            if self._extended_ttl:
+                ttl_seconds = max(ttl_seconds, self._extended_ttl)
+            age = (datetime.now() - entry["loaded_at"]).total_seconds()
+            if age >= ttl_seconds:
+                del self._entries[(table_name, scope)]
+                return None
+
+            # Cópia: os chamadores adicionam colunas e convertem tipos no DataFrame recebido
+            return entry["df"].copy()
+
+    def load_lock(self, table_name: str, scope: str) -> threading.Lock:
+        """Lock por entrada: threads que carregam a mesma tabela aguardam a primeira carga"""
+        with self._lock:
+            return self._load_locks.setdefault((table_name, scope), threading.Lock())
+
+    def put(self, table_name: str, scope: str, df: pd.DataFrame):
+        """Armazena a tabela carregada do banco"""
+        with self._lock:
+            self._entries[(table_name, scope)] = {"df": df.copy(), "loaded_at": datetime.now()}
+
+    def set_extended_ttl(self, ttl_seconds: int | None):
+        """
+        Estende o TTL de todas as tabelas enquanto as invalidações entre processos
+        (LISTEN/NOTIFY) estão ativas. None volta ao TTL informado pelos chamadores.
+        """
+        with self._lock:
+            self._extended_ttl = ttl_seconds
+
+    def version(self, table_name: str) -> int:
+        """Versão atual da tabela (incrementada a cada escrita ou invalidação)"""
+        with self._lock:
+            return self._versions.get(table_name, 0)
+
+    def versions(self, *table_names: str) -> tuple:
+        """Tupla de versões, útil como chave de caches derivados (joins, agregações)"""
+        with self._lock:
+            return tuple(self._versions.get(name, 0) for name in table_names)
+
+    def _bump(self, table_name: str):
+        self._versions[table_name] = self._versions.get(table_name, 0) + 1
+
+    def _drop_other_scopes(self, table_name: str, scope: str):
+        """
+        Remove as entradas da tabela de outros usuários: com RLS não é possível saber
+        localmente se a linha alterada é visível para eles, então recarregam do banco.
+        """
+        for key in [k for k in self._entries if k[0] == table_name and k[1] != scope]:
+            del self._entries[key]
+
+    def apply_insert(self, table_name: str, scope: str, row: dict):
+        """Acrescenta a linha retornada pelo INSERT ... RETURNING * ao cache"""
+        with self._lock:
+            entry = self._entries.get((table_name, scope))
+            if entry is not None:
+                new_row = pd.DataFrame([row])
+                df = entry["df"]
+                entry["df"] = new_row if df.empty else pd.concat([df, new_row], ignore_index=True)
+            self._drop_other_scopes(table_name, scope)
+            self._bump(table_name)
+
+    def apply_update(self, table_name: str, scope: str, row_id, row: dict):
+        """Atualiza a linha com o id informado usando os valores retornados pelo UPDATE"""
+        with self._lock:
+            entry = self._entries.get((table_name, scope))
+            if entry is not None:
+                df = entry["df"]
+                if 'id' in df.columns:
+                    mask = df['id'] == row_id
+                    if mask.any():
+                        for col, value in row.items():
+                            if col not in df.columns:
+                                df[col] = None
+                            try:
+                                df.loc[mask, col] = value
+                            except (TypeError, ValueError):
+                                df[col] = df[col].astype(object)
+                                df.loc[mask, col] = value
+                    else:
+                        # Linha passou a ser visível para este usuário
+                        entry["df"] = pd.concat([df, pd.DataFrame([row])], ignore_index=True)
+                else:
+                    del self._entries[(table_name, scope)]
+            self._drop_other_scopes(table_name, scope)
+            self._bump(table_name)
+
+    def apply_delete(self, table_name: str, row_id):
+        """Remove a linha com o id informado de todas as entradas da tabela"""
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == table_name]:
+                df = self._entries[key]["df"]
+                if 'id' in df.columns:
+                    self._entries[key]["df"] = df[df['id'] != row_id].reset_index(drop=True)
+                else:
+                    del self._entries[key]
+            self._bump(table_name)
+
+    def invalidate(self, table_name: str = None):
+        """Descarta a tabela informada (ou todas) do cache"""
+        with self._lock:
+            if table_name is None:
+                for name in {k[0] for k in self._entries} | set(self._versions):
+                    self._bump(name)
+                self._entries.clear()
+                return
+
+            for key in [k for k in self._entries if k[0] == table_name]:
+                del self._entries[key]
+            self._bump(table_name)
@@ -1,15 +1,18 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime, date, timedelta
+from operations.coverage_matrix import summarize_uninitiated_analyses
 
 PRAZO_ANALISE_DIAS = 30
 
 @st.cache_data(ttl=300)
-def load_comprehensive_admin_data():
+def load_comprehensive_admin_data(table_versions: tuple = ()):
     """
     Carrega e processa todos os dados, calculando as duas categorias de pendências:
     1. Análises não iniciadas e vencidas.
     2. Ações de planos de ação com prazo vencido.
+
+    table_versions (TableCache) serve apenas como chave de cache.
     """
     from operations.incident_manager import get_incident_manager
     from database.matrix_manager import get_matrix_manager
@@ -32,38 +35,26 @@ def load_comprehensive_admin_data():
         all_actions_df['descricao_acao'] = "N/A"
     all_actions_df['descricao_acao'] = all_actions_df['descricao_acao'].fillna("N/A")
 
-    uninitiated_analyses_list = []
+    expected_cols = ["Incidente", "Data do Incidente", "UOs Pendentes", "count", "unidades"]
+    uninitiated_analyses_df = pd.DataFrame(columns=expected_cols)
+    uninitiated_counts = pd.Series(dtype=int, name="Análises Atrasadas")
     overdue_actions_df = pd.DataFrame()
 
     if not all_incidents_df.empty and all_units:
         all_incidents_df['data_evento_dt'] = pd.to_datetime(all_incidents_df['data_evento'], format="%d/%m/%Y", errors='coerce')
-        deadline_for_analysis = date.today() - timedelta(days=PRAZO_ANALISE_DIAS)
-        
-        units_who_analyzed_by_incident = {}
-        if not all_actions_df.empty:
-            actions_with_incident_id = pd.merge(
-                all_actions_df, 
-                blocking_actions_df[['id', 'id_incidente']], 
-                left_on='id_acao_bloqueio', right_on='id', how='left'
+        deadline_for_analysis = pd.Timestamp(date.today() - timedelta(days=PRAZO_ANALISE_DIAS))
+        overdue_incidents = all_incidents_df[all_incidents_df['data_evento_dt'] < deadline_for_analysis]
+
+        coverage_df = pd.DataFrame(columns=['id_incidente', 'unidade_operacional'])
+        if not all_actions_df.empty and not blocking_actions_df.empty:
+            coverage_df = pd.merge(
+                all_actions_df[['id_acao_bloqueio', 'unidade_operacional']],
+                blocking_actions_df[['id', 'id_incidente']],
+                left_on='id_acao_bloqueio', right_on='id', how='inner'
             )
-            grouped = actions_with_incident_id.groupby('id_incidente')['unidade_operacional'].unique()
-            units_who_analyzed_by_incident = {index: set(values) for index, values in grouped.items()}
 
-        set_all_units = set(all_units)
-        
-        for _, incident in all_incidents_df.iterrows():
-            incident_date = incident['data_evento_dt']
-            if pd.notna(incident_date) and incident_date.date() < deadline_for_analysis:
-                units_that_analyzed = units_who_analyzed_by_incident.get(incident['id'], set())
-                pending_units = set_all_units - units_that_analyzed
-                if pending_units:
-                    uninitiated_analyses_list.append({
-                        "Incidente": incident['evento_resumo'],
-                        "Data do Incidente": incident['data_evento'],
-                        "UOs Pendentes": ", ".join(sorted(list(pending_units))),
-                        "count": len(pending_units),
-                        "unidades": list(pending_units)
-                    })
+        # Matriz incidente × unidade em vez de diferença de conjuntos por incidente
+        uninitiated_analyses_df, uninitiated_counts = summarize_uninitiated_analyses(overdue_incidents, all_units, coverage_df)
 
         if not all_actions_df.empty:
             pending_execution = all_actions_df[~all_actions_df['status'].str.lower().isin(['concluído', 'cancelado'])].copy()
@@ -71,15 +62,14 @@ def load_comprehensive_admin_data():
                 pending_execution['prazo_dt'] = pd.to_datetime(pending_execution['prazo_inicial'], format="%d/%m/%Y", errors='coerce')
                 overdue_actions_df = pending_execution.dropna(subset=['prazo_dt'])[pending_execution['prazo_dt'].dt.date < date.today()]
 
-    expected_cols = ["Incidente", "Data do Incidente", "UOs Pendentes", "count", "unidades"]
-    uninitiated_analyses_df = pd.DataFrame(uninitiated_analyses_list, columns=expected_cols)
-    
-    return uninitiated_analyses_df, overdue_actions_df, all_incidents_df, all_units
+    return uninitiated_analyses_df, uninitiated_counts, overdue_actions_df, all_incidents_df, all_units
 
 def display_admin_summary_dashboard():
     st.header("Dashboard de Resumo Executivo Global")
     
-    uninitiated_df, overdue_df, incidents_df, units_list = load_comprehensive_admin_data()
+    from database.table_cache import TableCache
+    table_versions = TableCache().versions("incidentes", "plano_de_acao_abrangencia", "acoes_bloqueio", "usuarios", "utilities")
+    uninitiated_df, uninitiated_counts, overdue_df, incidents_df, units_list = load_comprehensive_admin_data(table_versions)
 
     if not units_list:
         st.info("Nenhuma unidade operacional encontrada. Cadastre usuários e associe-os a unidades.")
@@ -114,10 +104,6 @@ def display_admin_summary_dashboard():
     
     st.subheader("Visão Geral de Pendências por Unidade")
     
-    uninitiated_counts = pd.Series(dtype=int)
-    if not uninitiated_df.empty:
-        uninitiated_counts = uninitiated_df.explode('unidades').groupby('unidades').size().rename("Análises Atrasadas")
-    
     overdue_action_counts = pd.Series(dtype=int)
     if not overdue_df.empty:
         overdue_action_counts = overdue_df.groupby('unidade_operacional').size().rename("Ações Vencidas")
@@ -5,13 +5,18 @@ from database.matrix_manager import get_matrix_manager
 from operations.incident_manager import get_incident_manager
 from auth.auth_utils import check_permission
 from operations.audit_logger import log_action
-from AI.api_Operation import PDFQA
 from front.admin_dashboard import display_admin_summary_dashboard
+from front.dashboard import render_export_controls
+from front.similar_incidents import render_similar_incidents
+from config.cache_config import PAGINATION
 from front.supabase_monitor import display_supabase_monitor
+from front.performance_panel import display_performance_panel
 from database.supabase_storage import SupabaseStorage
+from database.supabase_config import PUBLIC_IMAGES_BUCKET, RESTRICTED_ATTACHMENTS_BUCKET
 from operations.pdf_processor import PDFProcessor
+from operations.temp_blob_store import TempBlobStore
+from operations.upload_pipeline import register_incident_with_attachments
 from io import BytesIO
-from supabase import create_client
 
 # --- LÓGICA DE NEGÓCIO PARA CADASTRO DE INCIDENTE ---
 
@@ -45,17 +50,14 @@ def analyze_incident_document(attachment_file, photo_file, alert_number, use_ai=
             raise ValueError("A análise falhou ou não retornou dados válidos.")
 
         # Armazena os dados extraídos e os arquivos para upload posterior
+        blob_store = TempBlobStore()
         st.session_state.incident_data_for_confirmation = {
             **analysis_result,
             "numero_alerta": alert_number,
             "analysis_method": "IA" if use_ai else "Tradicional",
-            # Armazena os arquivos em memória para upload depois
-            "photo_file_bytes": photo_file.getvalue(),
-            "photo_file_name": photo_file.name,
-            "photo_file_type": photo_file.type,
-            "attachment_file_bytes": attachment_file.getvalue(),
-            "attachment_file_name": attachment_file.name,
-            "attachment_file_type": attachment_file.type
+            # Arquivos ficam em disco até a confirmação; a sessão guarda apenas os handles
+            "photo_file_blob": blob_store.put(photo_file),
+            "attachment_file_blob": blob_store.put(attachment_file)
         }
         st.session_state.analysis_complete = True
         log_action("PDF_ANALYSIS_SUCCESS", {"alert_number": alert_number, "method": "IA" if use_ai else "Tradicional"})
@@ -146,11 +148,17 @@ def display_incident_registration_tab():
         else:
             st.info("📄 Dados extraídos usando processamento tradicional")
 
+        render_similar_incidents(data, key_prefix="admin_incident")
+
         with st.form("confirm_incident_form"):
             col1, col2 = st.columns([1, 2])
             with col1:
-                # Mostra a foto em memória
-                st.image(data['photo_file_bytes'], caption="Foto do Incidente", use_container_width=True)
+                # Mostra a foto a partir do arquivo temporário
+                blob_store = TempBlobStore()
+                if blob_store.exists(data.get('photo_file_blob')):
+                    st.image(blob_store.get_path(data['photo_file_blob']), caption="Foto do Incidente", use_container_width=True)
+                else:
+                    st.warning("A foto expirou. Envie os arquivos novamente.")
             
             with col2:
                 edited_evento_resumo = st.text_input("Resumo do Evento", value=data.get('evento_resumo', ''))
@@ -176,65 +184,53 @@ def display_incident_registration_tab():
                 if not all([edited_evento_resumo, edited_data_evento, edited_o_que_aconteceu]) or len(edited_recomendacoes) == 0:
                     st.error("Todos os campos de texto e a lista de recomendações devem ser preenchidos.")
                 else:
+                    # Converte DataFrame para lista de strings
+                    if isinstance(edited_recomendacoes, pd.DataFrame):
+                        recomendacoes_list = edited_recomendacoes["Descrição da Ação"].tolist()
+                    else:
+                        recomendacoes_list = edited_recomendacoes if isinstance(edited_recomendacoes, list) else []
+
                     with st.spinner("Fazendo upload dos arquivos e salvando no banco de dados..."):
-                        # AGORA faz o upload dos arquivos
-                        from io import BytesIO
-                        storage = SupabaseStorage()
-                        
-                        # Reconstrói os objetos de arquivo a partir dos bytes armazenados
-                        photo_file_obj = BytesIO(data['photo_file_bytes'])
-                        photo_file_obj.name = data['photo_file_name']
-                        # photo_file_obj.type não é necessário para BytesIO
-                        
-                        attachment_file_obj = BytesIO(data['attachment_file_bytes'])
-                        attachment_file_obj.name = data['attachment_file_name']
-                        # attachment_file_obj.type não é necessário para BytesIO
-                        
-                        # Upload da foto
-                        photo_url = storage.upload_public_image(photo_file_obj)
-                        
-                        # Upload do anexo
-                        anexos_url = storage.upload_restricted_attachment(attachment_file_obj)
-                        
-                        if not photo_url or not anexos_url:
+                        # AGORA faz o upload dos arquivos (em paralelo) e grava incidente + ações em uma transação
+                        blob_store = TempBlobStore()
+                        upload_progress = st.progress(0.0, text="Enviando arquivos...")
+                        try:
+                            new_incident_id, uploads_ok = register_incident_with_attachments(
+                                get_incident_manager(),
+                                attachments={
+                                    "foto_url": (PUBLIC_IMAGES_BUCKET, data['photo_file_blob']),
+                                    "anexos_url": (RESTRICTED_ATTACHMENTS_BUCKET, data['attachment_file_blob']),
+                                },
+                                incident_fields={
+                                    "numero_alerta": str(data['numero_alerta']),
+                                    "evento_resumo": str(edited_evento_resumo) if edited_evento_resumo else "",
+                                    "data_evento": edited_data_evento if edited_data_evento else datetime.now().date(),
+                                    "o_que_aconteceu": str(edited_o_que_aconteceu) if edited_o_que_aconteceu else "",
+                                    "por_que_aconteceu": str(edited_por_que_aconteceu) if edited_por_que_aconteceu else "",
+                                },
+                                descriptions=recomendacoes_list,
+                                on_progress=lambda fraction: upload_progress.progress(fraction, text=f"Enviando arquivos... {fraction:.0%}")
+                            )
+                        except FileNotFoundError:
+                            st.error("Os arquivos enviados expiraram. Envie e analise o documento novamente.")
+                            return
+
+                        if not uploads_ok:
                             st.error("Falha no upload de um ou mais arquivos para o Supabase Storage.")
                             return
-                        
-                        # Salva no banco de dados
-                        incident_manager = get_incident_manager()
-                        
-                        new_incident_id = incident_manager.add_incident(
-                            numero_alerta=str(data['numero_alerta']),
-                            evento_resumo=str(edited_evento_resumo) if edited_evento_resumo else "",
-                            data_evento=edited_data_evento if edited_data_evento else datetime.now().date(),
-                            o_que_aconteceu=str(edited_o_que_aconteceu) if edited_o_que_aconteceu else "",
-                            por_que_aconteceu=str(edited_por_que_aconteceu) if edited_por_que_aconteceu else "",
-                            foto_url=photo_url,
-                            anexos_url=anexos_url
-                        )
 
                         if new_incident_id:
-                            # Converte DataFrame para lista de strings
-                            if isinstance(edited_recomendacoes, pd.DataFrame):
-                                recomendacoes_list = edited_recomendacoes["Descrição da Ação"].tolist()
-                            else:
-                                recomendacoes_list = edited_recomendacoes if isinstance(edited_recomendacoes, list) else []
-                            
-                            success_actions = incident_manager.add_blocking_actions_batch(new_incident_id, recomendacoes_list)
-                            
-                            if success_actions:
-                                st.success(f"✅ Alerta '{edited_evento_resumo}' salvo com sucesso!")
-                                log_action("REGISTER_INCIDENT", {"incident_id": new_incident_id, "alert_number": data['numero_alerta']})
-                                # Limpa o estado
-                                for key in ['analysis_complete', 'incident_data_for_confirmation', 'error', 'processing']:
-                                    if key in st.session_state:
-                                        del st.session_state[key]
-                                st.rerun()
-                            else:
-                                st.error("O incidente foi salvo, mas falhou ao salvar as recomendações.")
-                                log_action("REGISTER_INCIDENT_ACTIONS_FAILURE", {"incident_id": new_incident_id})
+                            st.success(f"✅ Alerta '{edited_evento_resumo}' salvo com sucesso!")
+                            log_action("REGISTER_INCIDENT", {"incident_id": new_incident_id, "alert_number": data['numero_alerta']})
+                            blob_store.discard(data.get('photo_file_blob'))
+                            blob_store.discard(data.get('attachment_file_blob'))
+                            # Limpa o estado
+                            for key in ['analysis_complete', 'incident_data_for_confirmation', 'error', 'processing']:
+                                if key in st.session_state:
+                                    del st.session_state[key]
+                            st.rerun()
                         else:
-                            st.error("Falha ao salvar o alerta na planilha.")
+                            st.error("Falha ao salvar o alerta e suas recomendações no banco de dados.")
                             log_action("REGISTER_INCIDENT_FAILURE", {"alert_number": data['numero_alerta']})
 
 @st.dialog("Gerenciar Usuário")
@@ -319,6 +315,8 @@ def user_dialog(user_data=None):
 
 def display_storage_test_tab():
     """Testa as configurações de Storage e API keys"""
+    from supabase import create_client
+
     st.header("🔍 Teste de Configuração de Storage")
     
     st.info("Use esta aba para diagnosticar problemas de autenticação com o Supabase Storage.")
@@ -497,7 +495,7 @@ service_role_key = "sua_service_role_key_aqui"
         if st.button("🧪 Testar SupabaseStorage", width='stretch'):
             with st.spinner("Testando a classe SupabaseStorage..."):
                 try:
-                    from database.supabase_storage import SupabaseStorage
+                    from database.supabase_config import PUBLIC_IMAGES_BUCKET, RESTRICTED_ATTACHMENTS_BUCKET
                     storage = SupabaseStorage()
                     
                     if not storage.client:
@@ -513,7 +511,8 @@ service_role_key = "sua_service_role_key_aqui"
                     test_file.name = "test_class.txt"
                     # test_file.type não é necessário para BytesIO
                     
-                    url = storage.upload_public_image(test_file)
+                    # Sem deduplicação: o arquivo de teste não é referenciado por nenhuma linha
+                    url = storage.upload_file(PUBLIC_IMAGES_BUCKET, test_file, check_duplicates=False)
                     
                     if url:
                         st.success(f"✅ Upload via classe funcionou!")
@@ -532,6 +531,64 @@ service_role_key = "sua_service_role_key_aqui"
 
 # --- PÁGINA PRINCIPAL ---
 
+@st.fragment
+def display_audit_log_explorer():
+    """Explorador de logs: filtros aplicados no banco e paginação por (timestamp, id)"""
+    matrix_manager = get_matrix_manager()
+
+    col_action, col_user, col_unit, col_dates = st.columns(4)
+    action = col_action.selectbox("Ação", options=["Todas"] + matrix_manager.get_audit_log_actions(), key="audit_log_action")
+    user_email = col_user.text_input("E-mail do usuário", key="audit_log_user_email")
+    target_unit = col_unit.selectbox("Unidade", options=["Todas"] + matrix_manager.get_all_units(), key="audit_log_unit")
+    date_range = col_dates.date_input("Período", value=(), format="DD/MM/YYYY", key="audit_log_date_range")
+
+    date_from = date_to = None
+    if isinstance(date_range, (list, tuple)):
+        if len(date_range) >= 1:
+            date_from = date_range[0]
+        if len(date_range) == 2:
+            date_to = date_range[1]
+
+    filters = {
+        "action": None if action == "Todas" else action,
+        "user_email": user_email or None,
+        "target_unit": None if target_unit == "Todas" else target_unit,
+        "date_from": date_from,
+        "date_to": date_to,
+    }
+
+    # Pilha com o cursor inicial de cada página visitada; reinicia quando os filtros mudam
+    if st.session_state.get('audit_log_filters') != filters:
+        st.session_state.audit_log_filters = filters
+        st.session_state.audit_log_cursors = [None]
+    cursors = st.session_state.audit_log_cursors
+
+    per_page = PAGINATION['logs_per_page']
+    logs_df, has_next = matrix_manager.get_audit_logs_page(per_page, before=cursors[-1], **filters)
+
+    estimate = matrix_manager.estimate_audit_log_count(**filters)
+    st.caption(f"Aproximadamente {estimate:,} registro(s)".replace(",", ".") + f" · página {len(cursors)}")
+
+    if logs_df.empty:
+        st.info("Nenhum registro de log encontrado.")
+    else:
+        st.dataframe(logs_df, width='stretch', hide_index=True)
+
+    col_prev, _, col_next = st.columns([1, 2, 1])
+    if col_prev.button("◀ Mais recentes", key="audit_log_prev", disabled=len(cursors) <= 1, width='stretch'):
+        cursors.pop()
+        st.rerun(scope="fragment")
+    if col_next.button("Mais antigos ▶", key="audit_log_next", disabled=not has_next, width='stretch'):
+        last_row = logs_df.iloc[-1]
+        cursors.append((pd.Timestamp(last_row['timestamp']).to_pydatetime(), int(last_row['id'])))
+        st.rerun(scope="fragment")
+
+    with st.expander("📤 Exportar logs filtrados"):
+        render_export_controls(
+            "audit_logs", lambda: matrix_manager.stream_audit_logs(**filters),
+            sheet_title="Logs de Auditoria", file_prefix="log_auditoria"
+        )
+
 def show_admin_page():
     check_permission(level='admin')
     st.title("🚀 Painel de Administração")
@@ -539,14 +596,15 @@ def show_admin_page():
         st.error("Acesso restrito ao Administrador Global."); st.stop()
     
     # <<< ADICIONE A NOVA ABA AQUI >>>
-    tab_dashboard, tab_incident, tab_users, tab_requests, tab_logs, tab_storage_test, tab_monitor = st.tabs([
+    tab_dashboard, tab_incident, tab_users, tab_requests, tab_logs, tab_storage_test, tab_monitor, tab_performance = st.tabs([
         "📊 Dashboard Global", 
         "➕ Cadastrar Alerta", 
         "👥 Gerenciar Usuários", 
         "📥 Solicitações", 
         "📜 Logs",
         "🔧 Teste Storage",
-        "📊 Monitor Supabase"  # <<< NOVA ABA
+        "📊 Monitor Supabase",  # <<< NOVA ABA
+        "⏱️ Desempenho"
     ])
 
     with tab_dashboard:
@@ -576,11 +634,7 @@ def show_admin_page():
 
     with tab_logs:
         st.header("📜 Logs de Auditoria do Sistema")
-        matrix_manager = get_matrix_manager()
-        logs_df = matrix_manager.get_audit_logs()
-        if not logs_df.empty:
-            st.dataframe(logs_df.sort_values(by='timestamp', ascending=False), width='stretch', hide_index=True)
-        else: st.info("Nenhum registro de log encontrado.")
+        display_audit_log_explorer()
 
     with tab_requests:
         st.header("Solicitações de Acesso Pendentes")
@@ -613,3 +667,6 @@ def show_admin_page():
 
     with tab_monitor:
         display_supabase_monitor()
+
+    with tab_performance:
+        display_performance_panel()
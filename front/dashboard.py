@@ -5,7 +5,13 @@ from auth.auth_utils import check_permission
 from operations.incident_manager import get_incident_manager, IncidentManager
 from operations.audit_logger import log_action
 from database.matrix_manager import get_matrix_manager
-from operations.data_loader import DataCache
+from config.cache_config import PAGINATION
+from operations.data_export import EXPORT_FORMATS, export_rows, discard_export
+from database.supabase_storage import SupabaseStorage, get_image_rendition_url
+from database.supabase_config import RESTRICTED_ATTACHMENTS_BUCKET
+
+# Largura aproximada de um card no grid de 3 colunas (layout wide, telas de alta densidade)
+CARD_IMAGE_WIDTH = 800
 
 def convert_drive_url_to_displayable(url: str) -> str | None:
     # Generalized for Supabase or any http(S) public URL.
@@ -22,6 +28,27 @@ def get_cached_image_url(url: str) -> str:
     """Cache de URLs de imagens para reduzir requisições"""
     return url
 
+def get_abrangencia_inputs_key(incident_id) -> str:
+    return f"abrangencia_inputs_{incident_id}"
+
+def load_abrangencia_inputs(incident, incident_manager: IncidentManager) -> dict:
+    """
+    Carrega uma única vez, enquanto o diálogo está aberto, as ações de bloqueio e as
+    listas de responsáveis/unidades. Os reruns dos toggles reaproveitam esses dados.
+    """
+    state_key = get_abrangencia_inputs_key(incident['id'])
+    if state_key not in st.session_state:
+        matrix_manager = get_matrix_manager()
+        user_map, user_names = matrix_manager.get_utilities_users()
+        is_admin = st.session_state.get('unit_name') == 'Global'
+        st.session_state[state_key] = {
+            "blocking_actions": incident_manager.get_blocking_actions_by_incident(incident['id']),
+            "user_map": user_map,
+            "user_names": user_names,
+            "all_units": matrix_manager.get_all_units() if is_admin else [],
+        }
+    return st.session_state[state_key]
+
 @st.dialog("Análise de Abrangência do Incidente", width="large")
 def abrangencia_dialog(incident, incident_manager: IncidentManager):
     st.subheader(incident.get('evento_resumo'))
@@ -30,20 +57,22 @@ def abrangencia_dialog(incident, incident_manager: IncidentManager):
     st.markdown(f"**O que aconteceu?**"); st.write(incident.get('o_que_aconteceu'))
     st.markdown(f"**Por que aconteceu?**"); st.write(incident.get('por_que_aconteceu'))
     st.divider()
-    blocking_actions = incident_manager.get_blocking_actions_by_incident(incident['id'])
+    inputs = load_abrangencia_inputs(incident, incident_manager)
     
-    if blocking_actions.empty:
+    if inputs["blocking_actions"].empty:
         st.success("Não há ações de bloqueio sugeridas para este incidente."); 
         if st.button("Fechar"): st.rerun()
         return
 
     st.subheader("Selecione as ações aplicáveis e defina os responsáveis")
     st.info("Ative uma ação para habilitar os campos e incluí-la no plano de ação.")
+    abrangencia_form_fragment(incident, incident_manager, inputs)
 
-    def force_fragment_rerun(): pass
-    
-    matrix_manager = get_matrix_manager()
-    user_map, user_names = matrix_manager.get_utilities_users()
+@st.fragment
+def abrangencia_form_fragment(incident, incident_manager: IncidentManager, inputs: dict):
+    """Toggles e formulário do diálogo: cada toggle reexecuta apenas este trecho"""
+    blocking_actions = inputs["blocking_actions"]
+    user_map, user_names = inputs["user_map"], inputs["user_names"]
     
     # <<< MUDANÇA AQUI: Permite que utilities tenha pessoas sem unidade >>>
     if not user_names:
@@ -53,7 +82,7 @@ def abrangencia_dialog(incident, incident_manager: IncidentManager):
 
     is_admin = st.session_state.get('unit_name') == 'Global'
     if is_admin:
-        all_units = matrix_manager.get_all_units()
+        all_units = inputs["all_units"]
         # Adiciona opção para "sem unidade" ou digitação manual
         options = ["-- Digitar nome da UO --", "-- Pessoa sem UO (utilities) --"] + all_units
         chosen_option = st.selectbox("Selecione a Unidade Operacional (UO) de destino", options=options, key="admin_uo_selector")
@@ -65,7 +94,7 @@ def abrangencia_dialog(incident, incident_manager: IncidentManager):
     
     st.markdown("---")
     for _, action in blocking_actions.iterrows():
-        st.toggle(action['descricao_acao'], key=f"toggle_{action['id']}", on_change=force_fragment_rerun)
+        st.toggle(action['descricao_acao'], key=f"toggle_{action['id']}")
     st.divider()
 
     with st.form("abrangencia_form_data"):
@@ -143,16 +172,25 @@ def abrangencia_dialog(incident, incident_manager: IncidentManager):
                     log_action("ADD_ACTION_PLAN_ITEM", {"plan_id": new_id, "desc": action_data['descricao'], "target_unit": unit_to_save})
         
         st.success(f"{saved_count} ação(ões) salvas com sucesso!")
+        st.session_state.pop(get_abrangencia_inputs_key(incident['id']), None)
         import time; time.sleep(2); st.rerun()
 
-def render_incident_card(incident, col, incident_manager, is_pending):
+def get_restricted_attachment_path(anexos_url) -> str | None:
+    """Extrai o caminho do arquivo quando o anexo está no bucket restrito"""
+    if isinstance(anexos_url, str) and f"{RESTRICTED_ATTACHMENTS_BUCKET}/" in anexos_url:
+        return anexos_url.split(f"{RESTRICTED_ATTACHMENTS_BUCKET}/")[-1]
+    return None
+
+def render_incident_card(incident, col, incident_manager, is_pending, signed_urls: dict = None):
     with col.container(border=True):
         foto_url = incident.get('foto_url')
         if pd.notna(foto_url) and isinstance(foto_url, str) and foto_url.strip():
             display_url = convert_drive_url_to_displayable(foto_url)
             if display_url: 
-                cached_url = get_cached_image_url(display_url)
+                cached_url = get_cached_image_url(get_image_rendition_url(display_url, CARD_IMAGE_WIDTH))
                 st.image(cached_url, use_container_width=True)
+                if cached_url != display_url:
+                    st.caption(f"[🔍 Ver imagem original]({display_url})")
             else: 
                 st.caption("Imagem não disponível ou URL inválida")
         else:
@@ -165,15 +203,12 @@ def render_incident_card(incident, col, incident_manager, is_pending):
         anexos_url = incident.get('anexos_url')
         if pd.notna(anexos_url) and isinstance(anexos_url, str) and anexos_url.strip():
             # Extrai o caminho do arquivo da URL
-            if 'restricted-attachments' in anexos_url:
-                from database.supabase_storage import SupabaseStorage
-                storage = SupabaseStorage()
-                
-                # Extrai apenas o nome do arquivo
-                file_path = anexos_url.split('restricted-attachments/')[-1]
-                
-                # Gera URL assinada válida por 1 hora
-                signed_url = storage.get_signed_url('restricted-attachments', file_path, 3600)
+            file_path = get_restricted_attachment_path(anexos_url)
+            if file_path:
+                # URLs da página são geradas em lote em render_incident_grid (cache por processo)
+                signed_url = (signed_urls or {}).get(file_path)
+                if not signed_url:
+                    signed_url = SupabaseStorage().get_signed_url(RESTRICTED_ATTACHMENTS_BUCKET, file_path, 3600)
                 
                 if signed_url:
                     st.markdown(f"**[Ver Análise Completa ]({signed_url})**")
@@ -185,77 +220,153 @@ def render_incident_card(incident, col, incident_manager, is_pending):
         st.write("") 
         if is_pending:
             if st.button("Analisar Abrangência", key=f"analisar_{incident['id']}", type="primary", width='stretch'):
+                # Descarta dados de uma abertura anterior do diálogo
+                st.session_state.pop(get_abrangencia_inputs_key(incident['id']), None)
                 abrangencia_dialog(incident, incident_manager)
         else: st.success("✔ Análise Registrada", icon="✅")
 
-def display_incident_list(incident_manager: IncidentManager):
-    st.title("Dashboard de Incidentes")
-    
-    # <<< USA CACHE PERSISTENTE >>>
-    all_incidents_df = DataCache.get_or_load(
-        key="all_incidents",
-        loader_func=incident_manager.get_all_incidents,
-        ttl_seconds=300  # 5 minutos
+def render_incident_filters() -> dict:
+    """Barra de busca e filtro por data; os filtros são aplicados na consulta ao banco"""
+    col_search, col_dates = st.columns([2, 1])
+    search = col_search.text_input("🔍 Buscar", placeholder="Alerta, resumo, causas ou ações de bloqueio...", key="incident_search")
+    date_range = col_dates.date_input("Período do evento", value=(), key="incident_date_range", format="DD/MM/YYYY")
+
+    date_from = date_to = None
+    if isinstance(date_range, (list, tuple)):
+        if len(date_range) >= 1:
+            date_from = date_range[0]
+        if len(date_range) == 2:
+            date_to = date_range[1]
+
+    filters = {"search": search, "date_from": date_from, "date_to": date_to}
+
+    # Volta para a primeira página quando os filtros mudam
+    if st.session_state.get('incident_filters') != filters:
+        st.session_state.incident_filters = filters
+        for key in [k for k in st.session_state.keys() if k.startswith('incident_page_')]:
+            del st.session_state[key]
+
+    return filters
+
+def render_pagination(section: str, total: int, per_page: int, item_label: str = "incidente(s)") -> int:
+    """Controles de paginação; retorna a página atual (1-based)"""
+    total_pages = max((total + per_page - 1) // per_page, 1)
+    page_key = f"incident_page_{section}"
+    page = min(st.session_state.get(page_key, 1), total_pages)
+
+    if total_pages > 1:
+        col_prev, col_info, col_next = st.columns([1, 2, 1])
+        if col_prev.button("◀ Anterior", key=f"prev_{section}", disabled=page <= 1, width='stretch'):
+            page -= 1
+        if col_next.button("Próxima ▶", key=f"next_{section}", disabled=page >= total_pages, width='stretch'):
+            page += 1
+        col_info.caption(f"Página {page} de {total_pages} · {total} {item_label}")
+
+    st.session_state[page_key] = page
+    return page
+
+def render_export_controls(export_key: str, stream_factory, sheet_title: str, file_prefix: str):
+    """
+    Gera sob demanda um arquivo CSV/Excel a partir de um cursor do servidor e o entrega
+    via st.download_button. O arquivo é gravado em disco em blocos.
+
+    O botão de download só aparece na execução que gerou o arquivo: o download_button lê o
+    arquivo inteiro para a memória, e renderizá-lo a cada rerun manteria essa cópia enquanto a
+    página estiver aberta. Depois de entregue ao Streamlit o arquivo é apagado do disco.
+
+    Args:
+        export_key: Identificador único dos controles na página
+        stream_factory: Função sem argumentos que retorna o iterável de (colunas, linhas)
+    """
+    state_key = f"export_{export_key}"
+    col_format, col_generate, col_download = st.columns([1, 1, 1])
+    export_format = col_format.selectbox(
+        "Formato", options=list(EXPORT_FORMATS.keys()),
+        format_func=lambda fmt: EXPORT_FORMATS[fmt]['label'], key=f"{state_key}_format", label_visibility="collapsed"
     )
-    
-    if all_incidents_df.empty:
-        st.info("Nenhum incidente cadastrado no sistema ainda.")
+
+    if not col_generate.button("📤 Gerar arquivo", key=f"{state_key}_generate", width='stretch'):
         return
+
+    with st.spinner("Gerando arquivo..."):
+        try:
+            path, total = export_rows(stream_factory(), export_format, sheet_title)
+        except Exception as e:
+            st.error(f"Falha ao gerar exportação: {e}")
+            return
+
+    file_format = EXPORT_FORMATS[export_format]
+    try:
+        with open(path, "rb") as export_file:
+            # on_click="ignore": baixar não reroda a página (o botão sumiria antes do download)
+            col_download.download_button(
+                f"⬇️ Baixar ({total} linhas)", data=export_file,
+                file_name=f"{file_prefix}_{datetime.now().strftime('%Y%m%d_%H%M')}{file_format['extension']}",
+                mime=file_format['mime'], key=f"{state_key}_download", width='stretch', on_click="ignore"
+            )
+    finally:
+        discard_export(path)
+    st.caption("O arquivo fica disponível até a próxima interação com a página.")
+
+def render_incident_grid(incident_manager: IncidentManager, section: str, total: int, is_pending: bool, **filters):
+    """Renderiza apenas os cards da página visível"""
+    per_page = PAGINATION['incidents_per_page']
+    page = render_pagination(section, total, per_page)
+    page_incidents = incident_manager.get_incidents_page(page, per_page, **filters).to_dict('records')
+
+    # Uma única chamada de URLs assinadas para todos os anexos restritos da página
+    restricted_paths = [path for path in (get_restricted_attachment_path(i.get('anexos_url')) for i in page_incidents) if path]
+    signed_urls = SupabaseStorage().get_signed_urls(RESTRICTED_ATTACHMENTS_BUCKET, restricted_paths, 3600) if restricted_paths else {}
+
+    cols = st.columns(3)
+    for idx, incident in enumerate(page_incidents):
+        render_incident_card(incident, cols[idx % 3], incident_manager, is_pending=is_pending, signed_urls=signed_urls)
+
+def display_incident_list(incident_manager: IncidentManager):
+    st.title("Dashboard de Incidentes")
     
+    filters = render_incident_filters()
     user_unit = st.session_state.get('unit_name', 'Global')
     
     if user_unit != 'Global':
-        # Cache específico por unidade
-        covered_ids = DataCache.get_or_load(
-            key=f"covered_incidents_{user_unit}",
-            loader_func=incident_manager.get_covered_incident_ids_for_unit,
-            ttl_seconds=300,
-            unit_name=user_unit
-        )
-        
-        # Separa incidentes pendentes e analisados
-        all_incidents_df['id_str'] = all_incidents_df['id'].astype(str)
-        pending_df = all_incidents_df[~all_incidents_df['id_str'].isin(covered_ids)]
-        analyzed_df = all_incidents_df[all_incidents_df['id_str'].isin(covered_ids)]
+        # Pendentes/analisados são separados no banco pela cobertura da unidade
+        pending_filters = {**filters, "unit_name": user_unit, "covered": False}
+        analyzed_filters = {**filters, "unit_name": user_unit, "covered": True}
+        total_pending = incident_manager.count_incidents(**pending_filters)
+        total_analyzed = incident_manager.count_incidents(**analyzed_filters)
     else:
         # Admin vê todos como pendentes para análise global
-        pending_df = all_incidents_df
-        analyzed_df = pd.DataFrame()
-    
-    # Ordena por data (mais recente primeiro)
-    if 'data_evento' in pending_df.columns:
-        pending_df['data_dt'] = pd.to_datetime(pending_df['data_evento'], format='%d/%m/%Y', errors='coerce')
-        pending_df = pending_df.sort_values('data_dt', ascending=False)
+        pending_filters = filters
+        analyzed_filters = None
+        total_pending = incident_manager.count_incidents(**pending_filters)
+        total_analyzed = 0
     
-    if not analyzed_df.empty and 'data_evento' in analyzed_df.columns:
-        analyzed_df['data_dt'] = pd.to_datetime(analyzed_df['data_evento'], format='%d/%m/%Y', errors='coerce')
-        analyzed_df = analyzed_df.sort_values('data_dt', ascending=False)
+    if total_pending == 0 and total_analyzed == 0:
+        if any(filters.values()):
+            st.info("Nenhum incidente encontrado com os filtros selecionados.")
+        else:
+            st.info("Nenhum incidente cadastrado no sistema ainda.")
+        return
     
     # Exibe métricas
     col1, col2 = st.columns(2)
-    col1.metric("📋 Incidentes Pendentes de Análise", len(pending_df))
-    col2.metric("✅ Incidentes Já Analisados", len(analyzed_df))
+    col1.metric("📋 Incidentes Pendentes de Análise", total_pending)
+    col2.metric("✅ Incidentes Já Analisados", total_analyzed)
     
     st.divider()
     
     # Renderiza incidentes pendentes
-    if not pending_df.empty:
+    if total_pending > 0:
         st.subheader("🔴 Pendentes de Análise de Abrangência")
-        cols = st.columns(3)
-        for idx, (_, incident) in enumerate(pending_df.iterrows()):
-            col = cols[idx % 3]
-            render_incident_card(incident, col, incident_manager, is_pending=True)
+        render_incident_grid(incident_manager, "pending", total_pending, is_pending=True, **pending_filters)
     else:
         st.success("🎉 Parabéns! Todos os incidentes já foram analisados pela sua unidade.")
     
     # Renderiza incidentes já analisados
-    if not analyzed_df.empty:
+    if total_analyzed > 0:
         st.divider()
-        with st.expander(f"✅ Ver {len(analyzed_df)} Incidentes Já Analisados", expanded=False):
-            cols = st.columns(3)
-            for idx, (_, incident) in enumerate(analyzed_df.iterrows()):
-                col = cols[idx % 3]
-                render_incident_card(incident, col, incident_manager, is_pending=False)
+        with st.expander(f"✅ Ver {total_analyzed} Incidentes Já Analisados", expanded=False):
+            render_incident_grid(incident_manager, "analyzed", total_analyzed, is_pending=False, **analyzed_filters)
 
 def show_dashboard_page():
     check_permission(level='viewer')
@@ -2,11 +2,14 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime
 from operations.pdf_processor import PDFProcessor
-from database.supabase_storage import SupabaseStorage
+from operations.cpu_pool import CpuPoolBusyError
+from database.supabase_config import PUBLIC_IMAGES_BUCKET, RESTRICTED_ATTACHMENTS_BUCKET
 from operations.incident_manager import get_incident_manager
 from operations.audit_logger import log_action
 from auth.auth_utils import get_user_email, get_user_display_name
-from io import BytesIO
+from operations.temp_blob_store import TempBlobStore
+from operations.upload_pipeline import register_incident_with_attachments
+from front.similar_incidents import render_similar_incidents
 
 def show_pdf_processor_page():
     """
@@ -80,23 +83,30 @@ def process_incident_pdf(pdf_file, photo_file, alert_number, pdf_processor):
                 st.warning(f"⚠️ {validation_message}")
                 st.info("Tentando processar mesmo assim...")
             
-            # Extrai dados usando processamento tradicional
-            incident_data = pdf_processor.extract_incident_data(pdf_file, use_ai=False)
+            # Extrai dados usando processamento tradicional (em outro processo; a página só acompanha)
+            status = st.empty()
+            try:
+                incident_data = pdf_processor.extract_incident_data(
+                    pdf_file, use_ai=False,
+                    on_tick=lambda elapsed: status.caption(f"⏳ Lendo páginas e tabelas... {elapsed:.0f}s")
+                )
+            except CpuPoolBusyError:
+                st.warning("⚠️ O servidor está processando muitos documentos. Tente novamente em alguns instantes.")
+                return
+            finally:
+                status.empty()
             
             if not incident_data:
                 st.error("❌ Falha ao extrair dados do PDF.")
                 return
             
-            # Armazena os dados para confirmação
+            # Armazena os dados para confirmação (arquivos ficam em disco, a sessão guarda só os handles)
+            blob_store = TempBlobStore()
             st.session_state.pdf_processor_data = {
                 **incident_data,
                 "numero_alerta": alert_number,
-                "pdf_file_bytes": pdf_file.getvalue(),
-                "pdf_file_name": pdf_file.name,
-                "pdf_file_type": pdf_file.type,
-                "photo_file_bytes": photo_file.getvalue() if photo_file else None,
-                "photo_file_name": photo_file.name if photo_file else None,
-                "photo_file_type": photo_file.type if photo_file else None,
+                "pdf_file_blob": blob_store.put(pdf_file),
+                "photo_file_blob": blob_store.put(photo_file) if photo_file else None,
             }
             
             st.session_state.pdf_processing_complete = True
@@ -128,13 +138,16 @@ def show_confirmation_form():
     st.subheader("2. Revise e Confirme os Dados Extraídos")
     
     data = st.session_state.pdf_processor_data
+
+    render_similar_incidents(data, key_prefix="pdf_incident")
     
     with st.form("confirm_pdf_data_form"):
         col1, col2 = st.columns([1, 2])
         
         with col1:
-            if data.get('photo_file_bytes'):
-                st.image(data['photo_file_bytes'], caption="Foto do Incidente", use_container_width=True)
+            blob_store = TempBlobStore()
+            if blob_store.exists(data.get('photo_file_blob')):
+                st.image(blob_store.get_path(data['photo_file_blob']), caption="Foto do Incidente", use_container_width=True)
             else:
                 st.info("Nenhuma foto anexada")
         
@@ -201,46 +214,44 @@ def save_incident_data(evento_resumo, data_evento, o_que_aconteceu, por_que_acon
     """
     try:
         with st.spinner("💾 Salvando incidente..."):
-            # Upload dos arquivos
-            storage = SupabaseStorage()
-            
-            # Upload do PDF
-            pdf_file_obj = BytesIO(original_data['pdf_file_bytes'])
-            pdf_file_obj.name = original_data['pdf_file_name']
-            # pdf_file_obj.type não é necessário para BytesIO
-            pdf_url = storage.upload_restricted_attachment(pdf_file_obj)
+            blob_store = TempBlobStore()
             
-            # Upload da foto se disponível
-            photo_url = None
-            if original_data.get('photo_file_bytes'):
-                photo_file_obj = BytesIO(original_data['photo_file_bytes'])
-                photo_file_obj.name = original_data['photo_file_name']
-                # photo_file_obj.type não é necessário para BytesIO
-                photo_url = storage.upload_public_image(photo_file_obj)
+            # Upload do PDF e da foto (se disponível) em paralelo, lidos do disco via mmap
+            attachments = {"anexos_url": (RESTRICTED_ATTACHMENTS_BUCKET, original_data['pdf_file_blob'])}
+            if blob_store.exists(original_data.get('photo_file_blob')):
+                attachments["foto_url"] = (PUBLIC_IMAGES_BUCKET, original_data['photo_file_blob'])
             
-            if not pdf_url:
-                st.error("❌ Falha no upload do PDF.")
+            # Incidente e ações de bloqueio são gravados em uma única transação
+            upload_progress = st.progress(0.0, text="Enviando arquivos...")
+            try:
+                incident_id, uploads_ok = register_incident_with_attachments(
+                    get_incident_manager(),
+                    attachments=attachments,
+                    incident_fields={
+                        "numero_alerta": original_data['numero_alerta'],
+                        "evento_resumo": evento_resumo,
+                        "data_evento": data_evento,
+                        "o_que_aconteceu": o_que_aconteceu,
+                        "por_que_aconteceu": por_que_aconteceu,
+                    },
+                    descriptions=recomendacoes,
+                    on_progress=lambda fraction: upload_progress.progress(fraction, text=f"Enviando arquivos... {fraction:.0%}")
+                )
+            except FileNotFoundError:
+                st.error("❌ O arquivo PDF expirou. Processe o documento novamente.")
                 return
             
-            # Salva no banco de dados
-            incident_manager = get_incident_manager()
-            
-            # Usa o método add_incident existente
-            incident_id = incident_manager.add_incident(
-                numero_alerta=original_data['numero_alerta'],
-                evento_resumo=evento_resumo,
-                data_evento=data_evento,
-                o_que_aconteceu=o_que_aconteceu,
-                por_que_aconteceu=por_que_aconteceu,
-                foto_url=photo_url or "",
-                anexos_url=pdf_url
-            )
+            if not uploads_ok:
+                st.error("❌ Falha no upload dos arquivos.")
+                return
             
             if incident_id:
                 st.success("✅ Incidente salvo com sucesso!")
                 st.balloons()
                 
-                # Limpa os dados da sessão
+                # Limpa os dados da sessão e os arquivos temporários
+                blob_store.discard(original_data.get('pdf_file_blob'))
+                blob_store.discard(original_data.get('photo_file_blob'))
                 st.session_state.pdf_processing_complete = False
                 st.session_state.pdf_processor_data = None
                 
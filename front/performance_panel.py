@@ -0,0 +1,60 @@
+import streamlit as st
+import pandas as pd
+from operations.render_profiler import RenderProfiler
+
+
+def display_performance_panel():
+    """Perfis das renderizações de página: divisão do tempo por categoria e exportação do flamegraph"""
+    st.header("⏱️ Desempenho das Páginas")
+
+    # Guardado fora da chave do widget: o Streamlit descarta o estado de widgets de outras páginas
+    col_pages, col_tree, col_clear = st.columns([2, 2, 1])
+    st.session_state.profile_pages = col_pages.toggle(
+        "Perfilar renderizações nesta sessão", value=st.session_state.get('profile_pages', False),
+        help="Cada página aberta é executada sob cProfile (mais lenta enquanto ativo)."
+    )
+    st.session_state.profile_call_tree = col_tree.toggle(
+        "Capturar árvore de chamadas (flamegraph)", value=st.session_state.get('profile_call_tree', False),
+        help="Amostra a pilha de execução a cada 5 ms; gera arquivos para flamegraph/speedscope e snakeviz."
+    )
+
+    profiler = RenderProfiler()
+    if col_clear.button("🗑️ Limpar", width='stretch'):
+        profiler.clear()
+
+    profiles = profiler.get_profiles()
+    if not profiles:
+        st.info("Nenhuma renderização perfilada ainda. Ative a opção acima e navegue pelas páginas.")
+        return
+
+    summary_df = pd.DataFrame([{
+        "Horário": profile['started_at'].strftime("%d/%m/%Y %H:%M:%S"),
+        "Página": profile['page'],
+        "Usuário": profile['user'],
+        "Tempo total (s)": round(profile['wall_time'], 3),
+        **{category: round(seconds, 3) for category, seconds in profile['categories'].items()},
+    } for profile in profiles]).fillna(0)
+    st.dataframe(summary_df, width='stretch', hide_index=True)
+
+    labels = [f"{row['Horário']} · {row['Página']} ({row['Tempo total (s)']}s)" for _, row in summary_df.iterrows()]
+    selected_index = st.selectbox("Detalhar renderização", options=range(len(profiles)), format_func=lambda i: labels[i])
+    profile = profiles[selected_index]
+
+    categories = pd.Series(profile['categories'], name="Segundos").sort_values(ascending=False)
+    st.bar_chart(categories)
+    st.dataframe(pd.DataFrame(profile['top_functions']), width='stretch', hide_index=True)
+
+    file_stem = f"perfil_{profile['page'].replace(' ', '_')}_{profile['started_at'].strftime('%Y%m%d_%H%M%S')}"
+    col_folded, col_pstats = st.columns(2)
+    if profile['folded']:
+        col_folded.download_button(
+            "⬇️ Flamegraph (.folded)", data=profile['folded'], file_name=f"{file_stem}.folded",
+            mime="text/plain", width='stretch', help="Abra em speedscope.app ou com flamegraph.pl"
+        )
+    if profile['pstats']:
+        col_pstats.download_button(
+            "⬇️ cProfile (.prof)", data=profile['pstats'], file_name=f"{file_stem}.prof",
+            mime="application/octet-stream", width='stretch', help="Abra com snakeviz ou pstats"
+        )
+    if not profile['folded'] and not profile['pstats']:
+        st.caption("Ative a árvore de chamadas para exportar o flamegraph desta página.")
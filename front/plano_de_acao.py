@@ -4,64 +4,94 @@ from datetime import datetime, date
 from auth.auth_utils import check_permission, get_user_role
 from operations.incident_manager import get_incident_manager
 from operations.audit_logger import log_action
-from front.dashboard import convert_drive_url_to_displayable
+from front.dashboard import convert_drive_url_to_displayable, render_pagination, render_export_controls
+from config.cache_config import PAGINATION
+from database.supabase_storage import get_image_rendition_url
 
-@st.cache_data(ttl=900)  # 15 minutos - planos de ação não mudam constantemente
-def load_action_plan_data():
-    """Carrega e processa dados do plano de ação"""
-    incident_manager = get_incident_manager()
-    action_plan_df = incident_manager.get_all_action_plans()
-    blocking_actions_df = incident_manager.get_all_blocking_actions()
-    incidents_df = incident_manager.get_all_incidents()
+# Largura das miniaturas de evidência (tabela do histórico e diálogo de edição)
+EVIDENCE_THUMB_WIDTH = 320
 
-    if action_plan_df.empty:
-        return pd.DataFrame()
+# Status (minúsculos) que encerram uma ação / que podem ficar atrasados
+CLOSED_STATUSES = ['concluído', 'cancelado']
+OVERDUE_ELIGIBLE_STATUSES = ['pendente', 'em andamento']
 
-    # Normaliza e converte campos de data (para evitar exceções quando há NaN/None)
-    def safe_to_datetime(series, dayfirst=False):
-        return pd.to_datetime(series, errors='coerce', dayfirst=dayfirst)
+def add_action_status_columns(df: pd.DataFrame, prazo_dt: pd.Series, today: date) -> pd.DataFrame:
+    """
+    Calcula de forma vetorizada o modelo de status de cada ação:
+    is_closed, is_overdue e dias_atraso (0 quando não está atrasada).
+    """
+    status_lower = df['status'].fillna('').astype(str).str.lower()
+    df['is_closed'] = status_lower.isin(CLOSED_STATUSES)
 
-    # Se existir, converte prazo_inicial e data_conclusao para formato brasileiro
-    if 'prazo_inicial' in action_plan_df.columns:
-        parsed = safe_to_datetime(action_plan_df['prazo_inicial'])
-        action_plan_df['prazo_inicial'] = parsed.dt.strftime('%d/%m/%Y').fillna('')
+    days_late = (pd.Timestamp(today) - prazo_dt.dt.normalize()).dt.days
+    df['is_overdue'] = status_lower.isin(OVERDUE_ELIGIBLE_STATUSES) & (days_late > 0)
+    df['dias_atraso'] = days_late.where(df['is_overdue'], 0).fillna(0).astype(int)
+    return df
 
-    if 'data_conclusao' in action_plan_df.columns:
-        parsed = safe_to_datetime(action_plan_df['data_conclusao'])
-        action_plan_df['data_conclusao'] = parsed.dt.strftime('%d/%m/%Y').fillna('')
+def format_action_plan_rows(df: pd.DataFrame, today: date = None) -> pd.DataFrame:
+    """
+    Prepara os itens do plano vindos do banco: datas no formato brasileiro e
+    colunas de status (is_closed, is_overdue, dias_atraso) usadas pelos cards e pelo histórico.
+    """
+    if df.empty:
+        return df
+    df = df.copy()
 
-    # Merge com as descrições das ações
-    blocking_actions_renamed = blocking_actions_df.rename(columns={'id': 'id_acao_bloqueio_ref'})
-    incidents_renamed = incidents_df.rename(columns={'id': 'id_incidente_ref'})
-    
-    merged_df = pd.merge(
-        action_plan_df,
-        blocking_actions_renamed[['id_acao_bloqueio_ref', 'descricao_acao', 'id_incidente']],
-        left_on='id_acao_bloqueio',
-        right_on='id_acao_bloqueio_ref',
-        how='left'
-    )
+    prazo_dt = pd.to_datetime(df['prazo_inicial'], errors='coerce') if 'prazo_inicial' in df.columns else pd.Series(pd.NaT, index=df.index)
+    df['prazo_inicial'] = prazo_dt.dt.strftime('%d/%m/%Y').fillna('')
+
+    if 'data_conclusao' in df.columns:
+        df['data_conclusao'] = pd.to_datetime(df['data_conclusao'], errors='coerce').dt.strftime('%d/%m/%Y').fillna('')
 
-    final_df = pd.merge(
-        merged_df,
-        incidents_renamed[['id_incidente_ref', 'evento_resumo']],
-        left_on='id_incidente',
-        right_on='id_incidente_ref',
-        how='left'
-    )
-    
-    final_df['descricao_acao'] = final_df['descricao_acao'].fillna('Descrição da ação não encontrada')
-    final_df['evento_resumo'] = final_df['evento_resumo'].fillna('Incidente original não encontrado')
-    
     for col in ['url_evidencia', 'detalhes_conclusao']:
-        if col not in final_df.columns:
-            final_df[col] = ''
-        final_df[col] = final_df[col].fillna('')
+        if col not in df.columns:
+            df[col] = ''
+        df[col] = df[col].fillna('')
 
-    final_df = final_df.drop(columns=['id_acao_bloqueio_ref', 'id_incidente_ref'], errors='ignore')
+    return add_action_status_columns(df, prazo_dt, today or date.today())
 
-    return final_df
+def render_action_plan_filters(incident_manager) -> dict:
+    """Filtros por unidade, status e prazo; aplicados nas consultas ao banco"""
+    user_unit = st.session_state.get('unit_name', 'Global')
+    is_admin = get_user_role() == 'admin'
 
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        if is_admin or user_unit == 'Global':
+            unit_options = ["Todas"] + incident_manager.get_action_plan_units()
+            default_index = unit_options.index(user_unit) if user_unit in unit_options else 0
+            selected_unit = st.selectbox("Filtrar por Unidade Operacional:", options=unit_options, index=default_index)
+        else:
+            # Usuários de uma unidade só consultam (e transferem) os itens da própria unidade
+            selected_unit = st.selectbox("Filtrar por Unidade Operacional:", options=[user_unit], disabled=True)
+    with col2:
+        status_options = {"Todos": None, "Pendentes": "open", "Concluídos": "closed"}
+        selected_status = st.selectbox("Filtrar por Status:", options=list(status_options.keys()))
+    with col3:
+        deadline_range = st.date_input("Prazo entre:", value=(), format="DD/MM/YYYY", key="action_plan_deadline_range")
+
+    deadline_from = deadline_to = None
+    if isinstance(deadline_range, (list, tuple)):
+        if len(deadline_range) >= 1:
+            deadline_from = deadline_range[0]
+        if len(deadline_range) == 2:
+            deadline_to = deadline_range[1]
+
+    filters = {
+        "unit_name": None if selected_unit == "Todas" else selected_unit,
+        "status": status_options[selected_status],
+        "deadline_from": deadline_from,
+        "deadline_to": deadline_to,
+    }
+
+    # Volta para a primeira página quando os filtros mudam
+    if st.session_state.get('action_plan_filters') != filters:
+        st.session_state.action_plan_filters = filters
+        st.session_state.open_action_groups = set()
+        for key in [k for k in st.session_state.keys() if k.startswith('incident_page_action_plan_')]:
+            del st.session_state[key]
+
+    return filters
 
 @st.dialog("Editar Ação de Abrangência")
 def edit_action_dialog(item_data):
@@ -107,7 +137,7 @@ def edit_action_dialog(item_data):
                     # Só carrega a imagem quando expandido
                     thumb_url = convert_drive_url_to_displayable(current_evidence_url)
                     if thumb_url: 
-                        st.image(thumb_url, width=200, caption="Clique para ampliar")
+                        st.image(get_image_rendition_url(thumb_url, EVIDENCE_THUMB_WIDTH), width=200, caption="Clique para ampliar")
                     st.markdown(f"[Ver imagem em tamanho real]({current_evidence_url})")
 
         submitted = st.form_submit_button("Salvar Alterações")
@@ -143,122 +173,158 @@ def edit_action_dialog(item_data):
                 
                 incident_manager = get_incident_manager()
                 if incident_manager.update_abrangencia_action(item_data['id'], updates):
+                    if "url_evidencia" in updates and current_evidence_url and '/storage/v1/object/' in current_evidence_url:
+                        # A evidência substituída perde esta referência (deduplicados só são apagados na última)
+                        storage.delete_file_by_url(current_evidence_url)
                     st.success("Ação atualizada com sucesso!")
-                    if 'item_to_edit' in st.session_state: del st.session_state.item_to_edit
                     st.rerun()
-                else: st.error("Falha ao atualizar a ação.")
+                else:
+                    if "url_evidencia" in updates:
+                        # Nenhuma linha ficou com a nova evidência: devolve a referência do upload
+                        storage.delete_file_by_url(updates["url_evidencia"])
+                    st.error("Falha ao atualizar a ação.")
 
 def prepare_history_df(df: pd.DataFrame) -> pd.DataFrame:
     """Prepara o DataFrame do histórico para exibição, processando a coluna de evidências."""
     history_df = df.copy()
-    history_df['foto_evidencia'] = history_df['url_evidencia'].apply(
+    history_df['foto_original'] = history_df['url_evidencia'].apply(
         lambda url: convert_drive_url_to_displayable(url) if url and not url.lower().endswith('.pdf') else None
     )
+    # A coluna de imagem usa a miniatura; o link aponta para o arquivo completo
+    history_df['foto_evidencia'] = history_df['foto_original'].apply(
+        lambda url: get_image_rendition_url(url, EVIDENCE_THUMB_WIDTH) if url else None
+    )
     history_df['pdf_evidencia'] = history_df['url_evidencia'].apply(
         lambda url: url if url and url.lower().endswith('.pdf') else None
     )
     return history_df
 
+def render_action_item(row: pd.Series, is_editor_or_admin: bool):
+    """Card de um item do plano de ação"""
+    is_overdue = bool(row['is_overdue']); status = row['status']
+
+    container_class = "overdue-container" if is_overdue else ""
+    with st.html(f"<div class='{container_class}'>"):
+        with st.container(border=True):
+            col1, col2, col3 = st.columns([4, 2, 1])
+            with col1:
+                overdue_icon = "⚠️ " if is_overdue else ""
+                st.markdown(f"**Ação:** {overdue_icon}{row['descricao_acao']}")
+                if is_overdue:
+                    st.caption(f"⏰ {row['dias_atraso']} dia(s) de atraso")
+                st.caption(f"**Responsável:** {row.get('responsavel_email', 'N/A')}")
+                evidence_url = row.get('url_evidencia', '')
+                if evidence_url:
+                    is_pdf = '.pdf' in evidence_url.lower(); icon = "📄" if is_pdf else "🖼️"
+                    label = "Ver Evidência PDF" if is_pdf else "Ver Foto da Evidência"
+                    st.markdown(f"**[{label} {icon}]({evidence_url})**")
+
+                detalhes = row.get('detalhes_conclusao', '')
+                if detalhes:
+                    with st.popover("Ver Detalhes da Ação"):
+                        st.markdown(detalhes)
+            with col2:
+                if status == "Pendente": st.warning(f"**Status:** {status}")
+                elif status == "Em Andamento": st.info(f"**Status:** {status}")
+                else: st.success(f"**Status:** {status}")
+                st.write(f"**Prazo:** {row['prazo_inicial']}")
+            with col3:
+                if is_editor_or_admin:
+                    # Aberto direto do fragmento: o clique não reexecuta a página inteira
+                    if st.button("Editar", key=f"edit_{row['id']}", width='stretch'):
+                        edit_action_dialog(row.to_dict())
+
+@st.fragment
+def render_incident_action_group(summary: dict, filters: dict, is_editor_or_admin: bool):
+    """
+    Card recolhido de um incidente com os totais vindos do banco. Os itens só são
+    consultados quando o card é aberto; interações reexecutam apenas este fragmento.
+    """
+    incident_id = summary['id_incidente']
+    group_key = 'sem_incidente' if pd.isna(incident_id) else int(incident_id)
+    open_groups = st.session_state.setdefault('open_action_groups', set())
+    is_open = group_key in open_groups
+
+    with st.container(border=True):
+        col_title, col_toggle = st.columns([5, 1])
+        overdue_badge = f" · ⚠️ {summary['atrasadas']} atrasada(s)" if summary['atrasadas'] else ""
+        col_title.markdown(f"**{summary['evento_resumo']}** (`{summary['concluidas']}/{summary['total']}` concluídas){overdue_badge}")
+        if col_toggle.button("▾ Ocultar" if is_open else "▸ Ver ações", key=f"toggle_group_{group_key}", width='stretch'):
+            is_open = not is_open
+            if is_open:
+                open_groups.add(group_key)
+            else:
+                open_groups.discard(group_key)
+            # O rótulo do botão já foi desenhado com o estado anterior
+            st.rerun(scope="fragment")
+
+        if is_open:
+            items_df = format_action_plan_rows(get_incident_manager().get_action_plan_items(incident_id, **filters))
+            for _, row in items_df.iterrows():
+                render_action_item(row, is_editor_or_admin)
+
+@st.fragment
+def render_action_plan_history(incident_manager, filters: dict, total: int):
+    """Histórico em tabela, paginado no banco"""
+    per_page = PAGINATION['actions_per_page']
+    page = render_pagination("action_plan_history", total, per_page, item_label="ação(ões)")
+    history_df = format_action_plan_rows(incident_manager.get_action_plan_rows_page(page, per_page, **filters))
+    if history_df.empty:
+        st.info("Nenhum item encontrado com os filtros selecionados.")
+        return
+
+    history_df_prepared = prepare_history_df(history_df)
+    st.dataframe(history_df_prepared, column_config={
+        "id": None, "id_acao_bloqueio": None, "id_incidente": None, "url_evidencia": None,
+        "unidade_operacional": st.column_config.TextColumn("UO", width="small"),
+        "evento_resumo": st.column_config.TextColumn("Incidente Original"),
+        "descricao_acao": st.column_config.TextColumn("Ação de Abrangência", width="large"),
+        "detalhes_conclusao": "Detalhes da Ação", "status": "Status", 
+        "responsavel_email": st.column_config.TextColumn("Responsável"), "prazo_inicial": "Prazo", 
+        "data_conclusao": "Conclusão", "foto_evidencia": st.column_config.ImageColumn("Foto Evidência"),
+        "foto_original": st.column_config.LinkColumn("Foto Original", display_text="🔍 Ampliar"),
+        "pdf_evidencia": st.column_config.LinkColumn("PDF Evidência", display_text="📄 Ver PDF"),
+    }, column_order=[ "unidade_operacional", "evento_resumo", "descricao_acao", "detalhes_conclusao", "status", 
+        "responsavel_email", "prazo_inicial", "data_conclusao", "foto_evidencia", "foto_original", "pdf_evidencia" ],
+    hide_index=True, width='stretch')
+
 def show_plano_acao_page():
     st.title("📋 Plano de Ação de Abrangência")
     check_permission(level='viewer')
 
-    # Verifica se o diálogo deve ser aberto
-    if st.session_state.get('item_to_edit'):
-        edit_action_dialog(st.session_state.item_to_edit)
-
-    full_action_plan_df = load_action_plan_data()
+    incident_manager = get_incident_manager()
 
-    # (Lógica de filtros)
     st.subheader("Filtros de Visualização")
-    col1, col2 = st.columns(2)
-    with col1:
-        unit_options = ["Todas"] + sorted(full_action_plan_df['unidade_operacional'].unique().tolist()) if not full_action_plan_df.empty else ["Todas"]
-        user_unit = st.session_state.get('unit_name', 'Global')
-        default_index = 0
-        if user_unit != 'Global' and user_unit in unit_options: default_index = unit_options.index(user_unit)
-        selected_unit = st.selectbox("Filtrar por Unidade Operacional:", options=unit_options, index=default_index)
-    with col2:
-        status_options = ["Todos", "Pendentes", "Concluídos"]
-        selected_status_filter = st.selectbox("Filtrar por Status:", options=status_options)
-    
-    filtered_df = full_action_plan_df.copy()
-    if selected_unit != "Todas":
-        filtered_df = filtered_df[filtered_df['unidade_operacional'] == selected_unit]
-    if selected_status_filter == "Pendentes":
-        filtered_df = filtered_df[~filtered_df['status'].str.lower().isin(['concluído', 'cancelado'])]
-    elif selected_status_filter == "Concluídos":
-        filtered_df = filtered_df[filtered_df['status'].str.lower().isin(['concluído', 'cancelado'])]
+    filters = render_action_plan_filters(incident_manager)
     st.divider()
 
-    if filtered_df.empty:
+    counts = incident_manager.count_action_plan(**filters)
+    if counts['total'] == 0:
         st.info("Nenhum item encontrado com os filtros selecionados."); st.stop()
 
     st.subheader("Visão por Cards")
-    total_pending = len(filtered_df[~filtered_df['status'].str.lower().isin(['concluído', 'cancelado'])])
-    st.metric("Total de Ações Abertas (na visão atual)", total_pending)
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Total de Ações Abertas (na visão atual)", counts['abertas'])
+    col2.metric("Ações Atrasadas", counts['atrasadas'])
+    col3.metric("Incidentes", counts['incidentes'])
     is_editor_or_admin = get_user_role() in ['editor', 'admin']
 
     # (CSS para borda vermelha)
     st.markdown("""<style>.overdue-container > [data-testid="stVerticalBlock"] > [data-testid="stVerticalBlockBorderWrapper"] > div {
         border-color: #FF4B4B !important; border-width: 2px !important;}</style>""", unsafe_allow_html=True)
 
-    for incident_id, group in filtered_df.groupby('id_incidente'):
-        incident_resumo = group['evento_resumo'].iloc[0]
-        total_actions_in_group = len(group)
-        completed_actions = len(group[group['status'].str.lower().isin(['concluído', 'cancelado'])])
-        expander_title = f"**{incident_resumo}** (`{completed_actions}/{total_actions_in_group}` concluídas)"
-
-        with st.expander(expander_title, expanded=True):
-            for _, row in group.iterrows():
-                is_overdue = False; status = row['status']
-                if status.lower() in ['pendente', 'em andamento']:
-                    try:
-                        prazo_dt = datetime.strptime(row['prazo_inicial'], "%d/%m/%Y").date()
-                        if prazo_dt < date.today(): is_overdue = True
-                    except (ValueError, TypeError): pass
-                
-                container_class = "overdue-container" if is_overdue else ""
-                with st.html(f"<div class='{container_class}'>"):
-                    with st.container(border=True):
-                        col1, col2, col3 = st.columns([4, 2, 1])
-                        with col1:
-                            overdue_icon = "⚠️ " if is_overdue else ""
-                            st.markdown(f"**Ação:** {overdue_icon}{row['descricao_acao']}")
-                            st.caption(f"**Responsável:** {row.get('responsavel_email', 'N/A')}")
-                            evidence_url = row.get('url_evidencia', '')
-                            if evidence_url:
-                                is_pdf = '.pdf' in evidence_url.lower(); icon = "📄" if is_pdf else "🖼️"
-                                label = "Ver Evidência PDF" if is_pdf else "Ver Foto da Evidência"
-                                st.markdown(f"**[{label} {icon}]({evidence_url})**")
-                            
-                            detalhes = row.get('detalhes_conclusao', '')
-                            if detalhes:
-                                with st.popover("Ver Detalhes da Ação"):
-                                    st.markdown(detalhes)
-                        with col2:
-                            if status == "Pendente": st.warning(f"**Status:** {status}")
-                            elif status == "Em Andamento": st.info(f"**Status:** {status}")
-                            else: st.success(f"**Status:** {status}")
-                            st.write(f"**Prazo:** {row['prazo_inicial']}")
-                        with col3:
-                            if is_editor_or_admin:
-                                def set_item_to_edit(item_row): st.session_state.item_to_edit = item_row.to_dict()
-                                st.button("Editar", key=f"edit_{row['id']}", on_click=set_item_to_edit, args=(row,), width='stretch')
+    per_page = PAGINATION['incidents_per_page']
+    page = render_pagination("action_plan_groups", counts['incidentes'], per_page)
+    groups_df = incident_manager.get_action_plan_groups_page(page, per_page, **filters)
+    for summary in groups_df.to_dict('records'):
+        render_incident_action_group(summary, filters, is_editor_or_admin)
     st.divider()
 
     with st.expander("📖 Ver Histórico Completo em Tabela", expanded=False):
         st.info("Esta tabela mostra todos os itens do plano de ação com base nos filtros acima.")
-        history_df_prepared = prepare_history_df(filtered_df)
-        st.dataframe(history_df_prepared, column_config={
-            "id": None, "id_acao_bloqueio": None, "id_incidente": None, "url_evidencia": None,
-            "unidade_operacional": st.column_config.TextColumn("UO", width="small"),
-            "evento_resumo": st.column_config.TextColumn("Incidente Original"),
-            "descricao_acao": st.column_config.TextColumn("Ação de Abrangência", width="large"),
-            "detalhes_conclusao": "Detalhes da Ação", "status": "Status", 
-            "responsavel_email": st.column_config.TextColumn("Responsável"), "prazo_inicial": "Prazo", 
-            "data_conclusao": "Conclusão", "foto_evidencia": st.column_config.ImageColumn("Foto Evidência"),
-            "pdf_evidencia": st.column_config.LinkColumn("PDF Evidência", display_text="📄 Ver PDF"),
-        }, column_order=[ "unidade_operacional", "evento_resumo", "descricao_acao", "detalhes_conclusao", "status", 
-            "responsavel_email", "prazo_inicial", "data_conclusao", "foto_evidencia", "pdf_evidencia" ],
-        hide_index=True, width='stretch')
+        render_export_controls(
+            "action_plan_history", lambda: incident_manager.stream_action_plan_rows(**filters),
+            sheet_title="Plano de Ação", file_prefix="plano_de_acao"
+        )
+        if st.toggle("Carregar histórico", key="load_action_plan_history"):
+            render_action_plan_history(incident_manager, filters, counts['total'])
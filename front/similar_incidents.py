@@ -0,0 +1,41 @@
+import streamlit as st
+from operations.incident_manager import get_incident_manager
+
+
+def render_similar_incidents(data: dict, key_prefix: str):
+    """
+    Sugere incidentes já cadastrados com resumo parecido ao do alerta em revisão e
+    permite reaproveitar as ações de bloqueio deles nas recomendações.
+
+    Args:
+        data: Dados extraídos do documento (dict guardado no session_state; é alterado no lugar)
+        key_prefix: Prefixo das chaves dos widgets na página
+    """
+    incident_manager = get_incident_manager()
+    similar_df = incident_manager.find_similar_incidents(data.get('evento_resumo', ''))
+    if similar_df.empty:
+        return
+
+    with st.expander(f"🔁 {len(similar_df)} incidente(s) semelhante(s) já cadastrado(s)", expanded=True):
+        st.caption("Confira se este alerta não é um duplicado. As ações de bloqueio de um incidente semelhante podem ser reaproveitadas.")
+
+        for incident in similar_df.to_dict('records'):
+            col_info, col_button = st.columns([4, 1])
+            col_info.markdown(
+                f"**{incident.get('numero_alerta', '')}** · {incident.get('evento_resumo', '')} "
+                f"({incident.get('data_evento', '')}) — similaridade {incident['similaridade']:.0%}"
+            )
+            if col_button.button("Reusar ações", key=f"{key_prefix}_reuse_{incident['id']}", width='stretch'):
+                actions_df = incident_manager.get_blocking_actions_by_incident(incident['id'])
+                descriptions = actions_df['descricao_acao'].dropna().tolist() if not actions_df.empty else []
+
+                current = data.get('recomendacoes', [])
+                if isinstance(current, str):
+                    current = [line.strip().lstrip('• ').strip() for line in current.splitlines() if line.strip()]
+                elif not isinstance(current, list):
+                    current = []
+
+                new_items = [description for description in descriptions if description not in current]
+                data['recomendacoes'] = current + new_items
+                st.toast(f"{len(new_items)} ação(ões) de bloqueio adicionada(s) às recomendações")
+                st.rerun()
@@ -3,6 +3,7 @@ import pandas as pd
 from datetime import datetime
 from database.supabase_config import get_database_engine, get_supabase_client
 from sqlalchemy import text
+from operations.storage_gc import find_orphaned_objects, delete_orphaned_objects, summarize_orphans, GC_MIN_AGE_HOURS
 
 def format_bytes(bytes_value):
     """Converte bytes para formato legível"""
@@ -155,6 +156,40 @@ def get_row_counts():
         st.error(f"Erro ao contar linhas: {e}")
         return 0, pd.DataFrame()
 
+def display_orphaned_files_cleanup():
+    """Coleta de arquivos do Storage que nenhum incidente ou ação referencia (simulação antes de remover)"""
+    st.markdown("**Arquivos Órfãos no Storage**")
+    st.caption(f"Fotos, anexos e evidências substituídos ou de registros apagados (criados há mais de {GC_MIN_AGE_HOURS}h)")
+
+    if st.button("🔍 Analisar arquivos órfãos", type="secondary"):
+        try:
+            with st.spinner("Comparando storage.objects com as URLs gravadas..."):
+                st.session_state.orphaned_files = find_orphaned_objects()
+        except Exception as e:
+            st.error(f"Erro ao analisar o storage: {e}")
+
+    orphans_df = st.session_state.get('orphaned_files')
+    if orphans_df is None:
+        return
+    if orphans_df.empty:
+        st.success("✅ Nenhum arquivo órfão encontrado.")
+        return
+
+    st.warning(f"{len(orphans_df)} arquivo(s) órfão(s), {format_bytes(int(orphans_df['size'].sum()))} recuperáveis")
+    st.dataframe(summarize_orphans(orphans_df), use_container_width=True, hide_index=True)
+    with st.expander("Ver arquivos"):
+        st.dataframe(orphans_df, use_container_width=True, hide_index=True)
+
+    if st.button(f"🗑️ Remover {len(orphans_df)} arquivo(s)", type="primary"):
+        with st.spinner("Removendo arquivos em lotes..."):
+            summary = delete_orphaned_objects(orphans_df)
+        del st.session_state.orphaned_files
+        if summary['skipped']:
+            st.info(f"{summary['skipped']} arquivo(s) voltaram a ser usados desde a análise e foram mantidos.")
+        if summary['failed']:
+            st.error(f"{summary['failed']} arquivo(s) não puderam ser removidos.")
+        st.success(f"✅ {summary['deleted']} arquivo(s) removidos, {format_bytes(summary['freed_bytes'])} liberados")
+
 def display_supabase_monitor():
     """Renderiza a interface de monitoramento do Supabase"""
     st.header("📊 Monitoramento de Uso do Supabase")
@@ -276,6 +311,8 @@ def display_supabase_monitor():
         st.caption("Otimiza e recupera espaço do banco")
         st.info("💡 Execute via Dashboard do Supabase:\nSettings > Database > Vacuum")
     
+    display_orphaned_files_cleanup()
+    
     # === RECOMENDAÇÕES ===
     st.divider()
     st.subheader("💡 Recomendações")
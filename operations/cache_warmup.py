@@ -0,0 +1,102 @@
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+logger = logging.getLogger('abrangencia_app.cache_warmup')
+
+# Pool compartilhado pelo processo; cada tarefa recebe o contexto da sessão que a criou
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="cache-warmup")
+
+
+def _warm_incidents(incident_manager, matrix_manager, unit_name):
+    incident_manager.get_all_incidents()
+
+def _warm_blocking_actions(incident_manager, matrix_manager, unit_name):
+    incident_manager.get_all_blocking_actions()
+
+def _warm_action_plans(incident_manager, matrix_manager, unit_name):
+    incident_manager.get_all_action_plans()
+
+def _warm_incident_dashboard(incident_manager, matrix_manager, unit_name):
+    # Mesmas consultas (contagens + primeira página sem filtros) feitas por display_incident_list
+    from config.cache_config import PAGINATION
+    per_page = PAGINATION['incidents_per_page']
+    if unit_name and unit_name != 'Global':
+        for covered in (False, True):
+            incident_manager.count_incidents(unit_name=unit_name, covered=covered)
+            incident_manager.get_incidents_page(1, per_page, unit_name=unit_name, covered=covered)
+    else:
+        incident_manager.count_incidents()
+        incident_manager.get_incidents_page(1, per_page)
+
+def _warm_action_plan_page(incident_manager, matrix_manager, unit_name):
+    # Mesmas consultas (totais + primeira página de incidentes) feitas por show_plano_acao_page
+    from config.cache_config import PAGINATION
+    filters = {"unit_name": unit_name if unit_name and unit_name != 'Global' else None}
+    incident_manager.count_action_plan(**filters)
+    incident_manager.get_action_plan_groups_page(1, PAGINATION['incidents_per_page'], **filters)
+
+def _warm_utilities_users(incident_manager, matrix_manager, unit_name):
+    matrix_manager.get_utilities_users()
+
+def _warm_units(incident_manager, matrix_manager, unit_name):
+    matrix_manager.get_all_units()
+
+
+# Dados que a primeira renderização de cada página vai precisar
+PAGE_WARMUP_TASKS = {
+    "Consultar Abrangência": [_warm_incident_dashboard, _warm_utilities_users],
+    "Plano de Ação": [_warm_action_plan_page],
+    "Processar PDFs": [],
+    "Administração": [_warm_incidents, _warm_action_plans, _warm_blocking_actions, _warm_units],
+}
+
+# Dados extras carregados apenas para administradores
+ADMIN_WARMUP_TASKS = [_warm_units]
+
+
+def _run_task(ctx, task, incident_manager, matrix_manager, unit_name):
+    # Sem o contexto da sessão, session_state (e-mail do RLS) não fica acessível na thread
+    add_script_run_ctx(threading.current_thread(), ctx)
+    try:
+        task(incident_manager, matrix_manager, unit_name)
+    except Exception as e:
+        logger.warning(f"Falha no warm-up '{task.__name__}': {e}")
+
+
+def start_cache_warmup(user_role: str, page_name: str):
+    """
+    Dispara em segundo plano o pré-carregamento dos dados da página selecionada.
+    Não bloqueia a renderização; as cargas concorrentes da própria página aguardam
+    o resultado no TableCache (single-flight) em vez de repetir a consulta.
+    Executa no máximo uma vez por página em cada sessão.
+    """
+    warmed_pages = st.session_state.setdefault('warmed_pages', set())
+    if page_name in warmed_pages:
+        return
+    warmed_pages.add(page_name)
+
+    tasks = list(PAGE_WARMUP_TASKS.get(page_name, []))
+    if user_role == 'admin':
+        tasks += [task for task in ADMIN_WARMUP_TASKS if task not in tasks]
+    if not tasks:
+        return
+
+    from operations.incident_manager import get_incident_manager
+    from database.matrix_manager import get_matrix_manager
+
+    try:
+        incident_manager = get_incident_manager()
+        matrix_manager = get_matrix_manager()
+    except Exception as e:
+        logger.warning(f"Warm-up ignorado: {e}")
+        return
+
+    ctx = get_script_run_ctx()
+    unit_name = st.session_state.get('unit_name')
+    for task in tasks:
+        _executor.submit(_run_task, ctx, task, incident_manager, matrix_manager, unit_name)
+
+    logger.info(f"Warm-up iniciado para '{page_name}': {[task.__name__ for task in tasks]}")
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+
+
+def _normalize_ids(series: pd.Series) -> pd.Series:
+    """IDs vindos de merges com NaN chegam como float; volta para inteiro para casar com incidentes.id"""
+    series = series.dropna()
+    if pd.api.types.is_float_dtype(series):
+        return series.astype('int64')
+    return series
+
+
+def build_unit_coverage_matrix(incident_ids: pd.Series, units: list[str], coverage_df: pd.DataFrame) -> tuple[np.ndarray, pd.Index, pd.Index]:
+    """
+    Monta a matriz booleana incidente × unidade indicando quais unidades já registraram
+    ao menos uma ação de abrangência para cada incidente.
+
+    Args:
+        incident_ids: IDs dos incidentes (linhas da matriz)
+        units: Unidades operacionais (colunas da matriz)
+        coverage_df: Pares (id_incidente, unidade_operacional) do plano de ação
+
+    Returns:
+        Tupla (matriz, índice de incidentes, índice de unidades)
+    """
+    incident_index = pd.Index(_normalize_ids(pd.Series(incident_ids)).unique())
+    unit_index = pd.Index(pd.unique(pd.Series(units, dtype=object)))
+    covered = np.zeros((len(incident_index), len(unit_index)), dtype=bool)
+
+    if not coverage_df.empty:
+        pairs = coverage_df[['id_incidente', 'unidade_operacional']].dropna()
+        rows = incident_index.get_indexer(_normalize_ids(pairs['id_incidente']))
+        cols = unit_index.get_indexer(pairs['unidade_operacional'])
+        valid = (rows >= 0) & (cols >= 0)
+        covered[rows[valid], cols[valid]] = True
+
+    return covered, incident_index, unit_index
+
+
+def summarize_uninitiated_analyses(incidents_df: pd.DataFrame, units: list[str], coverage_df: pd.DataFrame) -> tuple[pd.DataFrame, pd.Series]:
+    """
+    Calcula, a partir da matriz de cobertura, as análises não iniciadas.
+
+    Args:
+        incidents_df: Incidentes já filtrados pelo prazo (colunas id, evento_resumo, data_evento)
+        units: Unidades operacionais ativas
+        coverage_df: Pares (id_incidente, unidade_operacional) do plano de ação
+
+    Returns:
+        Tupla (DataFrame com uma linha por incidente pendente, Series de pendências por unidade)
+    """
+    expected_cols = ["Incidente", "Data do Incidente", "UOs Pendentes", "count", "unidades"]
+    if incidents_df.empty or not units:
+        return pd.DataFrame(columns=expected_cols), pd.Series(dtype=int, name="Análises Atrasadas")
+
+    incidents_df = incidents_df.drop_duplicates(subset='id')
+    covered, incident_index, unit_index = build_unit_coverage_matrix(incidents_df['id'], units, coverage_df)
+    pending = ~covered
+
+    per_incident = pending.sum(axis=1)
+    per_unit = pd.Series(pending.sum(axis=0), index=unit_index, name="Análises Atrasadas")
+    per_unit = per_unit[per_unit > 0]
+
+    has_pending = per_incident > 0
+    unit_names = unit_index.to_numpy()
+    pending_units = [unit_names[row].tolist() for row in pending[has_pending]]
+
+    incidents_by_id = incidents_df.assign(id=_normalize_ids(incidents_df['id'])).set_index('id')
+    pending_incidents = incidents_by_id.loc[incident_index[has_pending]]
+
+    uninitiated_df = pd.DataFrame({
+        "Incidente": pending_incidents['evento_resumo'].to_numpy(),
+        "Data do Incidente": pending_incidents['data_evento'].to_numpy(),
+        "UOs Pendentes": [", ".join(sorted(units_list)) for units_list in pending_units],
+        "count": per_incident[has_pending],
+        "unidades": pending_units,
+    }, columns=expected_cols)
+
+    return uninitiated_df, per_unit
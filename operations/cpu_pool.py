@@ -0,0 +1,126 @@
+import os
+import time
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+logger = logging.getLogger('abrangencia_app.cpu_pool')
+
+# Processos para compressão de imagens e leitura de PDFs; deixa um núcleo para o servidor do Streamlit
+MAX_CPU_WORKERS = max(1, min(4, (os.cpu_count() or 2) - 1))
+# Tarefas aceitas ao mesmo tempo (em execução + na fila); acima disso submit espera uma vaga
+MAX_CPU_QUEUE = MAX_CPU_WORKERS * 4
+# Espera máxima por uma vaga antes de desistir com CpuPoolBusyError
+CPU_QUEUE_TIMEOUT = 30
+# Intervalo de atualização da tela enquanto a tarefa roda
+PROGRESS_POLL_SECONDS = 0.25
+
+
+class CpuPoolBusyError(RuntimeError):
+    """A fila do pool está cheia há mais de CPU_QUEUE_TIMEOUT segundos"""
+
+
+class CpuTaskPool:
+    """
+    Pool de processos compartilhado pelo servidor para o trabalho pesado de CPU (Pillow,
+    pdfplumber, pdf2image). Em uma thread do Streamlit esse trabalho segura o GIL e atrasa
+    os reruns de todas as sessões; em outro processo, a thread que espera o Future fica livre.
+
+    As funções enviadas precisam estar no nível do módulo e receber/retornar objetos
+    serializáveis (bytes, listas, dicts, imagens PIL), pois atravessam processos.
+    """
+    _instance = None
+    _lock = threading.Lock()
+
+    def __new__(cls):
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super().__new__(cls)
+                    cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+        self._executor = None
+        self._slots = threading.BoundedSemaphore(MAX_CPU_QUEUE)
+        self._in_flight = 0
+        self._initialized = True
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn: fazer fork de um servidor com várias threads pode copiar locks travados
+                self._executor = ProcessPoolExecutor(
+                    max_workers=MAX_CPU_WORKERS,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+                logger.info(f"Pool de CPU iniciado com {MAX_CPU_WORKERS} processo(s)")
+            return self._executor
+
+    def _reset_executor(self, broken: ProcessPoolExecutor) -> None:
+        # Um processo morto (ex.: falta de memória com um PDF enorme) inutiliza o pool inteiro
+        with self._lock:
+            if self._executor is broken:
+                self._executor = None
+        broken.shutdown(wait=False, cancel_futures=True)
+        logger.warning("Pool de CPU quebrado; um novo será criado")
+
+    def _release_slot(self, _future: Future) -> None:
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def submit(self, fn, *args, timeout: float = CPU_QUEUE_TIMEOUT, **kwargs) -> Future:
+        """
+        Envia fn(*args, **kwargs) para um processo do pool.
+
+        Returns:
+            Future com o resultado (ou a exceção levantada no processo)
+
+        Raises:
+            CpuPoolBusyError: Se não houver vaga na fila dentro de timeout segundos
+        """
+        if not self._slots.acquire(timeout=timeout):
+            raise CpuPoolBusyError(f"Fila de processamento cheia ({MAX_CPU_QUEUE} tarefas)")
+
+        try:
+            executor = self._get_executor()
+            try:
+                future = executor.submit(fn, *args, **kwargs)
+            except BrokenProcessPool:
+                self._reset_executor(executor)
+                future = self._get_executor().submit(fn, *args, **kwargs)
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self._in_flight += 1
+        future.add_done_callback(self._release_slot)
+        return future
+
+    def run(self, fn, *args, **kwargs):
+        """Executa no pool e espera o resultado (a thread chamadora não segura o GIL enquanto espera)"""
+        return self.submit(fn, *args, **kwargs).result()
+
+    def stats(self) -> dict:
+        """Processos e tarefas em andamento (executando + na fila)"""
+        return {"workers": MAX_CPU_WORKERS, "in_flight": self._in_flight, "capacity": MAX_CPU_QUEUE}
+
+
+def wait_for_task(future: Future, on_tick=None, poll_seconds: float = PROGRESS_POLL_SECONDS):
+    """
+    Espera o resultado de uma tarefa chamando on_tick(segundos decorridos) a cada poll_seconds,
+    para a página mostrar que o processamento continua.
+    """
+    start = time.monotonic()
+    while True:
+        done, _ = wait([future], timeout=poll_seconds)
+        if done:
+            return future.result()
+        if on_tick:
+            on_tick(time.monotonic() - start)
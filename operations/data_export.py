@@ -0,0 +1,122 @@
+import os
+import csv
+import json
+import uuid
+import tempfile
+import logging
+from datetime import datetime, date, time
+from decimal import Decimal
+from operations.expired_files import ExpiredFileSweeper
+
+logger = logging.getLogger('abrangencia_app.data_export')
+
+# Linhas buscadas por vez no cursor do servidor
+EXPORT_CHUNK_SIZE = 5000
+
+EXPORT_FORMATS = {
+    "csv": {"label": "CSV", "mime": "text/csv", "extension": ".csv"},
+    "xlsx": {"label": "Excel", "mime": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "extension": ".xlsx"},
+}
+
+EXPORT_DIR = os.path.join(tempfile.gettempdir(), "abrangencia_exports")
+# Exportações que sobraram no disco (ex.: processo interrompido durante a entrega) expiram após este tempo (segundos)
+EXPORT_TTL_SECONDS = 2 * 3600
+
+_sweeper = ExpiredFileSweeper(EXPORT_DIR, EXPORT_TTL_SECONDS, "exportação(ões)")
+
+
+def _excel_value(value):
+    """Converte valores vindos do banco para tipos aceitos pelo openpyxl"""
+    if value is None or isinstance(value, (str, int, float, bool, Decimal)):
+        return value
+    if isinstance(value, datetime):
+        # Excel não armazena fuso horário
+        return value.replace(tzinfo=None)
+    if isinstance(value, (date, time)):
+        return value
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False, default=str)
+    return str(value)
+
+
+def _write_csv(batches, path: str) -> int:
+    total = 0
+    # utf-8-sig para o Excel reconhecer os acentos ao abrir o CSV
+    with open(path, "w", encoding="utf-8-sig", newline="") as csv_file:
+        writer = csv.writer(csv_file, delimiter=';')
+        header_written = False
+        for columns, rows in batches:
+            if not header_written:
+                writer.writerow(columns)
+                header_written = True
+            writer.writerows(rows)
+            total += len(rows)
+    return total
+
+
+def _write_xlsx(batches, path: str, sheet_title: str) -> int:
+    from openpyxl import Workbook
+
+    # Modo write-only: as linhas vão direto para o arquivo, sem manter a planilha em memória
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=sheet_title[:31])
+    total = 0
+    header_written = False
+    for columns, rows in batches:
+        if not header_written:
+            sheet.append(columns)
+            header_written = True
+        for row in rows:
+            sheet.append([_excel_value(value) for value in row])
+        total += len(rows)
+    workbook.save(path)
+    return total
+
+
+def export_rows(batches, export_format: str, sheet_title: str = "Dados") -> tuple[str, int]:
+    """
+    Grava em um arquivo temporário as linhas recebidas em blocos (ver SupabaseOperations.stream_query).
+
+    Args:
+        batches: Iterável de (colunas, linhas)
+        export_format: 'csv' ou 'xlsx'
+        sheet_title: Nome da aba (apenas Excel)
+
+    Returns:
+        Tupla (caminho do arquivo gerado, quantidade de linhas)
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Formato de exportação inválido: {export_format}")
+
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    cleanup_expired_exports()
+    path = os.path.join(EXPORT_DIR, f"{uuid.uuid4().hex}{EXPORT_FORMATS[export_format]['extension']}")
+
+    try:
+        if export_format == "csv":
+            total = _write_csv(batches, path)
+        else:
+            total = _write_xlsx(batches, path, sheet_title)
+    except Exception:
+        discard_export(path)
+        raise
+
+    logger.info(f"Exportação gerada: {total} linha(s), {os.path.getsize(path)/1024:.1f}KB ({export_format})")
+    return path, total
+
+
+def discard_export(path: str | None):
+    """Remove um arquivo de exportação gerado anteriormente"""
+    if not path:
+        return
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning(f"Não foi possível remover exportação: {e}")
+
+
+def cleanup_expired_exports(ttl_seconds: int = EXPORT_TTL_SECONDS, force: bool = False) -> int:
+    """Remove exportações mais antigas que o TTL (no máximo uma varredura a cada 10 minutos)"""
+    return _sweeper.sweep(ttl_seconds, force)
@@ -9,7 +9,7 @@ class DataCache:
     """
     
     @staticmethod
-    def get_or_load(key: str, loader_func, ttl_seconds: int = 300, **kwargs):
+    def get_or_load(key: str, loader_func, ttl_seconds: int = 300, version=None, **kwargs):
         """
         Busca dados no cache ou carrega se expirado.
         
@@ -17,13 +17,15 @@ class DataCache:
             key: Chave única do cache
             loader_func: Função que carrega os dados
             ttl_seconds: Tempo de vida do cache em segundos
+            version: Versão das tabelas de origem (TableCache); se mudou, recarrega
             **kwargs: Argumentos para loader_func
         """
         cache_key = f"cache_{key}"
         timestamp_key = f"cache_timestamp_{key}"
+        version_key = f"cache_version_{key}"
         
         # Verifica se existe cache válido
-        if cache_key in st.session_state:
+        if cache_key in st.session_state and st.session_state.get(version_key) == version:
             cached_time = st.session_state.get(timestamp_key)
             
             if cached_time:
@@ -39,6 +41,7 @@ class DataCache:
         # Salva no cache
         st.session_state[cache_key] = data
         st.session_state[timestamp_key] = datetime.now()
+        st.session_state[version_key] = version
         
         return data
     
@@ -47,11 +50,11 @@ class DataCache:
         """Remove dados do cache"""
         cache_key = f"cache_{key}"
         timestamp_key = f"cache_timestamp_{key}"
+        version_key = f"cache_version_{key}"
         
-        if cache_key in st.session_state:
-            del st.session_state[cache_key]
-        if timestamp_key in st.session_state:
-            del st.session_state[timestamp_key]
+        for state_key in (cache_key, timestamp_key, version_key):
+            if state_key in st.session_state:
+                del st.session_state[state_key]
     
     @staticmethod
     def clear_all():
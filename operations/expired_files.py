@@ -0,0 +1,51 @@
+import os
+import time
+import threading
+import logging
+
+logger = logging.getLogger('abrangencia_app.expired_files')
+
+# Intervalo mínimo entre varreduras de limpeza
+CLEANUP_INTERVAL_SECONDS = 600
+
+
+class ExpiredFileSweeper:
+    """
+    Remove de um diretório temporário os arquivos mais antigos que o TTL (pela data de
+    modificação). Cada chamada a sweep() varre no máximo uma vez a cada interval_seconds,
+    então pode ser chamada antes de cada gravação sem custo.
+    """
+
+    def __init__(self, directory: str, ttl_seconds: int, label: str, interval_seconds: int = CLEANUP_INTERVAL_SECONDS):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self.label = label
+        self.interval_seconds = interval_seconds
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+
+    def sweep(self, ttl_seconds: int = None, force: bool = False) -> int:
+        """Remove os arquivos expirados; retorna quantos foram removidos"""
+        ttl_seconds = ttl_seconds or self.ttl_seconds
+        now = time.time()
+        with self._lock:
+            if not force and now - self._last_sweep < self.interval_seconds:
+                return 0
+            self._last_sweep = now
+
+        removed = 0
+        try:
+            entries = list(os.scandir(self.directory))
+        except FileNotFoundError:
+            return 0
+        for entry in entries:
+            try:
+                if entry.is_file() and now - entry.stat().st_mtime > ttl_seconds:
+                    os.remove(entry.path)
+                    removed += 1
+            except OSError:
+                continue
+
+        if removed:
+            logger.info(f"{removed} {self.label} expirado(s) removido(s) de {self.directory}")
+        return removed
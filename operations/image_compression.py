@@ -0,0 +1,192 @@
+import io
+import logging
+from PIL import Image, ImageOps, features
+from config.cache_config import IMAGE_COMPRESSION
+
+logger = logging.getLogger('abrangencia_app.image_compression')
+
+# Codificadores disponíveis: formato do Pillow, MIME, extensão, suporte a transparência e opções fixas
+IMAGE_FORMATS = {
+    'avif': {'pil_format': 'AVIF', 'mime': 'image/avif', 'extension': '.avif', 'alpha': True, 'options': {'speed': 8}},
+    'webp': {'pil_format': 'WEBP', 'mime': 'image/webp', 'extension': '.webp', 'alpha': True, 'options': {'method': 4}},
+    'jpeg': {'pil_format': 'JPEG', 'mime': 'image/jpeg', 'extension': '.jpg', 'alpha': False, 'options': {}},
+}
+# Usado quando nenhum formato preferido está disponível ou o cliente exige JPEG
+FALLBACK_FORMAT = 'jpeg'
+
+
+def is_format_supported(image_format: str) -> bool:
+    """Verifica se o Pillow instalado codifica o formato (WebP e AVIF dependem de bibliotecas nativas)"""
+    if image_format == 'jpeg':
+        return True
+    try:
+        return bool(features.check(image_format))
+    except ValueError:
+        # Versões do Pillow que não conhecem o recurso (ex.: AVIF antes do 11.2)
+        return False
+
+
+def choose_format(preferred: tuple = None) -> str:
+    """Primeiro formato da lista de preferência que pode ser codificado"""
+    for image_format in preferred or IMAGE_COMPRESSION['formats']:
+        if image_format in IMAGE_FORMATS and is_format_supported(image_format):
+            return image_format
+    return FALLBACK_FORMAT
+
+
+def has_transparency(img: Image.Image) -> bool:
+    """Há pelo menos um pixel não totalmente opaco"""
+    if img.mode == 'P':
+        if 'transparency' not in img.info:
+            return False
+        img = img.convert('RGBA')
+    if img.mode not in ('RGBA', 'LA', 'PA'):
+        return False
+    return img.getchannel('A').getextrema()[0] < 255
+
+
+def load_image(file_bytes: bytes, max_dimension: int, keep_alpha: bool = False) -> Image.Image:
+    """
+    Decodifica a imagem já reduzida para caber em max_dimension, na orientação correta e sem metadados.
+
+    Em JPEG, Image.draft faz o decodificador reduzir a imagem por 1/2, 1/4 ou 1/8 durante a
+    leitura (escala DCT), evitando decodificar a foto inteira do celular só para reduzi-la depois.
+    A transparência é mantida (RGBA) com keep_alpha; caso contrário é composta sobre fundo branco.
+    """
+    img = Image.open(io.BytesIO(file_bytes))
+    if img.format == 'JPEG':
+        # draft escolhe a maior redução que ainda mantém a imagem >= ao tamanho pedido
+        img.draft('RGB', (max_dimension, max_dimension))
+
+    # Aplica a orientação do EXIF (fotos de celular) antes de descartar os metadados
+    img = ImageOps.exif_transpose(img)
+
+    if has_transparency(img):
+        img = img.convert('RGBA')
+        if not keep_alpha:
+            background = Image.new('RGB', img.size, (255, 255, 255))
+            background.paste(img, mask=img.getchannel('A'))
+            img = background
+    elif img.mode != 'RGB':
+        img = img.convert('RGB')
+
+    if max(img.size) > max_dimension:
+        img.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+
+    # Mantém só o perfil de cor; EXIF (inclusive GPS), XMP e comentários não são gravados
+    icc_profile = img.info.get('icc_profile')
+    img.info = {'icc_profile': icc_profile} if icc_profile else {}
+    return img
+
+
+def encode_image(img: Image.Image, image_format: str, quality: int, optimize: bool = False) -> bytes:
+    spec = IMAGE_FORMATS[image_format]
+    options = dict(spec['options'])
+    if image_format == 'jpeg':
+        options['optimize'] = optimize
+    if img.info.get('icc_profile'):
+        options['icc_profile'] = img.info['icc_profile']
+
+    output = io.BytesIO()
+    img.save(output, format=spec['pil_format'], quality=quality, **options)
+    return output.getvalue()
+
+
+def encode_jpeg(img: Image.Image, quality: int, optimize: bool = False) -> bytes:
+    return encode_image(img, 'jpeg', quality, optimize)
+
+
+def find_quality(img: Image.Image, max_bytes: int, max_quality: int, min_quality: int, tolerance: int,
+                 image_format: str = 'jpeg') -> tuple[int, bytes]:
+    """
+    Busca binária da maior qualidade cujo arquivo cabe em max_bytes.
+
+    O tamanho cresce monotonicamente com a qualidade, então bastam ~log2(intervalo / tolerância)
+    codificações em vez de descer de 5 em 5 a partir da qualidade inicial.
+
+    Returns:
+        Tupla (qualidade, bytes codificados); a qualidade mínima se nenhuma couber
+    """
+    encoded = encode_image(img, image_format, max_quality)
+    if len(encoded) <= max_bytes:
+        return max_quality, encoded
+
+    best_quality, best = min_quality, None
+    low, high = min_quality, max_quality - 1
+    while high - low >= tolerance:
+        quality = (low + high) // 2
+        encoded = encode_image(img, image_format, quality)
+        if len(encoded) <= max_bytes:
+            best_quality, best = quality, encoded
+            low = quality + 1
+        else:
+            high = quality - 1
+
+    if best is None:
+        best = encode_image(img, image_format, min_quality)
+    return best_quality, best
+
+
+def compress_image_as(file_bytes: bytes, image_format: str = None, max_size_kb: int = None,
+                      max_dimension: int = None) -> tuple[bytes, str]:
+    """
+    Comprime uma imagem: reduz até max_dimension, corrige a orientação, remove metadados e
+    escolhe a maior qualidade que cabe em max_size_kb. Imagens com transparência mantêm o
+    canal alfa nos formatos que o suportam.
+
+    Args:
+        file_bytes: Bytes da imagem original
+        image_format: 'webp', 'avif' ou 'jpeg' (padrão: primeiro disponível de IMAGE_COMPRESSION['formats']);
+            formatos sem codificador instalado caem para JPEG
+        max_size_kb: Tamanho máximo em KB (padrão: IMAGE_COMPRESSION['max_size_kb'])
+        max_dimension: Maior lado em pixels (padrão: IMAGE_COMPRESSION['max_dimension'])
+
+    Returns:
+        Tupla (bytes comprimidos, formato usado)
+    """
+    image_format = choose_format((image_format,) if image_format else None)
+    max_size_kb = max_size_kb or IMAGE_COMPRESSION['max_size_kb']
+    max_dimension = max_dimension or IMAGE_COMPRESSION['max_dimension']
+
+    img = load_image(file_bytes, max_dimension, keep_alpha=IMAGE_FORMATS[image_format]['alpha'])
+    quality, compressed = find_quality(
+        img, max_size_kb * 1024,
+        max_quality=IMAGE_COMPRESSION['quality'][image_format],
+        min_quality=IMAGE_COMPRESSION['min_quality'],
+        tolerance=IMAGE_COMPRESSION['quality_tolerance'],
+        image_format=image_format,
+    )
+    if image_format == 'jpeg':
+        # A busca codifica sem optimize (mais rápido); a tabela de Huffman otimizada só reduz o arquivo
+        compressed = encode_image(img, 'jpeg', quality, optimize=True)
+
+    logger.info(f"Imagem comprimida: {len(file_bytes)/1024:.1f}KB -> {len(compressed)/1024:.1f}KB "
+                f"({image_format.upper()} {img.size[0]}x{img.size[1]} {img.mode}, qualidade {quality})")
+    return compressed, image_format
+
+
+def compress_image(file_bytes: bytes, max_size_kb: int = None, max_dimension: int = None) -> bytes:
+    """Comprime em JPEG (formato aceito por qualquer cliente); veja compress_image_as"""
+    return compress_image_as(file_bytes, 'jpeg', max_size_kb, max_dimension)[0]
+
+
+def generate_renditions(file_bytes: bytes, widths, quality: int) -> dict[int, bytes]:
+    """
+    Gera versões reduzidas (WebP) da imagem, uma por largura.
+
+    Returns:
+        Dict {largura: bytes}
+    """
+    img = Image.open(io.BytesIO(file_bytes))
+    img.load()
+    if img.mode not in ('RGB', 'RGBA'):
+        img = img.convert('RGB')
+
+    renditions = {}
+    for width in sorted(widths):
+        rendition = img.copy()
+        rendition.thumbnail((width, width * 4), Image.Resampling.LANCZOS)
+        output = io.BytesIO()
+        rendition.save(output, format='WEBP', quality=quality, method=4)
+        renditions[width] = output.getvalue()
+    return renditions
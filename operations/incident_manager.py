@@ -1,11 +1,105 @@
 import streamlit as st
 import pandas as pd
 import logging
+import threading
+from collections import OrderedDict
 from datetime import date
 from database.supabase_operations import SupabaseOperations
+from database.table_cache import TableCache
+from operations.data_export import EXPORT_CHUNK_SIZE
+from operations.incident_search import build_incident_search_index
+from operations.similar_incidents import build_trigram_index
 
 logger = logging.getLogger('abrangencia_app.incident_manager')
 
+# Índices em memória (similaridade e busca sem a migração 003), um por usuário (RLS), descartando o menos usado
+MAX_USER_INDEXES = 8
+
+# Configuração de busca criada pela migração 003 (português + remoção de acentos)
+SEARCH_TS_CONFIG = "app.portuguese_unaccent"
+SEARCH_TS_QUERY = f"websearch_to_tsquery('{SEARCH_TS_CONFIG}', :search)"
+
+# Incidente cujo texto, ou o de alguma ação de bloqueio, corresponde à busca
+FULL_TEXT_MATCH_CONDITION = f"""(
+    i.search_vector @@ {SEARCH_TS_QUERY}
+    OR EXISTS (
+        SELECT 1 FROM acoes_bloqueio ab
+        WHERE ab.id_incidente = i.id AND ab.search_vector @@ {SEARCH_TS_QUERY}
+    )
+)"""
+
+# Relevância: texto do incidente + metade da melhor ação de bloqueio
+FULL_TEXT_RANK = f"""(
+    ts_rank(i.search_vector, {SEARCH_TS_QUERY})
+    + 0.5 * COALESCE((
+        SELECT MAX(ts_rank(ab.search_vector, {SEARCH_TS_QUERY}))
+        FROM acoes_bloqueio ab
+        WHERE ab.id_incidente = i.id
+    ), 0)
+)"""
+
+# Tabelas envolvidas nas consultas paginadas (versões usadas como chave de cache)
+INCIDENT_QUERY_TABLES = ("incidentes", "plano_de_acao_abrangencia", "acoes_bloqueio")
+
+# Incidente com pelo menos uma ação de abrangência registrada pela unidade
+UNIT_COVERAGE_CONDITION = """EXISTS (
+    SELECT 1
+    FROM plano_de_acao_abrangencia p
+    JOIN acoes_bloqueio a ON a.id = p.id_acao_bloqueio
+    WHERE a.id_incidente = i.id
+      AND p.unidade_operacional = :unit_name
+)"""
+
+# Origem das consultas do plano de ação (joins mantidos como LEFT para não perder itens órfãos)
+ACTION_PLAN_FROM = """FROM plano_de_acao_abrangencia p
+    LEFT JOIN acoes_bloqueio a ON a.id = p.id_acao_bloqueio
+    LEFT JOIN incidentes i ON i.id = a.id_incidente"""
+
+# Mesmo modelo de status de front/plano_de_acao.add_action_status_columns, avaliado no banco.
+# COALESCE como o fillna('') de lá: status NULL conta como aberto (NOT de NULL seria NULL)
+ACTION_CLOSED_CONDITION = "COALESCE(lower(p.status), '') IN ('concluído', 'cancelado')"
+ACTION_OVERDUE_CONDITION = "(COALESCE(lower(p.status), '') IN ('pendente', 'em andamento') AND p.prazo_inicial < CURRENT_DATE)"
+
+class UserIndexCache:
+    """
+    Índices em memória por usuário (o RLS define quais incidentes cada um enxerga), cada um
+    atrelado à versão das tabelas de origem no TableCache. Mantém no máximo max_entries
+    usuários; o menos usado é descartado. Sessões de usuários diferentes não se revezam
+    reconstruindo o mesmo índice.
+    """
+
+    def __init__(self, max_entries: int = MAX_USER_INDEXES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # e-mail -> (versão, índice), em ordem de uso
+        self._lock = threading.Lock()
+
+    def get(self, user_email: str, version, build):
+        """Índice do usuário na versão informada; build() o constrói quando falta ou está defasado"""
+        with self._lock:
+            cached = self._entries.get(user_email)
+            if cached and cached[0] == version:
+                self._entries.move_to_end(user_email)
+                return cached[1]
+
+        # Constrói fora do lock: a carga dos dados pode consultar o banco
+        index = build()
+        self.put(user_email, version, index)
+        return index
+
+    def put(self, user_email: str, version, index):
+        with self._lock:
+            self._entries[user_email] = (version, index)
+            self._entries.move_to_end(user_email)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def peek(self, user_email: str):
+        """Índice do usuário em qualquer versão (None se não houver), sem alterar a ordem de uso"""
+        with self._lock:
+            cached = self._entries.get(user_email)
+        return cached[1] if cached else None
+
+
 @st.cache_resource
 def get_incident_manager():
     return IncidentManager()
@@ -16,24 +110,275 @@ class IncidentManager:
         self.db = SupabaseOperations()
         if not self.db.engine:  
             raise ConnectionError("Falha na conexão com o Supabase.")
+        self._full_text_available = None
+        self._search_indexes = UserIndexCache()
+        self._similarity_indexes = UserIndexCache()
 
     def get_all_incidents(self) -> pd.DataFrame:
         """Retorna todos os incidentes"""
         return self.db.get_table_data("incidentes")
 
-    def add_incident(self, numero_alerta: str, evento_resumo: str, data_evento: date, 
-                     o_que_aconteceu: str, por_que_aconteceu: str, foto_url: str, 
-                     anexos_url: str) -> int | None:
-        """Adiciona um novo incidente com validação"""
-        
-        # Validar inputs
+    def _build_incident_filters(self, search: str = None, date_from: date = None, date_to: date = None,
+                                unit_name: str = None, covered: bool = None) -> tuple[str, dict]:
+        """Monta a cláusula WHERE (e os parâmetros) das consultas paginadas de incidentes"""
+        conditions = []
+        params = {}
+
+        if search and search.strip():
+            if self._is_full_text_available():
+                conditions.append(FULL_TEXT_MATCH_CONDITION)
+                params['search'] = search.strip()
+            else:
+                conditions.append("i.id = ANY(CAST(:search_ids AS bigint[]))")
+                params['search_ids'] = self._search_in_memory(search.strip())
+
+        if date_from:
+            conditions.append("i.data_evento >= :date_from")
+            params['date_from'] = date_from
+        if date_to:
+            conditions.append("i.data_evento <= :date_to")
+            params['date_to'] = date_to
+
+        if unit_name and covered is not None:
+            conditions.append(UNIT_COVERAGE_CONDITION if covered else f"NOT {UNIT_COVERAGE_CONDITION}")
+            params['unit_name'] = unit_name
+
+        where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        return where_clause, params
+
+    def _is_full_text_available(self) -> bool:
+        """Verifica uma vez por processo se a migração de busca textual foi aplicada"""
+        if self._full_text_available is None:
+            result = self.db.execute_query("""
+                SELECT EXISTS(
+                    SELECT 1
+                    FROM information_schema.columns
+                    WHERE table_name = 'incidentes' AND column_name = 'search_vector'
+                ) AS available
+            """)
+            if result.empty:
+                # Falha na consulta: tenta de novo na próxima busca
+                return False
+            self._full_text_available = bool(result['available'].iloc[0])
+            if not self._full_text_available:
+                logger.warning("Coluna search_vector ausente; busca usará índice em memória")
+        return self._full_text_available
+
+    def _search_in_memory(self, search: str) -> list[int]:
+        """IDs de incidentes ordenados por relevância, pelo índice invertido em memória"""
+        index = self._search_indexes.get(
+            self.db.get_current_user_email(),
+            TableCache().versions("incidentes", "acoes_bloqueio"),
+            lambda: build_incident_search_index(self.get_all_incidents(), self.get_all_blocking_actions())
+        )
+        return index.search(search)
+
+    @st.cache_data(ttl=300, show_spinner=False)
+    def _run_cached_query(_self, query: str, params: dict, user_email: str, table_versions: tuple) -> pd.DataFrame:
+        """Executa a consulta; user_email (escopo RLS) e table_versions servem apenas como chave de cache"""
+        return _self.db.execute_query(query, params)
+
+    def _cached_query(self, query: str, params: dict) -> pd.DataFrame:
+        return self._run_cached_query(
+            query, params, self.db.get_current_user_email(), TableCache().versions(*INCIDENT_QUERY_TABLES)
+        )
+
+    def count_incidents(self, search: str = None, date_from: date = None, date_to: date = None,
+                        unit_name: str = None, covered: bool = None) -> int:
+        """
+        Conta incidentes no banco aplicando os mesmos filtros da listagem paginada.
+
+        Args:
+            covered: True/False filtra incidentes já analisados/pendentes pela unidade (unit_name)
+        """
+        where_clause, params = self._build_incident_filters(search, date_from, date_to, unit_name, covered)
+        result = self._cached_query(f"SELECT COUNT(*) AS total FROM incidentes i {where_clause}", params)
+        return int(result['total'].iloc[0]) if not result.empty else 0
+
+    def get_incidents_page(self, page: int, per_page: int, search: str = None, date_from: date = None,
+                           date_to: date = None, unit_name: str = None, covered: bool = None) -> pd.DataFrame:
+        """
+        Retorna uma página de incidentes com os filtros aplicados no banco:
+        mais recentes primeiro ou, havendo busca, mais relevantes primeiro.
+        """
+        where_clause, params = self._build_incident_filters(search, date_from, date_to, unit_name, covered)
+        params = {**params, 'limit': per_page, 'offset': max(page - 1, 0) * per_page}
+
+        # Com busca, os resultados seguem a relevância
+        order_by = "i.data_evento DESC NULLS LAST, i.id DESC"
+        if 'search' in params:
+            order_by = f"{FULL_TEXT_RANK} DESC, {order_by}"
+        elif 'search_ids' in params:
+            order_by = f"array_position(CAST(:search_ids AS bigint[]), i.id::bigint), {order_by}"
+
+        query = f"""
+            SELECT {self.db.column_list('incidentes', 'i')}
+            FROM incidentes i
+            {where_clause}
+            ORDER BY {order_by}
+            LIMIT :limit OFFSET :offset
+        """
+        return self._cached_query(query, params)
+
+    def _build_action_plan_filters(self, unit_name: str = None, status: str = None,
+                                   deadline_from: date = None, deadline_to: date = None) -> tuple[str, dict]:
+        """
+        Monta a cláusula WHERE (e os parâmetros) das consultas do plano de ação.
+
+        Args:
+            status: 'open' (não encerradas), 'closed' (concluídas/canceladas) ou None
+        """
+        conditions = []
+        params = {}
+
+        if unit_name:
+            conditions.append("p.unidade_operacional = :unit_name")
+            params['unit_name'] = unit_name
+        if status == 'open':
+            conditions.append(f"NOT {ACTION_CLOSED_CONDITION}")
+        elif status == 'closed':
+            conditions.append(ACTION_CLOSED_CONDITION)
+        if deadline_from:
+            conditions.append("p.prazo_inicial >= :deadline_from")
+            params['deadline_from'] = deadline_from
+        if deadline_to:
+            conditions.append("p.prazo_inicial <= :deadline_to")
+            params['deadline_to'] = deadline_to
+
+        where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        return where_clause, params
+
+    def get_action_plan_units(self) -> list[str]:
+        """Unidades que possuem itens no plano de ação"""
+        result = self._cached_query("""
+            SELECT DISTINCT unidade_operacional
+            FROM plano_de_acao_abrangencia
+            WHERE unidade_operacional IS NOT NULL
+            ORDER BY unidade_operacional
+        """, {})
+        return result['unidade_operacional'].tolist() if not result.empty else []
+
+    def count_action_plan(self, unit_name: str = None, status: str = None,
+                          deadline_from: date = None, deadline_to: date = None) -> dict:
+        """Totais do plano de ação (incidentes, ações, abertas, atrasadas) calculados no banco"""
+        where_clause, params = self._build_action_plan_filters(unit_name, status, deadline_from, deadline_to)
+        query = f"""
+            -- Ações sem incidente (id_incidente NULL) formam um grupo na listagem: conta como um incidente
+            SELECT COUNT(DISTINCT COALESCE(a.id_incidente, -1)) AS incidentes,
+                   COUNT(*) AS total,
+                   COUNT(*) FILTER (WHERE NOT {ACTION_CLOSED_CONDITION}) AS abertas,
+                   COUNT(*) FILTER (WHERE {ACTION_OVERDUE_CONDITION}) AS atrasadas
+            {ACTION_PLAN_FROM}
+            {where_clause}
+        """
+        result = self._cached_query(query, params)
+        if result.empty:
+            return {'incidentes': 0, 'total': 0, 'abertas': 0, 'atrasadas': 0}
+        return {key: int(value or 0) for key, value in result.iloc[0].items()}
+
+    def get_action_plan_groups_page(self, page: int, per_page: int, unit_name: str = None, status: str = None,
+                                    deadline_from: date = None, deadline_to: date = None) -> pd.DataFrame:
+        """
+        Retorna uma página de incidentes do plano de ação (mais recentes primeiro), apenas com
+        os totais por incidente; os itens são carregados sob demanda por get_action_plan_items.
+        """
+        where_clause, params = self._build_action_plan_filters(unit_name, status, deadline_from, deadline_to)
+        params = {**params, 'limit': per_page, 'offset': max(page - 1, 0) * per_page}
+        query = f"""
+            SELECT a.id_incidente,
+                   COALESCE(MAX(i.evento_resumo), 'Incidente original não encontrado') AS evento_resumo,
+                   COUNT(*) AS total,
+                   COUNT(*) FILTER (WHERE {ACTION_CLOSED_CONDITION}) AS concluidas,
+                   COUNT(*) FILTER (WHERE {ACTION_OVERDUE_CONDITION}) AS atrasadas
+            {ACTION_PLAN_FROM}
+            {where_clause}
+            GROUP BY a.id_incidente
+            ORDER BY MAX(i.data_evento) DESC NULLS LAST, a.id_incidente DESC NULLS LAST
+            LIMIT :limit OFFSET :offset
+        """
+        return self._cached_query(query, params)
+
+    def _action_plan_rows_query(self, where_clause: str) -> str:
+        return f"""
+            SELECT p.*,
+                   a.id_incidente,
+                   COALESCE(a.descricao_acao, 'Descrição da ação não encontrada') AS descricao_acao,
+                   COALESCE(i.evento_resumo, 'Incidente original não encontrado') AS evento_resumo
+            {ACTION_PLAN_FROM}
+            {where_clause}
+        """
+
+    def get_action_plan_items(self, incident_id, unit_name: str = None, status: str = None,
+                              deadline_from: date = None, deadline_to: date = None) -> pd.DataFrame:
+        """Itens do plano de ação de um incidente, com os mesmos filtros da listagem"""
+        where_clause, params = self._build_action_plan_filters(unit_name, status, deadline_from, deadline_to)
+        incident_condition = "a.id_incidente IS NOT DISTINCT FROM :incident_id"
+        where_clause = f"{where_clause} AND {incident_condition}" if where_clause else f"WHERE {incident_condition}"
+        params = {**params, 'incident_id': None if pd.isna(incident_id) else int(incident_id)}
+        query = self._action_plan_rows_query(where_clause) + " ORDER BY p.prazo_inicial NULLS LAST, p.id"
+        return self._cached_query(query, params)
+
+    def get_action_plan_rows_page(self, page: int, per_page: int, unit_name: str = None, status: str = None,
+                                  deadline_from: date = None, deadline_to: date = None) -> pd.DataFrame:
+        """Uma página dos itens do plano de ação (histórico em tabela)"""
+        where_clause, params = self._build_action_plan_filters(unit_name, status, deadline_from, deadline_to)
+        params = {**params, 'limit': per_page, 'offset': max(page - 1, 0) * per_page}
+        query = self._action_plan_rows_query(where_clause) + """
+            ORDER BY i.data_evento DESC NULLS LAST, a.id_incidente DESC NULLS LAST, p.prazo_inicial NULLS LAST, p.id
+            LIMIT :limit OFFSET :offset
+        """
+        return self._cached_query(query, params)
+
+    def stream_action_plan_rows(self, unit_name: str = None, status: str = None,
+                                deadline_from: date = None, deadline_to: date = None):
+        """Itens do plano de ação filtrados, em blocos de um cursor do servidor (exportação)"""
+        where_clause, params = self._build_action_plan_filters(unit_name, status, deadline_from, deadline_to)
+        query = f"""
+            SELECT p.unidade_operacional, i.evento_resumo, a.descricao_acao, p.detalhes_conclusao, p.status,
+                   p.responsavel_email, p.co_responsavel_email, p.prazo_inicial, p.data_conclusao, p.url_evidencia
+            {ACTION_PLAN_FROM}
+            {where_clause}
+            ORDER BY i.data_evento DESC NULLS LAST, a.id_incidente DESC NULLS LAST, p.prazo_inicial NULLS LAST, p.id
+        """
+        return self.db.stream_query(query, params, EXPORT_CHUNK_SIZE)
+
+    def _get_similarity_index(self):
+        """Índice de trigramas dos resumos visíveis ao usuário; reconstruído apenas quando incidentes muda fora deste processo"""
+        return self._similarity_indexes.get(
+            self.db.get_current_user_email(),
+            TableCache().version("incidentes"),
+            lambda: build_trigram_index(self.get_all_incidents())
+        )
+
+    def find_similar_incidents(self, evento_resumo: str, top_k: int = 5, min_similarity: float = 0.3) -> pd.DataFrame:
+        """
+        Sugere incidentes já cadastrados com resumo parecido (possíveis duplicados).
+
+        Returns:
+            DataFrame dos incidentes encontrados com a coluna 'similaridade', do mais parecido ao menos
+        """
+        if not evento_resumo or not evento_resumo.strip():
+            return pd.DataFrame()
+
+        matches = self._get_similarity_index().query(evento_resumo, top_k=top_k, min_similarity=min_similarity)
+        if not matches:
+            return pd.DataFrame()
+
+        similarity_by_id = dict(matches)
+        incidents_df = self.get_all_incidents()
+        similar_df = incidents_df[incidents_df['id'].isin(similarity_by_id.keys())].copy()
+        similar_df['similaridade'] = similar_df['id'].map(similarity_by_id)
+        return similar_df.sort_values('similaridade', ascending=False)
+
+    def _build_incident_data(self, numero_alerta: str, evento_resumo: str, data_evento: date,
+                             o_que_aconteceu: str, por_que_aconteceu: str, foto_url: str,
+                             anexos_url: str) -> dict | None:
+        """Valida e normaliza os campos de um novo incidente"""
         if not all([numero_alerta, evento_resumo, data_evento]):
             logger.error("Campos obrigatórios ausentes")
             return None
-        
-        logger.info(f"Adicionando novo incidente: {numero_alerta}")
-        
-        incident_data = {
+
+        return {
             "numero_alerta": str(numero_alerta).strip(),
             "evento_resumo": str(evento_resumo).strip(),
             "data_evento": data_evento,
@@ -42,9 +387,52 @@ class IncidentManager:
             "foto_url": str(foto_url).strip() if foto_url else "",
             "anexos_url": str(anexos_url).strip() if anexos_url else ""
         }
+
+    def _index_new_incident(self, incident_id: int, evento_resumo: str):
+        """Mantém o índice de similaridade atualizado sem reconstruí-lo"""
+        user_email = self.db.get_current_user_email()
+        index = self._similarity_indexes.peek(user_email)
+        if index is not None:
+            index.add(int(incident_id), evento_resumo)
+            # Os índices dos demais usuários ficam com a versão antiga e são reconstruídos (RLS)
+            self._similarity_indexes.put(user_email, TableCache().version("incidentes"), index)
+
+    def add_incident(self, numero_alerta: str, evento_resumo: str, data_evento: date, 
+                     o_que_aconteceu: str, por_que_aconteceu: str, foto_url: str, 
+                     anexos_url: str) -> int | None:
+        """Adiciona um novo incidente com validação"""
+        incident_data = self._build_incident_data(numero_alerta, evento_resumo, data_evento,
+                                                  o_que_aconteceu, por_que_aconteceu, foto_url, anexos_url)
+        if not incident_data:
+            return None
+        
+        logger.info(f"Adicionando novo incidente: {numero_alerta}")
         
         result = self.db.insert_row("incidentes", incident_data)
-        return result['id'] if result else None
+        if not result:
+            return None
+
+        self._index_new_incident(result['id'], incident_data['evento_resumo'])
+        return result['id']
+
+    def add_incident_with_actions(self, numero_alerta: str, evento_resumo: str, data_evento: date,
+                                  o_que_aconteceu: str, por_que_aconteceu: str, foto_url: str,
+                                  anexos_url: str, descriptions: list[str]) -> int | None:
+        """Adiciona um novo incidente e suas ações de bloqueio na mesma transação"""
+        incident_data = self._build_incident_data(numero_alerta, evento_resumo, data_evento,
+                                                  o_que_aconteceu, por_que_aconteceu, foto_url, anexos_url)
+        if not incident_data:
+            return None
+
+        logger.info(f"Adicionando novo incidente com {len(descriptions or [])} ações de bloqueio: {numero_alerta}")
+
+        actions_data = [{"descricao_acao": desc} for desc in descriptions or []]
+        result = self.db.insert_row_with_children("incidentes", incident_data, "acoes_bloqueio", "id_incidente", actions_data)
+        if not result:
+            return None
+
+        self._index_new_incident(result['id'], incident_data['evento_resumo'])
+        return result['id']
 
     def get_all_blocking_actions(self) -> pd.DataFrame:
         """Retorna todas as ações de bloqueio"""
@@ -0,0 +1,129 @@
+import re
+import math
+import unicodedata
+import logging
+from collections import defaultdict
+import pandas as pd
+
+logger = logging.getLogger('abrangencia_app.incident_search')
+
+# Pesos por campo, equivalentes aos setweight A/B/C da migração 003
+FIELD_WEIGHTS = {
+    "numero_alerta": 1.0,
+    "evento_resumo": 1.0,
+    "o_que_aconteceu": 0.4,
+    "por_que_aconteceu": 0.2,
+}
+# Peso das descrições das ações de bloqueio do incidente
+BLOCKING_ACTION_WEIGHT = 0.5
+
+PT_STOPWORDS = {
+    "a", "o", "as", "os", "um", "uma", "uns", "umas", "de", "do", "da", "dos", "das",
+    "em", "no", "na", "nos", "nas", "por", "para", "pelo", "pela", "com", "sem", "e",
+    "ou", "que", "se", "ao", "aos", "foi", "ser", "era", "sua", "seu", "suas", "seus",
+}
+
+# Sufixos removidos na redução de palavras (do mais longo ao mais curto)
+PT_SUFFIXES = (
+    "amentos", "imentos", "amento", "imento", "acoes", "icoes", "mente", "idades", "idade",
+    "acao", "icao", "ados", "idos", "adas", "idas", "ado", "ido", "ada", "ida",
+    "ar", "er", "ir", "es", "as", "os", "s", "a", "o", "e",
+)
+MIN_STEM_LENGTH = 3
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def fold_accents(text: str) -> str:
+    normalized = unicodedata.normalize("NFKD", text)
+    return "".join(char for char in normalized if not unicodedata.combining(char))
+
+
+def stem_token(token: str) -> str:
+    """Redução simples de sufixos do português (aproximação do portuguese_stem do Postgres)"""
+    if token.isdigit():
+        return token
+    for suffix in PT_SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= MIN_STEM_LENGTH:
+            return token[:-len(suffix)]
+    return token
+
+
+def tokenize(text) -> list[str]:
+    """Minúsculas, sem acentos, sem stopwords e reduzido aos radicais"""
+    if text is None or (isinstance(text, float) and math.isnan(text)):
+        return []
+    tokens = _TOKEN_PATTERN.findall(fold_accents(str(text)).lower())
+    return [stem_token(token) for token in tokens if token not in PT_STOPWORDS]
+
+
+class InvertedIndex:
+    """
+    Índice invertido em memória: termo → {id do documento: peso acumulado}.
+    Fallback da busca textual quando a migração de full-text search não foi aplicada.
+    """
+
+    def __init__(self):
+        self._postings = defaultdict(dict)
+        self._documents = set()
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def add(self, doc_id, text, weight: float = 1.0):
+        self._documents.add(doc_id)
+        for term in tokenize(text):
+            postings = self._postings[term]
+            postings[doc_id] = postings.get(doc_id, 0.0) + weight
+
+    def search(self, query: str) -> list:
+        """
+        Documentos que contêm todos os termos da consulta, ordenados por relevância
+        (soma de frequência ponderada × idf de cada termo).
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+
+        postings = [self._postings.get(term) for term in terms]
+        if any(not posting for posting in postings):
+            return []
+
+        # Interseção começando pela lista mais curta
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates.intersection_update(posting)
+            if not candidates:
+                return []
+
+        total_docs = len(self._documents)
+        scores = dict.fromkeys(candidates, 0.0)
+        for posting in postings:
+            idf = math.log(1 + total_docs / len(posting))
+            for doc_id in candidates:
+                scores[doc_id] += math.log1p(posting[doc_id]) * idf
+
+        # Empate: incidentes mais recentes (id maior) primeiro
+        return sorted(candidates, key=lambda doc_id: (-scores[doc_id], -doc_id))
+
+
+def build_incident_search_index(incidents_df: pd.DataFrame, blocking_actions_df: pd.DataFrame) -> InvertedIndex:
+    """Indexa os campos textuais dos incidentes e as descrições das ações de bloqueio"""
+    index = InvertedIndex()
+    if incidents_df.empty:
+        return index
+
+    for field, weight in FIELD_WEIGHTS.items():
+        if field not in incidents_df.columns:
+            continue
+        for doc_id, text in zip(incidents_df['id'], incidents_df[field]):
+            index.add(int(doc_id), text, weight)
+
+    if not blocking_actions_df.empty and {'id_incidente', 'descricao_acao'}.issubset(blocking_actions_df.columns):
+        actions = blocking_actions_df.dropna(subset=['id_incidente'])
+        for doc_id, text in zip(actions['id_incidente'], actions['descricao_acao']):
+            index.add(int(doc_id), text, BLOCKING_ACTION_WEIGHT)
+
+    logger.info(f"Índice de busca em memória construído: {len(index)} incidente(s)")
+    return index
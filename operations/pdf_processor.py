@@ -4,20 +4,55 @@ import json
 from datetime import datetime
 from typing import Dict, List, Optional, Tuple
 import logging
+import importlib.util
 from io import BytesIO
+from concurrent.futures import Future
+from operations.cpu_pool import CpuTaskPool, CpuPoolBusyError, wait_for_task
 
-try:
-    import PyPDF2
+logger = logging.getLogger('pdf_processor')
+
+# Bibliotecas de PDF importadas apenas quando usadas (são pesadas e só servem a duas páginas)
+PDF_LIBRARIES = ("pdfplumber", "pdf2image", "PIL")
+
+def get_missing_pdf_libraries() -> list[str]:
+    """Verifica a instalação sem importar as bibliotecas"""
+    return [name for name in PDF_LIBRARIES if importlib.util.find_spec(name) is None]
+
+def read_pdf_content(pdf_bytes: bytes) -> Tuple[str, List]:
+    """Texto completo e tabelas de todas as páginas (roda no CpuTaskPool)"""
     import pdfplumber
-    import fitz  # PyMuPDF
+
+    # pdfplumber é melhor para tabelas e texto estruturado
+    with pdfplumber.open(BytesIO(pdf_bytes)) as pdf:
+        full_text = ""
+        tables = []
+
+        for page in pdf.pages:
+            # Extrai texto da página
+            page_text = page.extract_text()
+            if page_text:
+                full_text += page_text + "\n"
+
+            # Extrai tabelas da página
+            page_tables = page.extract_tables()
+            if page_tables:
+                tables.extend(page_tables)
+
+    return full_text, tables
+
+
+def _extract_incident_fields(pdf_bytes: bytes) -> Dict:
+    # Leitura e análise do texto no mesmo processo do pool: só o dict volta para o Streamlit
+    full_text, tables = read_pdf_content(pdf_bytes)
+    return PDFProcessor()._parse_incident_text(full_text, tables)
+
+
+def render_pdf_preview(pdf_bytes: bytes, max_pages: int, dpi: int = 150) -> List["Image.Image"]:
+    """Imagens das primeiras páginas (roda no CpuTaskPool)"""
     from pdf2image import convert_from_bytes
-    from PIL import Image
-    PDF_LIBRARIES_AVAILABLE = True
-except ImportError as e:
-    PDF_LIBRARIES_AVAILABLE = False
-    st.warning(f"Bibliotecas de PDF não disponíveis: {e}")
 
-logger = logging.getLogger('pdf_processor')
+    return convert_from_bytes(pdf_bytes, first_page=1, last_page=max_pages, dpi=dpi)
+
 
 class PDFProcessor:
     """
@@ -26,24 +61,29 @@ class PDFProcessor:
     """
     
     def __init__(self):
-        if not PDF_LIBRARIES_AVAILABLE:
-            raise ImportError("Bibliotecas de PDF necessárias não estão instaladas")
+        missing = get_missing_pdf_libraries()
+        if missing:
+            raise ImportError(f"Bibliotecas de PDF necessárias não estão instaladas: {', '.join(missing)}")
     
-    def extract_incident_data(self, pdf_file, use_ai: bool = False) -> Dict:
+    def extract_incident_data(self, pdf_file, use_ai: bool = False, on_tick=None) -> Dict:
         """
         Extrai dados de incidente do PDF usando diferentes estratégias.
         
         Args:
             pdf_file: Arquivo PDF carregado pelo Streamlit
             use_ai: Se True, usa IA (apenas para admins). Se False, usa processamento tradicional.
+            on_tick: Chamado com os segundos decorridos enquanto o processamento tradicional roda
         
         Returns:
             Dict com os dados extraídos do incidente
+
+        Raises:
+            CpuPoolBusyError: Se a fila de processamento estiver cheia
         """
         if use_ai:
             return self._extract_with_ai(pdf_file)
         else:
-            return self._extract_with_traditional_methods(pdf_file)
+            return self._extract_with_traditional_methods(pdf_file, on_tick)
     
     def _extract_with_ai(self, pdf_file) -> Dict:
         """
@@ -81,33 +121,25 @@ class PDFProcessor:
             # Fallback para método tradicional
             return self._extract_with_traditional_methods(pdf_file)
     
-    def _extract_with_traditional_methods(self, pdf_file) -> Dict:
+    def submit_traditional_extraction(self, pdf_file) -> Future:
+        """
+        Envia a extração tradicional para o CpuTaskPool sem esperar.
+
+        Returns:
+            Future com o Dict dos dados extraídos
+        """
+        return CpuTaskPool().submit(_extract_incident_fields, pdf_file.getvalue())
+
+    def _extract_with_traditional_methods(self, pdf_file, on_tick=None) -> Dict:
         """
         Extrai dados usando bibliotecas especializadas de PDF.
-        Método principal para usuários normais.
+        Método principal para usuários normais. A leitura roda em outro processo;
+        esta thread só espera o resultado.
         """
         try:
-            # Lê o PDF usando pdfplumber (melhor para tabelas e texto estruturado)
-            with pdfplumber.open(BytesIO(pdf_file.getvalue())) as pdf:
-                full_text = ""
-                tables = []
-                
-                for page in pdf.pages:
-                    # Extrai texto da página
-                    page_text = page.extract_text()
-                    if page_text:
-                        full_text += page_text + "\n"
-                    
-                    # Extrai tabelas da página
-                    page_tables = page.extract_tables()
-                    if page_tables:
-                        tables.extend(page_tables)
-            
-            # Processa o texto extraído
-            incident_data = self._parse_incident_text(full_text, tables)
-            
-            return incident_data
-            
+            return wait_for_task(self.submit_traditional_extraction(pdf_file), on_tick)
+        except CpuPoolBusyError:
+            raise
         except Exception as e:
             logger.error(f"Erro na extração tradicional: {e}")
             st.error(f"Erro ao processar PDF: {e}")
@@ -254,7 +286,7 @@ class PDFProcessor:
             'recomendacoes': ["Recomendações não disponíveis"]
         }
     
-    def generate_pdf_preview(self, pdf_file, max_pages: int = 3) -> List[Image.Image]:
+    def generate_pdf_preview(self, pdf_file, max_pages: int = 3) -> List["Image.Image"]:
         """
         Gera preview visual do PDF para exibição.
         
@@ -266,13 +298,7 @@ class PDFProcessor:
             Lista de imagens PIL das páginas
         """
         try:
-            images = convert_from_bytes(
-                pdf_file.getvalue(),
-                first_page=1,
-                last_page=max_pages,
-                dpi=150
-            )
-            return images
+            return CpuTaskPool().run(render_pdf_preview, pdf_file.getvalue(), max_pages, 150)
         except Exception as e:
             logger.error(f"Erro ao gerar preview: {e}")
             return []
@@ -285,6 +311,8 @@ class PDFProcessor:
             Tuple (is_valid, message)
         """
         try:
+            import pdfplumber
+
             with pdfplumber.open(BytesIO(pdf_file.getvalue())) as pdf:
                 if len(pdf.pages) == 0:
                     return False, "PDF não contém páginas"
@@ -0,0 +1,204 @@
+import io
+import sys
+import time
+import pstats
+import cProfile
+import marshal
+import threading
+import logging
+from collections import Counter, deque
+from contextlib import contextmanager
+from datetime import datetime
+
+logger = logging.getLogger('abrangencia_app.render_profiler')
+
+# Renderizações mantidas em memória para o painel de administração
+MAX_PROFILES = 20
+# Intervalo da amostragem de pilhas (árvore de chamadas / flamegraph)
+SAMPLE_INTERVAL_SECONDS = 0.005
+TOP_FUNCTIONS = 25
+
+# Categoria de cada trecho de código, pelo caminho do arquivo (primeiro padrão que casar)
+CATEGORY_PATTERNS = [
+    ("Banco de dados", ("sqlalchemy", "psycopg2", "database/supabase_operations", "database/table_cache", "database/matrix_manager")),
+    ("Storage", ("storage3", "supabase", "httpx", "httpcore", "PIL", "database/supabase_storage")),
+    ("Pandas", ("pandas", "numpy")),
+    ("Widgets", ("streamlit",)),
+]
+OTHER_CATEGORY = "Código do app"
+
+# Um perfil por vez no processo (cProfile.enable falha com outro perfil ativo no Python 3.12+)
+_profiling_lock = threading.Lock()
+
+
+def classify_filename(filename: str) -> str | None:
+    """Categoria do arquivo; None para funções nativas (atribuídas a quem as chamou)"""
+    if filename == "~" or not filename:
+        return None
+    normalized = filename.replace("\\", "/")
+    for category, patterns in CATEGORY_PATTERNS:
+        if any(f"/{pattern}" in normalized for pattern in patterns):
+            return category
+    return OTHER_CATEGORY
+
+
+def summarize_stats(stats: pstats.Stats) -> tuple[dict, list]:
+    """
+    Soma o tempo próprio (tottime) de cada função por categoria. Funções nativas
+    (ex.: espera de lock, leitura de socket) entram na categoria de quem mais as chamou.
+
+    Returns:
+        Tupla (segundos por categoria, funções mais caras)
+    """
+    categories = Counter()
+    raw_stats = stats.stats
+
+    for func, (_, _, tottime, _, callers) in raw_stats.items():
+        category = classify_filename(func[0])
+        if category is None:
+            category = OTHER_CATEGORY
+            if callers:
+                # callers: {função chamadora: (cc, nc, tottime, cumtime)}
+                main_caller = max(callers.items(), key=lambda item: item[1][3])[0]
+                category = classify_filename(main_caller[0]) or OTHER_CATEGORY
+        categories[category] += tottime
+
+    top_functions = sorted(raw_stats.items(), key=lambda item: item[1][3], reverse=True)[:TOP_FUNCTIONS]
+    top = [{
+        "função": f"{func[2]} ({func[0].rsplit('/', 1)[-1]}:{func[1]})",
+        "chamadas": calls,
+        "tempo_próprio_s": round(tottime, 4),
+        "tempo_acumulado_s": round(cumtime, 4),
+    } for func, (_, calls, tottime, cumtime, _) in top_functions]
+
+    return dict(categories), top
+
+
+class StackSampler:
+    """Amostra periodicamente a pilha de uma thread e acumula no formato 'folded' do flamegraph"""
+
+    def __init__(self, thread_id: int, interval: float = SAMPLE_INTERVAL_SECONDS):
+        self._thread_id = thread_id
+        self._interval = interval
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.samples = Counter()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="render-stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=1)
+
+    def _run(self):
+        while not self._stop_event.wait(self._interval):
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.samples[";".join(reversed(stack))] += 1
+
+    def to_folded(self) -> str:
+        """Linhas 'pilha;separada;por;ponto-e-vírgula contagem' (flamegraph.pl, speedscope)"""
+        return "\n".join(f"{stack} {count}" for stack, count in self.samples.most_common())
+
+
+class RenderProfiler:
+    """
+    Perfis das renderizações de página (opt-in). Cada execução roda sob cProfile e
+    tem o tempo dividido em banco de dados, storage, pandas, widgets e código do app;
+    com a árvore de chamadas ativada também guarda as pilhas amostradas e o pstats.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            logger.info("Criando instância única de RenderProfiler")
+            cls._instance = super().__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+
+        self._profiles = deque(maxlen=MAX_PROFILES)
+        self._lock = threading.Lock()
+        self._initialized = True
+
+    @contextmanager
+    def profile(self, page_name: str, user_email: str = None, call_tree: bool = False):
+        """
+        Perfila o bloco (uma renderização de página) e registra o resultado.
+        Desde o Python 3.12 só um cProfile pode estar ativo por processo: renderizações
+        simultâneas de outras sessões rodam sem perfil em vez de falhar.
+        """
+        if not _profiling_lock.acquire(blocking=False):
+            logger.info(f"Renderização de '{page_name}' sem perfil: outra já está sendo perfilada")
+            yield
+            return
+
+        try:
+            profiler = cProfile.Profile()
+            started_at = datetime.now()
+            start = time.perf_counter()
+            try:
+                profiler.enable()
+            except ValueError as e:
+                # Outra ferramenta de profiling (ex.: depurador) já está ativa
+                logger.warning(f"Renderização de '{page_name}' sem perfil: {e}")
+                yield
+                return
+
+            sampler = StackSampler(threading.get_ident()) if call_tree else None
+            try:
+                if sampler:
+                    sampler.start()
+                yield
+            finally:
+                profiler.disable()
+                wall_time = time.perf_counter() - start
+                if sampler:
+                    sampler.stop()
+                self._record(page_name, user_email, started_at, wall_time, profiler, sampler)
+        finally:
+            _profiling_lock.release()
+
+    def _record(self, page_name, user_email, started_at, wall_time, profiler, sampler):
+        try:
+            stats = pstats.Stats(profiler, stream=io.StringIO())
+            categories, top_functions = summarize_stats(stats)
+            entry = {
+                "page": page_name,
+                "user": user_email,
+                "started_at": started_at,
+                "wall_time": wall_time,
+                "categories": categories,
+                "top_functions": top_functions,
+                # Formato do arquivo .prof (pstats.dump_stats), abre no snakeviz
+                "pstats": marshal.dumps(stats.stats) if sampler else None,
+                "folded": sampler.to_folded() if sampler else None,
+            }
+        except Exception as e:
+            logger.warning(f"Falha ao processar perfil de '{page_name}': {e}")
+            return
+
+        with self._lock:
+            self._profiles.appendleft(entry)
+        logger.info(f"Renderização de '{page_name}': {wall_time:.2f}s " +
+                    ", ".join(f"{name}={seconds:.2f}s" for name, seconds in sorted(categories.items())))
+
+    def get_profiles(self) -> list[dict]:
+        with self._lock:
+            return list(self._profiles)
+
+    def clear(self):
+        with self._lock:
+            self._profiles.clear()
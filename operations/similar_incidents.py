@@ -0,0 +1,127 @@
+import re
+import heapq
+import threading
+import logging
+from collections import Counter, defaultdict
+from operations.incident_search import fold_accents
+
+logger = logging.getLogger('abrangencia_app.similar_incidents')
+
+try:
+    from fuzzywuzzy import fuzz
+    FUZZY_AVAILABLE = True
+except ImportError:
+    FUZZY_AVAILABLE = False
+    logger.warning("fuzzywuzzy não disponível; similaridade usará apenas trigramas")
+
+# Trigramas presentes em mais que esta fração dos incidentes não geram candidatos
+COMMON_TRIGRAM_RATIO = 0.5
+# Abaixo deste tamanho o índice não descarta trigramas comuns
+MIN_DOCS_FOR_PRUNING = 50
+# Candidatos reavaliados com a similaridade exata para cada resultado pedido
+CANDIDATES_PER_RESULT = 5
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def char_trigrams(text) -> frozenset:
+    """Trigramas de caracteres do texto normalizado (minúsculo, sem acentos e pontuação)"""
+    if not text:
+        return frozenset()
+    normalized = _NON_ALNUM.sub(" ", fold_accents(str(text)).lower()).strip()
+    if not normalized:
+        return frozenset()
+    padded = f"  {normalized} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+class TrigramIndex:
+    """
+    Índice invertido de trigramas dos resumos de incidentes.
+    A busca soma as ocorrências dos trigramas da consulta nas listas do índice
+    (em vez de comparar com todos os incidentes) e reavalia só os melhores candidatos.
+    """
+
+    def __init__(self):
+        self._postings = defaultdict(set)
+        self._trigrams = {}
+        self._texts = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._trigrams)
+
+    def add(self, doc_id, text: str):
+        """Inclui ou substitui um incidente no índice"""
+        text = text if isinstance(text, str) else ""
+        trigrams = char_trigrams(text)
+        with self._lock:
+            self._remove_unlocked(doc_id)
+            self._trigrams[doc_id] = trigrams
+            self._texts[doc_id] = text
+            for trigram in trigrams:
+                self._postings[trigram].add(doc_id)
+
+    def remove(self, doc_id):
+        with self._lock:
+            self._remove_unlocked(doc_id)
+
+    def _remove_unlocked(self, doc_id):
+        for trigram in self._trigrams.pop(doc_id, ()):
+            posting = self._postings.get(trigram)
+            if posting is not None:
+                posting.discard(doc_id)
+                if not posting:
+                    del self._postings[trigram]
+        self._texts.pop(doc_id, None)
+
+    def query(self, text: str, top_k: int = 5, min_similarity: float = 0.3, exclude_id=None) -> list[tuple]:
+        """
+        Incidentes mais parecidos com o texto.
+
+        Returns:
+            Lista de (id do incidente, similaridade entre 0 e 1), da maior para a menor
+        """
+        query_trigrams = char_trigrams(text)
+        if not query_trigrams:
+            return []
+
+        with self._lock:
+            total_docs = len(self._trigrams)
+            if not total_docs:
+                return []
+
+            # Trigramas muito comuns quase não diferenciam os incidentes e custam caro
+            max_posting = int(total_docs * COMMON_TRIGRAM_RATIO) if total_docs >= MIN_DOCS_FOR_PRUNING else total_docs
+            overlap = Counter()
+            for trigram in query_trigrams:
+                posting = self._postings.get(trigram)
+                if posting and len(posting) <= max_posting:
+                    overlap.update(posting)
+            overlap.pop(exclude_id, None)
+
+            candidates = heapq.nlargest(top_k * CANDIDATES_PER_RESULT, overlap, key=overlap.get)
+            candidate_data = [(doc_id, self._trigrams[doc_id], self._texts[doc_id]) for doc_id in candidates]
+
+        results = []
+        for doc_id, doc_trigrams, doc_text in candidate_data:
+            shared = len(query_trigrams & doc_trigrams)
+            similarity = shared / (len(query_trigrams) + len(doc_trigrams) - shared)
+            if FUZZY_AVAILABLE:
+                # Combina com a comparação por palavras (independe da ordem)
+                similarity = (similarity + fuzz.token_set_ratio(text, doc_text) / 100) / 2
+            if similarity >= min_similarity:
+                results.append((doc_id, round(similarity, 3)))
+
+        results.sort(key=lambda item: item[1], reverse=True)
+        return results[:top_k]
+
+
+def build_trigram_index(incidents_df, text_column: str = 'evento_resumo') -> TrigramIndex:
+    index = TrigramIndex()
+    if incidents_df.empty or text_column not in incidents_df.columns:
+        return index
+    for doc_id, text in zip(incidents_df['id'], incidents_df[text_column]):
+        index.add(int(doc_id), text)
+    logger.info(f"Índice de similaridade construído: {len(index)} incidente(s)")
+    return index
@@ -0,0 +1,202 @@
+import re
+import logging
+import pandas as pd
+from sqlalchemy import text
+from database.supabase_config import get_database_engine, get_storage_settings, PUBLIC_IMAGES_BUCKET, RESTRICTED_ATTACHMENTS_BUCKET, ACTION_EVIDENCE_BUCKET
+from database.supabase_storage import SupabaseStorage
+from database.file_blobs import FileBlobRegistry
+
+logger = logging.getLogger('abrangencia_app.storage_gc')
+
+GC_BUCKETS = (PUBLIC_IMAGES_BUCKET, RESTRICTED_ATTACHMENTS_BUCKET, ACTION_EVIDENCE_BUCKET)
+# Objetos removidos por chamada a remove([...]) do Storage
+GC_BATCH_SIZE = 100
+# Objetos mais novos que isto são preservados: o upload pode ter terminado e a linha ainda não ter sido gravada
+GC_MIN_AGE_HOURS = 24
+
+# Objetos sem referência em nenhuma coluna de URL. As versões reduzidas (<nome>__w<largura>.webp)
+# são comparadas pelo nome sem extensão, então seguem o original. Consultas sem RLS: o coletor
+# precisa enxergar as referências de todas as unidades.
+ORPHANED_OBJECTS_QUERY = """
+    WITH referenced AS (
+        SELECT split_part(ref, '/', 1) AS bucket_id,
+               regexp_replace(substr(ref, strpos(ref, '/') + 1), '\\.[^./]*$', '') AS stem
+        FROM (
+            SELECT substring(url FROM '/storage/v1/object/[a-z]+/([^?#]+)') AS ref
+            FROM (
+                SELECT foto_url AS url FROM incidentes
+                UNION ALL SELECT anexos_url FROM incidentes
+                UNION ALL SELECT url_evidencia FROM plano_de_acao_abrangencia
+            ) urls
+        ) refs
+        WHERE ref IS NOT NULL
+    )
+    SELECT o.bucket_id, o.name,
+           COALESCE((o.metadata->>'size')::bigint, 0) AS size,
+           o.created_at
+    FROM storage.objects o
+    WHERE o.bucket_id = ANY(:buckets)
+      AND o.created_at < now() - make_interval(hours => :min_age_hours)
+      AND NOT EXISTS (
+          SELECT 1 FROM referenced r
+          WHERE r.bucket_id = o.bucket_id
+            AND r.stem = regexp_replace(o.name, '(__w[0-9]+\\.webp|\\.[^./]*)$', '')
+      ){extra_filters}
+    ORDER BY o.bucket_id, o.created_at
+"""
+
+# Objetos entregues há pouco pela deduplicação (FileBlobRegistry.acquire atualiza updated_at)
+# podem estar a caminho de uma linha do banco: ficam de fora como os objetos recém-criados
+RECENTLY_ACQUIRED_FILTER = """
+      AND NOT EXISTS (
+          SELECT 1 FROM file_blobs fb
+          WHERE fb.bucket = o.bucket_id AND fb.refcount > 0
+            AND fb.updated_at >= now() - make_interval(hours => :min_age_hours)
+            AND regexp_replace(fb.path, '\\.[^./]*$', '') = regexp_replace(o.name, '(__w[0-9]+\\.webp|\\.[^./]*)$', '')
+      )"""
+
+# Revalidação no momento da remoção, só para os nomes do lote
+BATCH_NAMES_FILTER = """
+      AND o.name = ANY(:names)"""
+
+# Mesmo critério de "nome sem extensão" da consulta, para casar versões reduzidas com o original
+OBJECT_STEM_PATTERN = re.compile(r'(__w[0-9]+\.webp|\.[^./]*)$')
+
+
+def _orphans_query(track_blobs: bool, by_name: bool = False) -> str:
+    extra_filters = (RECENTLY_ACQUIRED_FILTER if track_blobs else "") + (BATCH_NAMES_FILTER if by_name else "")
+    return ORPHANED_OBJECTS_QUERY.format(extra_filters=extra_filters)
+
+
+def _claim_orphans(engine, bucket_name: str, names: list[str], min_age_hours: int, track_blobs: bool) -> list[str]:
+    """
+    Confirma que os objetos do lote continuam órfãos e, na mesma transação, tira do file_blobs
+    os registros deles, para que a deduplicação não os entregue a um novo upload depois da remoção.
+    Um acquire concorrente atualiza updated_at antes do DELETE e a linha é mantida: o objeto fica.
+
+    Returns:
+        Nomes que podem ser removidos do Storage
+    """
+    params = {"buckets": [bucket_name], "min_age_hours": min_age_hours, "names": names}
+    with engine.begin() as conn:
+        confirmed = [row.name for row in conn.execute(text(_orphans_query(track_blobs, by_name=True)), params)]
+        if not confirmed or not track_blobs:
+            return confirmed
+
+        stems = sorted({OBJECT_STEM_PATTERN.sub('', name) for name in confirmed})
+        blob_params = {"bucket": bucket_name, "stems": stems, "min_age_hours": min_age_hours}
+        conn.execute(text("""
+            DELETE FROM file_blobs
+            WHERE bucket = :bucket
+              AND regexp_replace(path, '\\.[^./]*$', '') = ANY(:stems)
+              AND (refcount = 0 OR updated_at < now() - make_interval(hours => :min_age_hours))
+        """), blob_params)
+        kept = {row.stem for row in conn.execute(text("""
+            SELECT regexp_replace(path, '\\.[^./]*$', '') AS stem
+            FROM file_blobs
+            WHERE bucket = :bucket AND regexp_replace(path, '\\.[^./]*$', '') = ANY(:stems)
+        """), blob_params)}
+
+    return [name for name in confirmed if OBJECT_STEM_PATTERN.sub('', name) not in kept]
+
+
+def _require_supabase_backend():
+    # storage.objects e file_blobs descrevem o Supabase: com o backend local a comparação apagaria
+    # objetos locais pela lista do Supabase e limparia o file_blobs da instalação principal
+    if get_storage_settings()["backend"] == "local":
+        raise RuntimeError("A coleta de arquivos órfãos só funciona com o backend Supabase")
+
+
+def find_orphaned_objects(min_age_hours: int = GC_MIN_AGE_HOURS, buckets: tuple = GC_BUCKETS) -> pd.DataFrame:
+    """
+    Lista os objetos do Storage que nenhuma linha de incidentes ou do plano de ação referencia
+    (anti-join de storage.objects com as URLs gravadas), exceto os reaproveitados há pouco pela
+    deduplicação. Só funciona com o backend Supabase.
+
+    Raises:
+        RuntimeError: Com o backend local de arquivos
+
+    Returns:
+        DataFrame com bucket_id, name, size (bytes) e created_at
+    """
+    _require_supabase_backend()
+    engine = get_database_engine()
+    query = _orphans_query(FileBlobRegistry().is_available())
+    with engine.connect() as conn:
+        result = conn.execute(text(query), {"buckets": list(buckets), "min_age_hours": min_age_hours})
+        return pd.DataFrame(result.fetchall(), columns=['bucket_id', 'name', 'size', 'created_at'])
+
+
+def delete_orphaned_objects(orphans_df: pd.DataFrame, batch_size: int = GC_BATCH_SIZE,
+                            min_age_hours: int = GC_MIN_AGE_HOURS) -> dict:
+    """
+    Remove os objetos em lotes de batch_size por chamada. A lista pode ter sido gerada bem
+    antes (relatório da simulação), então cada lote é revalidado contra o banco e sai do
+    file_blobs antes da remoção; objetos que voltaram a ser usados são mantidos. No fim apaga
+    do file_blobs os registros de objetos que já não existem.
+
+    Returns:
+        {"deleted": quantidade, "skipped": voltaram a ser usados, "failed": quantidade, "freed_bytes": bytes liberados}
+
+    Raises:
+        RuntimeError: Com o backend local de arquivos
+    """
+    _require_supabase_backend()
+    storage = SupabaseStorage()
+    summary = {"deleted": 0, "skipped": 0, "failed": 0, "freed_bytes": 0}
+    if orphans_df.empty or not storage.client:
+        return summary
+
+    engine = get_database_engine()
+    track_blobs = FileBlobRegistry().is_available()
+    for bucket_name, bucket_df in orphans_df.groupby('bucket_id'):
+        for start in range(0, len(bucket_df), batch_size):
+            batch = bucket_df.iloc[start:start + batch_size]
+            try:
+                paths = _claim_orphans(engine, bucket_name, batch['name'].tolist(), min_age_hours, track_blobs)
+            except Exception as e:
+                logger.error(f"Falha ao revalidar lote de {len(batch)} objetos de '{bucket_name}': {e}")
+                summary["failed"] += len(batch)
+                continue
+
+            summary["skipped"] += len(batch) - len(paths)
+            if not paths:
+                continue
+            batch = batch[batch['name'].isin(paths)]
+            try:
+                storage.client.storage.from_(bucket_name).remove(paths)
+                summary["deleted"] += len(paths)
+                summary["freed_bytes"] += int(batch['size'].sum())
+            except Exception as e:
+                logger.error(f"Falha ao remover lote de {len(paths)} objetos de '{bucket_name}': {e}")
+                summary["failed"] += len(paths)
+
+    try:
+        engine = get_database_engine()
+        with engine.connect() as conn:
+            stale = conn.execute(text("""
+                DELETE FROM file_blobs fb
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM storage.objects o
+                    WHERE o.bucket_id = fb.bucket AND o.name = fb.path
+                )
+            """)).rowcount
+            conn.commit()
+        if stale:
+            logger.info(f"{stale} registro(s) de file_blobs sem objeto removido(s)")
+    except Exception as e:
+        # Sem a migração 004 não há registros a limpar
+        logger.warning(f"Não foi possível limpar file_blobs: {e}")
+
+    logger.info(f"Coleta de órfãos: {summary['deleted']} removidos, {summary['skipped']} mantidos, {summary['failed']} falhas, "
+                f"{summary['freed_bytes'] / 1024 / 1024:.1f}MB liberados")
+    return summary
+
+
+def summarize_orphans(orphans_df: pd.DataFrame) -> pd.DataFrame:
+    """Quantidade e tamanho dos órfãos por bucket (relatório do modo de simulação)"""
+    if orphans_df.empty:
+        return pd.DataFrame(columns=['Bucket', 'Arquivos', 'Tamanho (MB)'])
+    summary = orphans_df.groupby('bucket_id').agg(Arquivos=('name', 'count'), size=('size', 'sum')).reset_index()
+    summary['Tamanho (MB)'] = (summary['size'] / 1024 / 1024).round(2)
+    return summary.rename(columns={'bucket_id': 'Bucket'})[['Bucket', 'Arquivos', 'Tamanho (MB)']]
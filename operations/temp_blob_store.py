@@ -0,0 +1,165 @@
+import os
+import mmap
+import hashlib
+import secrets
+import tempfile
+import logging
+from contextlib import contextmanager
+from operations.expired_files import ExpiredFileSweeper
+
+logger = logging.getLogger('abrangencia_app.temp_blob_store')
+
+# Arquivos pendentes de confirmação expiram após este tempo (segundos)
+BLOB_TTL_SECONDS = 2 * 3600
+CHUNK_SIZE = 1024 * 1024
+
+
+class BlobFile:
+    """
+    Arquivo somente leitura sobre um blob mapeado em memória.
+    Expõe name/type/read()/getvalue() como o UploadedFile do Streamlit, para ser
+    passado diretamente ao SupabaseStorage e ao PDFProcessor.
+    """
+
+    def __init__(self, mapped, name: str, content_type: str | None, size: int):
+        self._mapped = mapped
+        self.name = name
+        self.type = content_type
+        self.size = size
+
+    def read(self, size: int = -1) -> bytes:
+        if self._mapped is None:
+            return b""
+        return self._mapped.read() if size is None or size < 0 else self._mapped.read(size)
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        if self._mapped is not None:
+            self._mapped.seek(offset, whence)
+        return self.tell()
+
+    def tell(self) -> int:
+        return self._mapped.tell() if self._mapped is not None else 0
+
+    def getvalue(self) -> bytes:
+        if self._mapped is None:
+            return b""
+        return self._mapped[:]
+
+
+class TempBlobStore:
+    """
+    Armazenamento temporário em disco para arquivos enviados que aguardam confirmação.
+    O session_state guarda apenas o handle retornado por put(); os bytes ficam no disco e
+    são lidos via mmap no momento do upload. Cada handle tem seu próprio arquivo (SHA-256 +
+    sufixo aleatório): duas sessões com o mesmo arquivo não apagam o blob uma da outra.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            logger.info("Criando instância única de TempBlobStore")
+            cls._instance = super().__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+
+        self.base_dir = os.path.join(tempfile.gettempdir(), "abrangencia_blobs")
+        os.makedirs(self.base_dir, exist_ok=True)
+        self._sweeper = ExpiredFileSweeper(self.base_dir, BLOB_TTL_SECONDS, "blob(s) temporário(s)")
+        self._initialized = True
+
+    def _blob_path(self, blob_id: str) -> str:
+        return os.path.join(self.base_dir, blob_id)
+
+    def put(self, file_obj) -> dict | None:
+        """
+        Grava o arquivo no disco em blocos, calculando o hash incrementalmente.
+
+        Args:
+            file_obj: UploadedFile do Streamlit (ou qualquer objeto com read())
+
+        Returns:
+            Handle serializável {blob_id, sha256, name, type, size} ou None se file_obj for None
+        """
+        if file_obj is None:
+            return None
+
+        self.cleanup_expired()
+
+        if hasattr(file_obj, 'seek'):
+            file_obj.seek(0)
+
+        hasher = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.base_dir, prefix=".upload_")
+        try:
+            with os.fdopen(fd, "wb") as tmp_file:
+                while True:
+                    chunk = file_obj.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    hasher.update(chunk)
+                    tmp_file.write(chunk)
+                    size += len(chunk)
+
+            file_hash = hasher.hexdigest()
+            blob_id = f"{file_hash}-{secrets.token_hex(8)}"
+            os.replace(tmp_path, self._blob_path(blob_id))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        finally:
+            if hasattr(file_obj, 'seek'):
+                file_obj.seek(0)
+
+        logger.info(f"Blob temporário armazenado: {blob_id[:8]} ({size/1024:.1f}KB)")
+        return {
+            "blob_id": blob_id,
+            "sha256": file_hash,
+            "name": getattr(file_obj, 'name', 'arquivo_sem_nome'),
+            "type": getattr(file_obj, 'type', None),
+            "size": size,
+        }
+
+    def exists(self, handle: dict | None) -> bool:
+        return bool(handle) and os.path.exists(self._blob_path(handle["blob_id"]))
+
+    def get_path(self, handle: dict) -> str:
+        """Caminho do blob no disco (ex.: para st.image sem carregar os bytes na sessão)"""
+        path = self._blob_path(handle["blob_id"])
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Arquivo temporário expirado: {handle.get('name')}")
+        return path
+
+    @contextmanager
+    def open(self, handle: dict):
+        """Abre o blob como BlobFile mapeado em memória"""
+        path = self.get_path(handle)
+        with open(path, "rb") as raw_file:
+            size = os.fstat(raw_file.fileno()).st_size
+            # mmap não aceita arquivos vazios
+            mapped = mmap.mmap(raw_file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+            try:
+                yield BlobFile(mapped, handle.get("name", "arquivo_sem_nome"), handle.get("type"), size)
+            finally:
+                if mapped is not None:
+                    mapped.close()
+
+    def discard(self, handle: dict | None):
+        """Remove o blob deste handle (após upload confirmado)"""
+        if not handle:
+            return
+        try:
+            os.remove(self._blob_path(handle["blob_id"]))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Não foi possível remover blob temporário: {e}")
+
+    def cleanup_expired(self, ttl_seconds: int = BLOB_TTL_SECONDS, force: bool = False) -> int:
+        """Remove blobs mais antigos que o TTL (no máximo uma varredura a cada 10 minutos)"""
+        return self._sweeper.sweep(ttl_seconds, force)
@@ -0,0 +1,122 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait
+from database.supabase_storage import SupabaseStorage
+from operations.temp_blob_store import TempBlobStore
+
+logger = logging.getLogger('abrangencia_app.upload_pipeline')
+
+# Uploads simultâneos por cadastro (foto + PDF, eventualmente mais anexos)
+MAX_UPLOAD_WORKERS = 4
+# Intervalo de atualização do progresso na tela enquanto os uploads rodam
+PROGRESS_POLL_SECONDS = 0.25
+
+
+def _upload_blob(bucket_name: str, handle: dict, progress_callback=None) -> str | None:
+    # Roda fora da thread do Streamlit: nada aqui pode usar st.*
+    with TempBlobStore().open(handle) as file_obj:
+        return SupabaseStorage().upload_file(bucket_name, file_obj, check_duplicates=True, progress_callback=progress_callback)
+
+
+def discard_uploads(urls) -> None:
+    """Compensação: remove os arquivos enviados (deduplicados só perdem uma referência)"""
+    storage = SupabaseStorage()
+    for url in urls:
+        if url and not storage.delete_file_by_url(url):
+            logger.warning(f"Não foi possível remover o upload órfão: {url}")
+
+
+def upload_attachments(attachments: dict[str, tuple[str, dict]], on_progress=None) -> dict[str, str] | None:
+    """
+    Envia os anexos em paralelo (hash, compressão e upload de cada arquivo em sua thread),
+    de modo que o tempo total fica próximo ao do maior upload.
+
+    Args:
+        attachments: {nome: (bucket, handle do TempBlobStore)}
+        on_progress: Chamado na thread do chamador com a fração enviada (0 a 1)
+
+    Returns:
+        {nome: URL}; None se algum upload falhar (os demais já enviados são removidos)
+
+    Raises:
+        FileNotFoundError: Se algum arquivo temporário expirou (os já enviados são removidos)
+    """
+    if not attachments:
+        return {}
+
+    # Bytes enviados por anexo, atualizados pelas threads de upload
+    sent = {name: 0 for name in attachments}
+    sizes = {name: handle.get('size') or 0 for name, (_, handle) in attachments.items()}
+    total_bytes = sum(sizes.values()) or 1
+
+    def progress_for(name):
+        def callback(sent_bytes, _total):
+            sent[name] = sent_bytes
+        return callback
+
+    workers = min(MAX_UPLOAD_WORKERS, len(attachments))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="upload") as executor:
+        futures = {
+            name: executor.submit(_upload_blob, bucket_name, handle, progress_for(name))
+            for name, (bucket_name, handle) in attachments.items()
+        }
+        if on_progress:
+            pending = set(futures.values())
+            while pending:
+                _, pending = wait(pending, timeout=PROGRESS_POLL_SECONDS)
+                # Imagens comprimidas enviam menos bytes que o original: concluído conta o tamanho todo
+                done_bytes = sum(sizes[name] if future.done() else min(sent[name], sizes[name])
+                                 for name, future in futures.items())
+                on_progress(done_bytes / total_bytes)
+
+    urls, error = {}, None
+    for name, future in futures.items():
+        try:
+            urls[name] = future.result()
+        except Exception as e:
+            logger.error(f"Falha no upload de '{name}': {e}")
+            urls[name] = None
+            error = error or e
+
+    if error is not None or not all(urls.values()):
+        discard_uploads(urls.values())
+        if isinstance(error, FileNotFoundError):
+            raise error
+        return None
+    return urls
+
+
+def register_incident_with_attachments(incident_manager, attachments: dict[str, tuple[str, dict]],
+                                       incident_fields: dict, descriptions: list[str], on_progress=None) -> tuple[int | None, bool]:
+    """
+    Envia os anexos em paralelo e grava o incidente com suas ações de bloqueio em uma transação.
+    Se a gravação falhar os arquivos enviados são removidos.
+
+    Args:
+        incident_manager: IncidentManager da sessão
+        attachments: {coluna de URL do incidente (foto_url, anexos_url): (bucket, handle)}
+        incident_fields: Demais campos de IncidentManager.add_incident_with_actions
+        descriptions: Descrições das ações de bloqueio
+        on_progress: Chamado com a fração enviada dos anexos (0 a 1)
+
+    Returns:
+        Tupla (id do incidente ou None, se os uploads foram concluídos); com (None, True)
+        a falha foi na gravação no banco
+
+    Raises:
+        FileNotFoundError: Se algum arquivo temporário expirou
+    """
+    urls = upload_attachments(attachments, on_progress)
+    if urls is None:
+        return None, False
+
+    url_fields = {"foto_url": "", "anexos_url": "", **urls}
+    try:
+        incident_id = incident_manager.add_incident_with_actions(**incident_fields, **url_fields, descriptions=descriptions)
+    except Exception as e:
+        logger.error(f"Erro ao gravar incidente: {e}")
+        incident_id = None
+
+    if not incident_id:
+        logger.warning("Gravação do incidente falhou; removendo os arquivos enviados")
+        discard_uploads(urls.values())
+    return incident_id, True
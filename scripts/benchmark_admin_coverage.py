@@ -0,0 +1,96 @@
+"""
+Benchmark do cálculo de análises não iniciadas do dashboard administrativo.
+Compara o laço original (diferença de conjuntos por incidente) com a matriz
+incidente × unidade de operations/coverage_matrix.py sobre dados sintéticos.
+
+Uso: python -m scripts.benchmark_admin_coverage [incidentes] [unidades]
+"""
+
+import sys
+import time
+import numpy as np
+import pandas as pd
+from operations.coverage_matrix import summarize_uninitiated_analyses
+
+DEFAULT_INCIDENTS = 5000
+DEFAULT_UNITS = 300
+# Fração dos pares incidente × unidade que já possuem ação registrada
+COVERAGE_RATIO = 0.6
+REPEATS = 3
+
+
+def build_synthetic_data(n_incidents: int, n_units: int, seed: int = 42):
+    rng = np.random.default_rng(seed)
+    units = [f"UO {i:03d}" for i in range(n_units)]
+
+    incidents_df = pd.DataFrame({
+        'id': np.arange(1, n_incidents + 1),
+        'evento_resumo': [f"Incidente {i}" for i in range(1, n_incidents + 1)],
+        'data_evento': "01/01/2024",
+    })
+
+    covered = rng.random((n_incidents, n_units)) < COVERAGE_RATIO
+    rows, cols = np.nonzero(covered)
+    coverage_df = pd.DataFrame({
+        'id_incidente': incidents_df['id'].to_numpy()[rows],
+        'unidade_operacional': np.array(units, dtype=object)[cols],
+    })
+    return incidents_df, units, coverage_df
+
+
+def legacy_uninitiated(incidents_df: pd.DataFrame, units: list[str], coverage_df: pd.DataFrame):
+    """Implementação anterior: groupby + diferença de conjuntos + explode para as contagens"""
+    grouped = coverage_df.groupby('id_incidente')['unidade_operacional'].unique()
+    units_who_analyzed_by_incident = {index: set(values) for index, values in grouped.items()}
+    set_all_units = set(units)
+
+    rows = []
+    for _, incident in incidents_df.iterrows():
+        pending_units = set_all_units - units_who_analyzed_by_incident.get(incident['id'], set())
+        if pending_units:
+            rows.append({
+                "Incidente": incident['evento_resumo'],
+                "Data do Incidente": incident['data_evento'],
+                "UOs Pendentes": ", ".join(sorted(pending_units)),
+                "count": len(pending_units),
+                "unidades": list(pending_units)
+            })
+
+    uninitiated_df = pd.DataFrame(rows)
+    counts = uninitiated_df.explode('unidades').groupby('unidades').size()
+    return uninitiated_df, counts
+
+
+def time_it(func, *args) -> tuple[float, object]:
+    best = float('inf')
+    result = None
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+if __name__ == '__main__':
+    n_incidents = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_INCIDENTS
+    n_units = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_UNITS
+
+    print("=" * 60)
+    print(f"BENCHMARK: {n_incidents} incidentes × {n_units} unidades")
+    print("=" * 60)
+
+    incidents_df, units, coverage_df = build_synthetic_data(n_incidents, n_units)
+    print(f"Pares com ação registrada: {len(coverage_df)}")
+
+    legacy_time, (legacy_df, legacy_counts) = time_it(legacy_uninitiated, incidents_df, units, coverage_df)
+    matrix_time, (matrix_df, matrix_counts) = time_it(summarize_uninitiated_analyses, incidents_df, units, coverage_df)
+
+    same_counts = legacy_counts.sort_index().astype(int).equals(matrix_counts.sort_index().astype(int).rename(None))
+    same_rows = legacy_df['count'].tolist() == matrix_df['count'].tolist()
+
+    print(f"Laço original:      {legacy_time * 1000:8.1f} ms")
+    print(f"Matriz vetorizada:  {matrix_time * 1000:8.1f} ms")
+    print(f"Ganho:              {legacy_time / matrix_time:8.1f}x")
+    print(f"Resultados iguais:  {'✅' if same_counts and same_rows else '❌'}")
+
+    exit(0 if same_counts and same_rows else 1)
@@ -0,0 +1,96 @@
+"""
+Benchmark da compressão de imagens do upload sobre um diretório local de fotos.
+Compara a compressão original (decodificação completa e qualidade de 85 para baixo,
+de 5 em 5, com optimize em cada tentativa) com operations/image_compression.py
+(draft do JPEG e busca binária da qualidade) em JPEG e nos formatos modernos
+(WebP/AVIF) que o Pillow instalado codifica.
+
+Uso: python -m scripts.benchmark_image_compression <diretório_de_fotos> [max_size_kb]
+"""
+
+import io
+import os
+import sys
+import time
+from PIL import Image
+from config.cache_config import IMAGE_COMPRESSION
+from operations.image_compression import compress_image_as, is_format_supported, IMAGE_FORMATS
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp')
+REPEATS = 3
+
+
+def legacy_compress(file_bytes: bytes, max_size_kb: int) -> bytes:
+    """Algoritmo anterior de SupabaseStorage._compress_image, para comparação"""
+    img = Image.open(io.BytesIO(file_bytes))
+    if img.mode == 'RGBA':
+        img = img.convert('RGB')
+
+    max_dimension = IMAGE_COMPRESSION['max_dimension']
+    if max(img.size) > max_dimension:
+        ratio = max_dimension / max(img.size)
+        img = img.resize(tuple(int(dim * ratio) for dim in img.size), Image.Resampling.LANCZOS)
+
+    quality = 85
+    output = io.BytesIO()
+    while quality > 20:
+        output.seek(0)
+        output.truncate()
+        img.save(output, format='JPEG', quality=quality, optimize=True)
+        if output.tell() / 1024 <= max_size_kb or quality <= 20:
+            break
+        quality -= 5
+    return output.getvalue()
+
+
+def time_per_image(compress, corpus: list[bytes], max_size_kb: int) -> tuple[float, int]:
+    """Menor tempo médio (ms/imagem) entre as repetições e total de bytes gerados"""
+    best = float('inf')
+    total_bytes = 0
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        total_bytes = sum(len(compress(file_bytes, max_size_kb)) for file_bytes in corpus)
+        best = min(best, (time.perf_counter() - start) / len(corpus))
+    return best * 1000, total_bytes
+
+
+def load_corpus(directory: str) -> list[bytes]:
+    corpus = []
+    for name in sorted(os.listdir(directory)):
+        if name.lower().endswith(IMAGE_EXTENSIONS):
+            with open(os.path.join(directory, name), 'rb') as f:
+                corpus.append(f.read())
+    return corpus
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print(__doc__)
+        exit(1)
+
+    corpus = load_corpus(sys.argv[1])
+    max_size_kb = int(sys.argv[2]) if len(sys.argv) > 2 else IMAGE_COMPRESSION['max_size_kb']
+    if not corpus:
+        print(f"Nenhuma imagem encontrada em {sys.argv[1]}")
+        exit(1)
+
+    original_bytes = sum(len(file_bytes) for file_bytes in corpus)
+
+    print("=" * 60)
+    print(f"COMPRESSÃO DE IMAGENS ({len(corpus)} imagens, {original_bytes / 1024 / 1024:.1f} MB, limite {max_size_kb} KB)")
+    print("=" * 60)
+
+    results = [("Legado", *time_per_image(legacy_compress, corpus, max_size_kb))]
+    for image_format in IMAGE_FORMATS:
+        if not is_format_supported(image_format):
+            print(f"({image_format.upper()} indisponível neste Pillow)")
+            continue
+        compress = lambda file_bytes, size_kb, fmt=image_format: compress_image_as(file_bytes, fmt, size_kb)[0]
+        results.append((f"Nova {image_format.upper()}", *time_per_image(compress, corpus, max_size_kb)))
+
+    legacy_ms, legacy_bytes = results[0][1:]
+    for label, ms, total in results:
+        saved = original_bytes - total
+        print(f"{label:10s} {ms:8.1f} ms/imagem  {total / 1024 / len(corpus):7.1f} KB/imagem  "
+              f"economia {saved / 1024 / 1024:6.1f} MB ({saved / original_bytes:.0%})  "
+              f"tempo {legacy_ms / ms:4.1f}x  tamanho {total / legacy_bytes:.0%} do legado")
@@ -0,0 +1,129 @@
+"""
+Benchmark do tempo de importação (python -X importtime) dos módulos carregados na
+inicialização do app e de cada página carregada sob demanda.
+
+Falha (código 1) se a inicialização passar do limite em milissegundos ou se algum
+módulo pesado (bibliotecas de PDF, IA) for importado antes de a página que o usa ser aberta.
+Precisa de um .streamlit/secrets.toml (mesmo com valores fictícios): auth.azure_auth
+lê st.secrets ao ser importado.
+
+Uso: python scripts/benchmark_import_time.py [--max-startup-ms 2500] [--top 15]
+"""
+
+import os
+import re
+import sys
+import argparse
+import subprocess
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Importações feitas pelo SSAB.py antes de qualquer página ser aberta
+STARTUP_MODULES = [
+    "streamlit",
+    "streamlit_option_menu",
+    "auth.login_page",
+    "auth.auth_utils",
+    "auth.azure_auth",
+    "front.dashboard",
+    "database.matrix_manager",
+    "operations.audit_logger",
+    "operations.cache_warmup",
+    "operations.render_profiler",
+]
+
+# Páginas importadas por SSAB.lazy_page quando abertas
+LAZY_PAGES = [
+    "front.plano_de_acao",
+    "front.pdf_processor_page",
+    "front.administracao",
+]
+
+# Não podem aparecer na inicialização
+HEAVY_MODULES = ["pdfplumber", "pdf2image", "fitz", "PyPDF2", "google.generativeai", "AI.api_Operation", "supabase"]
+
+DEFAULT_MAX_STARTUP_MS = 2500
+DEFAULT_TOP = 15
+
+_LINE_PATTERN = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def measure(modules: list[str], preloaded: list[str] = ()) -> dict:
+    """
+    Importa os módulos em um processo novo e lê a saída do -X importtime.
+
+    Args:
+        modules: Módulos medidos
+        preloaded: Módulos importados antes, no mesmo processo (já em cache quando os medidos carregarem)
+
+    Returns:
+        {módulo: (tempo próprio em µs, tempo acumulado em µs, profundidade)}
+    """
+    code = "; ".join(f"import {module}" for module in [*preloaded, *modules]) or "pass"
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT_DIR, capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"Falha ao importar {modules}:\n{completed.stderr[-2000:]}")
+
+    timings = {}
+    for line in completed.stderr.splitlines():
+        match = _LINE_PATTERN.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            timings[name] = (int(self_us), int(cumulative_us), len(indent) // 2)
+    return timings
+
+
+def top_level_total_ms(timings: dict) -> float:
+    """Soma dos tempos acumulados das importações de primeiro nível"""
+    return sum(cumulative for _, cumulative, depth in timings.values() if depth == 0) / 1000
+
+
+def print_heaviest(timings: dict, top: int):
+    heaviest = sorted(timings.items(), key=lambda item: item[1][0], reverse=True)[:top]
+    for name, (self_us, cumulative_us, _) in heaviest:
+        print(f"  {self_us / 1000:8.1f} ms próprio  {cumulative_us / 1000:8.1f} ms acumulado  {name}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-startup-ms", type=float, default=DEFAULT_MAX_STARTUP_MS)
+    parser.add_argument("--top", type=int, default=DEFAULT_TOP)
+    args = parser.parse_args()
+
+    success = True
+
+    print("=" * 60)
+    print("IMPORTAÇÃO NA INICIALIZAÇÃO")
+    print("=" * 60)
+    # Descarta o que o próprio interpretador importa ao iniciar (site, encodings...)
+    baseline = set(measure([]))
+    startup = {name: timing for name, timing in measure(STARTUP_MODULES).items() if name not in baseline}
+    startup_ms = top_level_total_ms(startup)
+    print(f"Total: {startup_ms:.0f} ms (limite {args.max_startup_ms:.0f} ms)")
+    print_heaviest(startup, args.top)
+
+    if startup_ms > args.max_startup_ms:
+        print("❌ Inicialização acima do limite")
+        success = False
+
+    leaked = [module for module in HEAVY_MODULES if module in startup]
+    if leaked:
+        print(f"❌ Módulos pesados importados na inicialização: {', '.join(leaked)}")
+        success = False
+    else:
+        print("✅ Nenhum módulo pesado na inicialização")
+
+    for page in LAZY_PAGES:
+        print("\n" + "=" * 60)
+        print(f"PÁGINA SOB DEMANDA: {page}")
+        print("=" * 60)
+        # Com a inicialização já carregada, mede só o custo extra de abrir a página
+        page_timings = measure([page], preloaded=STARTUP_MODULES)
+        extra = {name: timing for name, timing in page_timings.items() if name not in startup and name not in baseline}
+        print(f"Custo adicional: {top_level_total_ms(extra):.0f} ms")
+        print_heaviest(extra, min(args.top, 5))
+
+    exit(0 if success else 1)
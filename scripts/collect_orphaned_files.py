@@ -0,0 +1,53 @@
+"""
+Coleta de arquivos órfãos do Storage (fotos, anexos e evidências que nenhum incidente
+ou ação do plano referencia). Por padrão apenas simula e mostra o relatório; com
+--apply remove os arquivos em lotes.
+
+Uso: python -m scripts.collect_orphaned_files [--apply] [--min-age-hours 24] [--batch-size 100]
+"""
+
+import argparse
+from operations.storage_gc import (
+    find_orphaned_objects, delete_orphaned_objects, summarize_orphans,
+    GC_MIN_AGE_HOURS, GC_BATCH_SIZE
+)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--apply", action="store_true", help="Remove os arquivos (sem isto, só simula)")
+    parser.add_argument("--min-age-hours", type=int, default=GC_MIN_AGE_HOURS)
+    parser.add_argument("--batch-size", type=int, default=GC_BATCH_SIZE)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("ARQUIVOS ÓRFÃOS NO STORAGE" + ("" if args.apply else " (SIMULAÇÃO)"))
+    print("=" * 60)
+
+    try:
+        orphans_df = find_orphaned_objects(min_age_hours=args.min_age_hours)
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        exit(1)
+    if orphans_df.empty:
+        print("✅ Nenhum arquivo órfão encontrado")
+        exit(0)
+
+    print(summarize_orphans(orphans_df).to_string(index=False))
+    print(f"\nTotal: {len(orphans_df)} arquivo(s), {orphans_df['size'].sum() / 1024 / 1024:.1f} MB")
+
+    if not args.apply:
+        for _, row in orphans_df.head(20).iterrows():
+            print(f"  {row['bucket_id']}/{row['name']} ({row['size'] / 1024:.1f} KB, {row['created_at']:%d/%m/%Y})")
+        if len(orphans_df) > 20:
+            print(f"  ... e mais {len(orphans_df) - 20}")
+        print("\nNada foi removido. Use --apply para remover.")
+        exit(0)
+
+    summary = delete_orphaned_objects(orphans_df, batch_size=args.batch_size, min_age_hours=args.min_age_hours)
+    print(f"\n✅ {summary['deleted']} removido(s), {summary['freed_bytes'] / 1024 / 1024:.1f} MB liberados")
+    if summary['skipped']:
+        print(f"↩️ {summary['skipped']} mantido(s): voltaram a ser usados durante a coleta")
+    if summary['failed']:
+        print(f"❌ {summary['failed']} falha(s)")
+        exit(1)
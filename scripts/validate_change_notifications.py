@@ -0,0 +1,80 @@
+"""
+Script para validar as notificações de mudança (LISTEN/NOTIFY) usadas pelo cache.
+Verifica os triggers nas tabelas do app e faz um round-trip no canal de notificações.
+"""
+
+import json
+import select
+from sqlalchemy import text
+from database.supabase_config import get_database_engine
+from database.change_listener import CHANGE_CHANNEL
+
+APP_TABLES = [
+    'incidentes',
+    'acoes_bloqueio',
+    'plano_de_acao_abrangencia',
+    'usuarios',
+    'utilities',
+    'solicitacoes_acesso'
+]
+
+def check_triggers(engine) -> bool:
+    """Verifica se cada tabela possui o trigger de notificação"""
+    print("\n" + "=" * 60)
+    print("VERIFICANDO TRIGGERS DE NOTIFICAÇÃO")
+    print("=" * 60)
+
+    all_exist = True
+    with engine.connect() as conn:
+        for table in APP_TABLES:
+            result = conn.execute(text("""
+                SELECT EXISTS(
+                    SELECT 1
+                    FROM pg_trigger t
+                    JOIN pg_class c ON t.tgrelid = c.oid
+                    WHERE c.relname = :table
+                      AND t.tgname = 'trg_notify_table_change'
+                )
+            """), {"table": table})
+            exists = result.scalar()
+            status = "✅ EXISTE" if exists else "❌ NÃO EXISTE"
+            print(f"{table}: {status}")
+            if not exists:
+                all_exist = False
+
+    return all_exist
+
+def check_round_trip(engine) -> bool:
+    """Escuta o canal e publica uma notificação de teste"""
+    print("\n" + "=" * 60)
+    print("TESTANDO ROUND-TRIP NO CANAL")
+    print("=" * 60)
+
+    listener = engine.raw_connection()
+    try:
+        pg_conn = listener.driver_connection
+        pg_conn.autocommit = True
+        with pg_conn.cursor() as cursor:
+            cursor.execute(f"LISTEN {CHANGE_CHANNEL}")
+
+        payload = json.dumps({"table": "__validate__", "op": "TEST", "id": None, "origin": "validate"})
+        with engine.connect() as conn:
+            conn.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": CHANGE_CHANNEL, "payload": payload})
+            conn.commit()
+
+        if select.select([pg_conn], [], [], 5) == ([], [], []):
+            print("❌ Nenhuma notificação recebida em 5s")
+            return False
+
+        pg_conn.poll()
+        received = [n.payload for n in pg_conn.notifies]
+        ok = payload in received
+        print("✅ Notificação recebida" if ok else f"❌ Payload inesperado: {received}")
+        return ok
+    finally:
+        listener.close()
+
+if __name__ == '__main__':
+    engine = get_database_engine()
+    success = check_triggers(engine) and check_round_trip(engine)
+    exit(0 if success else 1)
@@ -0,0 +1,135 @@
+"""
+Valida o upload em blocos retomável (database/resumable_upload.py) contra um servidor
+TUS local em memória, sem acessar o Supabase. O servidor derruba a conexão no meio
+do envio e retorna erro 500 em um bloco; o cliente precisa retomar pelo HEAD e o
+arquivo recebido precisa ter o mesmo SHA-256 do enviado.
+
+Uso: python -m scripts.validate_resumable_upload [tamanho_em_MB]
+"""
+
+import io
+import os
+import sys
+import hashlib
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from database import resumable_upload
+from database.resumable_upload import TusUploader, hash_file
+
+CHUNK_SIZE = 1024 * 1024
+DEFAULT_SIZE_MB = 8
+
+
+class TusStandIn(BaseHTTPRequestHandler):
+    """Servidor TUS mínimo: POST cria, HEAD informa o deslocamento, PATCH grava o bloco"""
+    uploads = {}
+    patch_count = 0
+    # Números dos PATCH que falham: derruba a conexão / responde 500
+    drop_on_patch = {2}
+    error_on_patch = {4}
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        upload_id = str(len(self.uploads) + 1)
+        self.uploads[upload_id] = {
+            "length": int(self.headers["Upload-Length"]),
+            "metadata": self.headers.get("Upload-Metadata", ""),
+            "data": bytearray(),
+        }
+        self.send_response(201)
+        self.send_header("Location", f"/upload/{upload_id}")
+        self.send_header("Tus-Resumable", "1.0.0")
+        self.end_headers()
+
+    def do_HEAD(self):
+        upload = self.uploads.get(self.path.rsplit("/", 1)[-1])
+        if upload is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Upload-Offset", str(len(upload["data"])))
+        self.send_header("Upload-Length", str(upload["length"]))
+        self.end_headers()
+
+    def do_PATCH(self):
+        TusStandIn.patch_count += 1
+        upload = self.uploads[self.path.rsplit("/", 1)[-1]]
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+
+        if int(self.headers["Upload-Offset"]) != len(upload["data"]):
+            self.send_response(409)
+            self.end_headers()
+            return
+
+        if TusStandIn.patch_count in self.drop_on_patch:
+            # Grava metade do bloco e fecha a conexão sem responder
+            upload["data"].extend(body[:len(body) // 2])
+            self.close_connection = True
+            self.connection.close()
+            return
+        if TusStandIn.patch_count in self.error_on_patch:
+            self.send_response(500)
+            self.end_headers()
+            return
+
+        upload["data"].extend(body)
+        self.send_response(204)
+        self.send_header("Upload-Offset", str(len(upload["data"])))
+        self.end_headers()
+
+
+if __name__ == '__main__':
+    size_mb = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_SIZE_MB
+    payload = os.urandom(size_mb * 1024 * 1024 + 12345)
+    file_obj = io.BytesIO(payload)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), TusStandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    endpoint = f"http://127.0.0.1:{server.server_port}/upload"
+    resumable_upload.RETRY_BACKOFF_SECONDS = 0.01
+
+    print("=" * 60)
+    print(f"UPLOAD RETOMÁVEL ({len(payload) / 1024 / 1024:.1f} MB em blocos de {CHUNK_SIZE // 1024} KB)")
+    print("=" * 60)
+
+    success = True
+    expected_hash = hashlib.sha256(payload).hexdigest()
+    if hash_file(file_obj) != expected_hash or file_obj.tell() != 0:
+        print("❌ Hash incremental diverge do hash do conteúdo")
+        success = False
+    else:
+        print("✅ Hash incremental confere")
+
+    progress = []
+    uploader = TusUploader(endpoint, chunk_size=CHUNK_SIZE)
+    location = uploader.upload(file_obj, len(payload), {"bucketName": "teste", "objectName": "arquivo.bin"},
+                               progress_callback=lambda sent, total: progress.append(sent))
+
+    received = TusStandIn.uploads[location.rsplit("/", 1)[-1]]["data"]
+    if hashlib.sha256(received).hexdigest() == expected_hash:
+        print(f"✅ Conteúdo recebido íntegro após falhas ({TusStandIn.patch_count} PATCH)")
+    else:
+        print(f"❌ Conteúdo recebido diverge ({len(received)} de {len(payload)} bytes)")
+        success = False
+
+    if progress and progress[-1] == len(payload) and progress == sorted(progress):
+        print(f"✅ Progresso reportado em {len(progress)} etapas até 100%")
+    else:
+        print("❌ Progresso inconsistente")
+        success = False
+
+    # Retomada entre tentativas: novo cliente, mesma Location, já completa
+    TusStandIn.drop_on_patch, TusStandIn.error_on_patch = set(), set()
+    patches_before = TusStandIn.patch_count
+    TusUploader(endpoint, chunk_size=CHUNK_SIZE).upload(file_obj, len(payload), {}, location=location)
+    if TusStandIn.patch_count == patches_before:
+        print("✅ Upload concluído não é reenviado ao retomar")
+    else:
+        print("❌ Retomada reenviou blocos já gravados")
+        success = False
+
+    server.shutdown()
+    exit(0 if success else 1)